@@ -205,6 +205,7 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get user statistics"""
+        from exams.mastery import user_mastery
         from exams.models import Attempt
         
         user = request.user
@@ -220,6 +221,19 @@ class UserProfileViewSet(viewsets.ModelViewSet):
             'current_streak': user.current_streak,
             'longest_streak': user.longest_streak,
             'badges_earned': user.badges.count(),
+            'topics': [
+                {
+                    'topic_id': m.topic_id,
+                    'topic': m.topic.name,
+                    'attempted': m.attempted,
+                    'correct': m.correct,
+                    'accuracy_pct': m.accuracy_pct,
+                    'mastery_pct': m.mastery_pct,
+                    'time_spent_seconds': m.time_spent_seconds,
+                    'last_activity': m.last_activity.isoformat() if m.last_activity else None,
+                }
+                for m in user_mastery(user.id)
+            ],
         }
         
         return APIResponse(stats)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Topic, Question, Exam, ExamQuestion, Attempt, Response, Badge, LeaderboardEntry
+from .models import Topic, Question, Exam, ExamQuestion, Attempt, Response, Badge, LeaderboardEntry, ImportJob
 
 # -------------------------------
 # TOPIC ADMIN
@@ -128,6 +128,9 @@ class AttemptAdmin(admin.ModelAdmin):
         ('Scoring', {
             'fields': ('total_score', 'percentage', 'rank', 'percentile')
         }),
+        ('Grading', {
+            'fields': ('grades_finalized', 'graded_by', 'graded_at', 'evaluated_pdf', 'evaluated_pdf_url'),
+        }),
         ('Metadata', {
             'fields': ('metadata',),
             'classes': ('collapse',)
@@ -146,7 +149,9 @@ class AttemptAdmin(admin.ModelAdmin):
     
     @admin.action(description='Recalculate scores for selected attempts')
     def recalculate_scores(self, request, queryset):
-        for attempt in queryset:
+        # calculate_score() reads question marks from the per-exam compiled answer key and
+        # refreshes the derived rows (score index, leaderboard, mastery) through attempt_sync.
+        for attempt in queryset.select_related('exam'):
             attempt.calculate_score()
         self.message_user(request, f"Recalculated scores for {queryset.count()} attempts.")
 
@@ -195,8 +200,19 @@ class BadgeAdmin(admin.ModelAdmin):
 # -------------------------------
 @admin.register(LeaderboardEntry)
 class LeaderboardEntryAdmin(admin.ModelAdmin):
-    list_display = ('user', 'score_metric', 'time_period', 'rank', 'created_at')
+    list_display = ('user', 'time_period', 'rank', 'avg_percentage', 'tests_completed', 'total_score', 'updated_at')
     list_filter = ('time_period', 'created_at')
     search_fields = ('user__username', 'user__email')
     readonly_fields = ('created_at', 'updated_at')
     ordering = ('time_period', 'rank')
+
+
+# -------------------------------
+# IMPORT JOB ADMIN
+# -------------------------------
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'original_name', 'created_by', 'processed_rows', 'created_count', 'error_count', 'created_at')
+    list_filter = ('kind', 'status', 'created_at')
+    search_fields = ('original_name', 'created_by__username')
+    readonly_fields = ('created_at', 'updated_at', 'started_at', 'finished_at')
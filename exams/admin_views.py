@@ -4,7 +4,12 @@ from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from django.db.models import Count, Avg, Q
 from django.db.models import Max
+from django.http import HttpResponse
 from exams.models import Topic, Question, Exam, Attempt, ExamQuestion
+from exams.api_cache import render_cache_stats
+from exams.mastery import top_topics as mastery_top_topics
+from exams.metrics import render_prometheus
+from exams.papers import invalidate_exam_paper
 from accounts.models import Badge, UserBadge
 
 User = get_user_model()
@@ -29,6 +34,8 @@ def _renumber_exam_questions(exam_id):
             changed.append(eq)
     if changed:
         ExamQuestion.objects.bulk_update(changed, ['order'])
+        # bulk_update() sends no model signals.
+        invalidate_exam_paper(exam_id)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -82,6 +89,14 @@ def admin_users_list(request):
     
     return Response(list(users))
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def request_metrics(request):
+    """Per-view request metrics of this process in Prometheus text format (admin only)"""
+    if not is_admin(request.user):
+        return Response({'detail': 'Admin access required'}, status=403)
+    return HttpResponse(render_prometheus() + render_cache_stats(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def admin_delete_user(request, user_id):
@@ -123,21 +138,8 @@ def admin_analytics(request):
         percentage__isnull=False
     ).aggregate(Avg('percentage'))['percentage__avg'] or 0
     
-    # Top performing topics - get topics with most attempts and highest avg scores
-    from django.db.models import Count, Avg as DjangoAvg
-    top_topics_data = Topic.objects.filter(is_active=True).annotate(
-        attempt_count=Count('exams__attempts', filter=Q(exams__attempts__status__in=['submitted', 'timedout'])),
-        avg_score=DjangoAvg('exams__attempts__percentage', filter=Q(exams__attempts__status__in=['submitted', 'timedout']))
-    ).filter(attempt_count__gt=0).order_by('-attempt_count', '-avg_score')[:10]
-    
-    top_topics = []
-    for topic in top_topics_data:
-        top_topics.append({
-            'id': topic.id,
-            'name': topic.name,
-            'attempts': topic.attempt_count or 0,
-            'avg_score': round(topic.avg_score or 0, 2)
-        })
+    # Top performing topics, from the per-user topic mastery rollup
+    top_topics = mastery_top_topics(limit=10)
     
     return Response({
         'activeUsers': active_users,
@@ -289,5 +291,6 @@ def exam_questions_reorder(request, exam_id):
         next_order += 1
 
     ExamQuestion.objects.bulk_update(updates, ['order'])
+    invalidate_exam_paper(exam_id)
     _renumber_exam_questions(exam_id)
     return Response({'detail': 'Reordered questions', 'count': len(updates)})
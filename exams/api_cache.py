@@ -0,0 +1,161 @@
+"""Cache-aside for read-mostly catalogue endpoints (curriculums, topics, exams, materials).
+
+``CachedResponseMixin`` stores the serialized ``response.data`` of a
+viewset's ``list``/``retrieve`` actions in the cache framework. The key
+covers:
+
+- the resource and action
+- the caller's role (anonymous, student, teacher, admin), since some
+  querysets differ by role
+- the absolute URL with sorted query params, so filters, pages and the host
+  used in absolute media URLs are all part of it
+- the current generation of every scope the resource reads
+
+Each scope (``curriculum``, ``topic``, ``exam``, ``question``, ``material``)
+has a generation counter (see ``exams.cache_versions``). The ``post_save``/``post_delete`` receivers in
+``exams.signals`` and ``learning.signals`` bump it through
+``invalidate_api_cache``, so the next request builds a fresh entry and old
+entries expire on their TTL. Writes that bypass signals (``update()``,
+``bulk_create``, ``bulk_update``) must call ``invalidate_api_cache``
+themselves. Counts that change on every submission, such as an exam's
+``attempts_count``, do not invalidate anything and can lag by up to
+``cache_timeout``.
+
+Each entry also stores an ETag (hash of the JSON body) and ``Last-Modified``
+(newest ``updated_at`` in the payload), so a matching ``If-None-Match`` on a
+cached entry is answered with 304 without touching the database or the
+serializer. Because the tag hashes the content, a rebuild that produces the
+same body (for example after a TTL expiry) keeps the same tag.
+
+Responses carry ``X-Cache: HIT``/``MISS``. Lookups are counted per resource
+(``cache_stats``) and per request (``exams.metrics``), and both show up on
+``/api/metrics/``.
+"""
+import hashlib
+import threading
+from collections import Counter
+
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .cache_versions import bump_version, cache_timeout, versions
+from .conditional import content_etag, latest_timestamp, not_modified, set_validators
+from .metrics import record_cache
+
+
+API_CACHE_TIMEOUT = 60 * 5
+
+SCOPES = ('curriculum', 'topic', 'exam', 'question', 'material')
+
+_stats_lock = threading.Lock()
+_stats = Counter()  # (resource, 'hit' | 'miss') -> count
+
+
+def _generation_name(scope) -> str:
+    return f'exams:api_cache:gen:{scope}'
+
+
+def invalidate_api_cache(*scopes) -> None:
+    """Start a new generation for ``scopes``; entries built from older ones are never read again."""
+    for scope in scopes:
+        bump_version(_generation_name(scope))
+
+
+def _generations(scopes) -> str:
+    return '.'.join(str(v) for v in versions([_generation_name(s) for s in scopes]))
+
+
+def request_role(request) -> str:
+    user = getattr(request, 'user', None)
+    if not (user and user.is_authenticated):
+        return 'anon'
+    if user.is_staff or getattr(user, 'role', None) == 'ADMIN':
+        return 'admin'
+    return (getattr(user, 'role', None) or 'student').lower()
+
+
+def _request_fingerprint(request) -> str:
+    query = sorted((k, v) for k in request.query_params for v in request.query_params.getlist(k))
+    raw = f'{request.build_absolute_uri(request.path)}?{query!r}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _count(resource, hit) -> None:
+    record_cache(hit)
+    with _stats_lock:
+        _stats[(resource, 'hit' if hit else 'miss')] += 1
+
+
+def cache_stats() -> dict:
+    """``{resource: {'hit': n, 'miss': n}}`` for this process."""
+    with _stats_lock:
+        out = {}
+        for (resource, result), n in _stats.items():
+            out.setdefault(resource, {'hit': 0, 'miss': 0})[result] = n
+        return out
+
+
+def render_cache_stats() -> str:
+    """``cache_stats`` as a Prometheus counter family, appended to ``/api/metrics/``."""
+    lines = [
+        '# HELP mentara_api_cache_requests_total Cached list/retrieve lookups, by resource and result.',
+        '# TYPE mentara_api_cache_requests_total counter',
+    ]
+    for resource, counts in sorted(cache_stats().items()):
+        for result in ('hit', 'miss'):
+            lines.append(f'mentara_api_cache_requests_total{{resource="{resource}",result="{result}"}} {counts[result]}')
+    return '\n'.join(lines) + '\n'
+
+
+def reset_cache_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def _last_modified(data):
+    """Newest ``updated_at`` among the top-level objects of a list/retrieve payload."""
+    rows = data if isinstance(data, list) else [data]
+    return latest_timestamp(*(r.get('updated_at') for r in rows if isinstance(r, dict)))
+
+
+class CachedResponseMixin:
+    """Serve ``list``/``retrieve`` from the cache; set ``cache_scopes`` to the scopes the data reads."""
+
+    cache_scopes = ()
+    cache_timeout = API_CACHE_TIMEOUT
+    cache_resource = None  # defaults to the router basename
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
+
+    def _cached(self, handler, request, *args, **kwargs):
+        resource = self.cache_resource or self.basename
+        key = (
+            f'exams:api_cache:{resource}:{self.action}:{request_role(request)}:'
+            f'{_generations(self.cache_scopes)}:{_request_fingerprint(request)}'
+        )
+        entry = cache.get(key)
+        _count(resource, entry is not None)
+        if entry is not None:
+            response = not_modified(request, entry['etag'], entry['last_modified'])
+            if response is None:
+                response = Response(entry['data'])
+            response['X-Cache'] = 'HIT'
+            return set_validators(response, entry['etag'], entry['last_modified'])
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            entry = {
+                'etag': content_etag(request, JSONRenderer().render(response.data)),
+                'last_modified': _last_modified(response.data),
+                'data': response.data,
+            }
+            cache.set(key, entry, cache_timeout(self.cache_timeout))
+            response = not_modified(request, entry['etag'], entry['last_modified']) or response
+            set_validators(response, entry['etag'], entry['last_modified'])
+        response['X-Cache'] = 'MISS'
+        return response
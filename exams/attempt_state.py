@@ -0,0 +1,168 @@
+"""Structured per-attempt state that used to live in ``Attempt.metadata``.
+
+Flags, teacher remarks, uploads and grading finalization were keys of the
+metadata JSON blob, so every per-question change was a read-modify-write of
+the whole blob and concurrent saves could drop each other's updates. They
+now live in their own rows/columns and each change is a single-row write:
+
+- flags: ``AttemptFlag`` (one row per attempt/question, upserted)
+- teacher remarks: ``Response.teacher_feedback``
+- student uploads: ``AttemptUpload`` (append-only)
+- finalization and evaluated PDF: columns on ``Attempt``
+- question order: ``Attempt.question_order`` (packed integer array)
+- grading counters: ``Attempt.struct_total``, ``struct_graded``,
+  ``pending_struct_count`` (their difference, for the teacher grading
+  queue) and ``max_marks``, recounted whenever a finished attempt's
+  responses or marks change
+
+``Attempt.metadata`` keeps the write-once ``exam_snapshot`` and any legacy
+keys. The helpers below return the same shapes the API used to read from
+the blob.
+"""
+from django.db import connections
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Attempt, AttemptFlag, AttemptUpload, Response
+from .ranking import FINISHED_STATUSES
+
+
+FLAG_UPSERT_FIELDS = ['flagged', 'updated_at']
+
+GRADING_COUNTER_FIELDS = ['struct_total', 'struct_graded', 'pending_struct_count', 'max_marks']
+
+
+def flagged_map(attempt: Attempt, question_ids=None) -> dict[str, bool]:
+    """``{str(question_id): flagged}`` for ``attempt`` (optionally limited to ``question_ids``)."""
+    qs = AttemptFlag.objects.filter(attempt_id=attempt.id)
+    if question_ids is not None:
+        qs = qs.filter(question_id__in=list(question_ids))
+    return {str(qid): flagged for qid, flagged in qs.values_list('question_id', 'flagged')}
+
+
+def set_flags(attempt: Attempt, flags: dict) -> None:
+    """Upsert flag rows for ``{question_id: bool}`` in one statement."""
+    if not flags:
+        return
+    rows = [AttemptFlag(attempt_id=attempt.id, question_id=int(qid), flagged=bool(v)) for qid, v in flags.items()]
+    kwargs = {'update_conflicts': True, 'update_fields': FLAG_UPSERT_FIELDS}
+    if connections[AttemptFlag.objects.db].features.supports_update_conflicts_with_target:
+        kwargs['unique_fields'] = ['attempt', 'question']
+    AttemptFlag.objects.bulk_create(rows, **kwargs)
+
+
+def teacher_remarks(attempt: Attempt) -> dict[str, str]:
+    """``{str(question_id): remark}`` from the attempt's graded responses."""
+    return {
+        str(qid): text
+        for qid, text in Response.objects.filter(attempt_id=attempt.id)
+        .exclude(teacher_feedback='')
+        .values_list('question_id', 'teacher_feedback')
+    }
+
+
+def upload_entries(attempt: Attempt) -> list[dict]:
+    return [u.as_dict() for u in AttemptUpload.objects.filter(attempt_id=attempt.id)]
+
+
+def add_uploads(attempt: Attempt, uploads: list[AttemptUpload]) -> None:
+    for u in uploads:
+        u.attempt_id = attempt.id
+    AttemptUpload.objects.bulk_create(uploads)
+
+
+def set_evaluated_pdf(attempt: Attempt, path: str, url: str | None) -> None:
+    attempt.evaluated_pdf = path or ''
+    attempt.evaluated_pdf_url = url or ''
+    attempt.save(update_fields=['evaluated_pdf', 'evaluated_pdf_url'])
+
+
+def finalize_grades(attempt: Attempt, user) -> None:
+    attempt.grades_finalized = True
+    attempt.graded_by_id = getattr(user, 'id', None)
+    attempt.graded_at = timezone.now()
+    attempt.save(update_fields=['grades_finalized', 'graded_by', 'graded_at'])
+
+
+STRUCT = Q(question__type='STRUCT')
+GRADED_STRUCT = Q(question__type='STRUCT', teacher_mark__isnull=False)
+
+
+def refresh_grading_counters(attempt: Attempt) -> list[str]:
+    """Recount ``attempt``'s grading counters onto the instance (not saved).
+
+    Returns ``GRADING_COUNTER_FIELDS`` so callers can add them to the
+    ``update_fields`` of the save they already make.
+    """
+    stats = Response.objects.filter(attempt_id=attempt.id).aggregate(
+        struct_total=Count('pk', filter=STRUCT),
+        struct_graded=Count('pk', filter=GRADED_STRUCT),
+        max_marks=Sum('question__marks'),
+    )
+    attempt.struct_total = stats['struct_total']
+    attempt.struct_graded = stats['struct_graded']
+    attempt.pending_struct_count = attempt.struct_total - attempt.struct_graded
+    attempt.max_marks = float(stats['max_marks'] or 0.0)
+    return GRADING_COUNTER_FIELDS
+
+
+def sync_grading_counters(attempt: Attempt) -> None:
+    """Recount and store the counters, for paths that do not save the attempt afterwards."""
+    before = [getattr(attempt, f) for f in GRADING_COUNTER_FIELDS]
+    refresh_grading_counters(attempt)
+    if before != [getattr(attempt, f) for f in GRADING_COUNTER_FIELDS]:
+        Attempt.objects.filter(pk=attempt.pk).update(**{f: getattr(attempt, f) for f in GRADING_COUNTER_FIELDS})
+
+
+def _response_total(expression, output_field, condition=None):
+    rows = Response.objects.filter(attempt=OuterRef('pk'))
+    if condition is not None:
+        rows = rows.filter(condition)
+    rows = rows.order_by().values('attempt').annotate(v=expression).values('v')[:1]
+    return Coalesce(Subquery(rows, output_field=output_field), Value(0), output_field=output_field)
+
+
+def _counted_attempts(attempts):
+    return attempts.annotate(
+        counted_struct_total=_response_total(Count('pk'), IntegerField(), STRUCT),
+        counted_struct_graded=_response_total(Count('pk'), IntegerField(), GRADED_STRUCT),
+        counted_max_marks=_response_total(Sum('question__marks'), FloatField()),
+    )
+
+
+def grading_counter_mismatches(attempts=None) -> list[tuple[int, dict, dict]]:
+    """``(attempt_id, stored, expected)`` for finished attempts whose counters have drifted."""
+    if attempts is None:
+        attempts = Attempt.objects.all()
+    rows = (
+        _counted_attempts(attempts.filter(status__in=FINISHED_STATUSES))
+        .exclude(
+            struct_total=F('counted_struct_total'),
+            struct_graded=F('counted_struct_graded'),
+            pending_struct_count=F('counted_struct_total') - F('counted_struct_graded'),
+            max_marks=F('counted_max_marks'),
+        )
+        .order_by('id')
+        .values('id', *GRADING_COUNTER_FIELDS, 'counted_struct_total', 'counted_struct_graded', 'counted_max_marks')
+    )
+    out = []
+    for row in rows:
+        expected = {
+            'struct_total': row['counted_struct_total'],
+            'struct_graded': row['counted_struct_graded'],
+            'pending_struct_count': row['counted_struct_total'] - row['counted_struct_graded'],
+            'max_marks': float(row['counted_max_marks']),
+        }
+        out.append((row['id'], {f: row[f] for f in GRADING_COUNTER_FIELDS}, expected))
+    return out
+
+
+def repair_grading_counters(attempt_ids) -> int:
+    """Recount the counters of ``attempt_ids`` in one UPDATE; returns the number of rows written."""
+    return Attempt.objects.filter(pk__in=list(attempt_ids)).update(
+        struct_total=_response_total(Count('pk'), IntegerField(), STRUCT),
+        struct_graded=_response_total(Count('pk'), IntegerField(), GRADED_STRUCT),
+        pending_struct_count=_response_total(Count('pk'), IntegerField(), Q(question__type='STRUCT', teacher_mark__isnull=True)),
+        max_marks=_response_total(Sum('question__marks'), FloatField()),
+    )
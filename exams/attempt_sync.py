@@ -0,0 +1,32 @@
+"""Keep the tables derived from an attempt's result in step with it.
+
+A finished attempt feeds several materialized rows: its grading counters,
+its ``ExamScoreEntry`` (rank/percentile), the user's ``LeaderboardEntry``
+rows and ``TopicMastery`` rollup, and the cached per-user topic stats and
+per-exam item analysis. ``sync_attempt_indexes`` refreshes all of them and
+is called wherever a score, status or grading state changes: submit,
+timeout, grading, finalization and the admin's score recalculation.
+"""
+from .attempt_state import sync_grading_counters
+from .item_analysis import invalidate_item_analysis
+from .leaderboard import refresh_user_leaderboard
+from .mastery import refresh_attempt_mastery
+from .models import Attempt
+from .ranking import sync_score_entry
+from .topic_analytics import invalidate_user_topic_stats
+
+
+def sync_attempt_indexes(attempt: Attempt, needs_grading: bool | None = None) -> None:
+    """Refresh derived per-attempt state (grading backlog, score index, leaderboard, topic mastery) after a result change.
+
+    Pass ``needs_grading`` only when the attempt's grading counters were just
+    saved; otherwise they are recounted and written here.
+    """
+    if needs_grading is None:
+        sync_grading_counters(attempt)
+        needs_grading = attempt.pending_struct_count > 0
+    sync_score_entry(attempt, needs_grading=needs_grading)
+    refresh_user_leaderboard(attempt.user_id)
+    refresh_attempt_mastery(attempt)
+    invalidate_user_topic_stats(attempt.user_id)
+    invalidate_item_analysis(attempt.exam_id)
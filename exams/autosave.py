@@ -0,0 +1,201 @@
+"""Batched autosave for in-progress attempts.
+
+The exam client used to call ``save_attempt`` once per answer change, and
+each call rewrote the whole ``Attempt.metadata`` blob to update one flag.
+``apply_autosave`` takes a burst of ``{question_id, answer, time_spent,
+flagged}`` deltas, coalesces them per question (last one wins), writes the
+answers with a single bulk upsert on ``(attempt, question)`` and upserts all
+flag changes into ``AttemptFlag`` with a second one.
+
+Write-behind mode (``EXAMS_AUTOSAVE_WRITE_BEHIND``) keeps drafts out of the
+database while the attempt is in progress: each question of the paper has a
+draft entry in the cache (Redis in production, locmem in development), which
+``resume_attempt`` overlays on the stored responses. ``flush_drafts`` persists
+an attempt's drafts through ``apply_autosave``; it runs synchronously in
+``submit_exam`` and on timeout, and ``manage.py flush_autosave_drafts``
+flushes the rest of the in-progress attempts periodically, so drafts survive
+a crashed web process as long as the cache does. Drafts are only dropped
+after they were written, and a draft rewritten during a flush is kept for
+the next one. Once an attempt is finished its leftover drafts are discarded
+(``discard_drafts``): they must never overwrite graded responses.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from .attempt_state import flagged_map, set_flags
+from .grading import upsert_responses
+from .models import Attempt, Question, Response
+
+
+AUTOSAVE_MAX_ITEMS = 500
+
+AUTOSAVE_UPSERT_FIELDS = ['answer_payload', 'time_spent_seconds', 'flagged_for_review', 'updated_at']
+
+DRAFT_TIMEOUT = 60 * 60 * 24
+
+DRAFT_FIELDS = ('answer', 'time_spent', 'flagged')
+
+
+def _question_id(raw) -> int:
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        raise Http404('No Question matches the given query.')
+
+
+def coalesce_deltas(items) -> dict[int, dict]:
+    """Merge deltas per question id; later keys override earlier ones."""
+    merged: dict[int, dict] = {}
+    for item in items or []:
+        if not isinstance(item, dict):
+            continue
+        qid = _question_id(item.get('question_id'))
+        merged.setdefault(qid, {}).update(item)
+    return merged
+
+
+def _order_ids(attempt: Attempt) -> list[int]:
+    return attempt.question_order
+
+
+def _check_question_ids(attempt: Attempt, question_ids) -> None:
+    known = set(_order_ids(attempt))
+    unknown = [qid for qid in question_ids if qid not in known]
+    if unknown and Question.objects.filter(id__in=unknown).count() != len(unknown):
+        raise Http404('No Question matches the given query.')
+
+
+def apply_autosave(attempt: Attempt, items) -> dict:
+    """Persist a batch of autosave deltas for ``attempt``.
+
+    Deltas without an ``answer`` key only update the flag. Raises ``Http404``
+    if any delta references a question that does not exist.
+    Returns ``{'saved': n_answers, 'flagged': {qid: bool}}`` for the batch.
+    """
+    deltas = coalesce_deltas(items)
+    if not deltas:
+        return {'saved': 0, 'flagged': {}}
+    _check_question_ids(attempt, deltas.keys())
+
+    # Answers saved without a flag keep the question's current flag on the response row.
+    unflagged = [qid for qid, d in deltas.items() if 'answer' in d and 'flagged' not in d]
+    current_flags = flagged_map(attempt, unflagged) if unflagged else {}
+    rows = []
+    flags = {}
+    for qid, delta in deltas.items():
+        if 'flagged' in delta:
+            flags[qid] = bool(delta.get('flagged'))
+        if 'answer' not in delta:
+            continue
+        rows.append(
+            Response(
+                attempt=attempt,
+                question_id=qid,
+                answer_payload=delta.get('answer'),
+                time_spent_seconds=int(delta.get('time_spent', 0) or 0),
+                flagged_for_review=bool(delta.get('flagged', current_flags.get(str(qid), False))),
+            )
+        )
+
+    with transaction.atomic():
+        upsert_responses(rows, fields=AUTOSAVE_UPSERT_FIELDS)
+        set_flags(attempt, flags)
+    flags = {str(qid): v for qid, v in flags.items()}
+    return {'saved': len(rows), 'flagged': flags}
+
+
+def write_behind_enabled() -> bool:
+    return bool(getattr(settings, 'EXAMS_AUTOSAVE_WRITE_BEHIND', False))
+
+
+def _draft_key(attempt_id, question_id) -> str:
+    return f'exams:autosave_draft:{attempt_id}:{question_id}'
+
+
+def buffer_autosave(attempt: Attempt, items) -> dict:
+    """Write-behind variant of ``apply_autosave``.
+
+    Deltas for questions on the attempt's paper are merged into their cached
+    drafts; anything else (e.g. a question without a stored order) is written
+    through to the database.
+    """
+    deltas = coalesce_deltas(items)
+    order = set(_order_ids(attempt))
+    buffered = {qid: d for qid, d in deltas.items() if qid in order}
+    direct = [d for qid, d in deltas.items() if qid not in order]
+
+    keys = {qid: _draft_key(attempt.id, qid) for qid in buffered}
+    existing = cache.get_many(keys.values()) if keys else {}
+    rev = time.time_ns()
+    drafts = {}
+    flags = {}
+    for qid, delta in buffered.items():
+        draft = dict(existing.get(keys[qid]) or {'question_id': qid})
+        draft.update({f: delta[f] for f in DRAFT_FIELDS if f in delta})
+        draft['rev'] = rev
+        drafts[keys[qid]] = draft
+        if 'flagged' in delta:
+            flags[str(qid)] = bool(delta['flagged'])
+    if drafts:
+        cache.set_many(drafts, DRAFT_TIMEOUT)
+
+    written = apply_autosave(attempt, direct) if direct else {'saved': 0, 'flagged': {}}
+    return {'saved': written['saved'], 'buffered': len(drafts), 'flagged': {**written['flagged'], **flags}}
+
+
+def save_autosave(attempt: Attempt, items) -> dict:
+    """Entry point for the autosave views: buffer or write through depending on settings."""
+    if write_behind_enabled():
+        return buffer_autosave(attempt, items)
+    return apply_autosave(attempt, items)
+
+
+def pending_drafts(attempt: Attempt) -> dict[int, dict]:
+    """Cached drafts of ``attempt`` by question id (one cache round trip)."""
+    keys = {_draft_key(attempt.id, qid): qid for qid in _order_ids(attempt)}
+    if not keys:
+        return {}
+    return {keys[k]: v for k, v in cache.get_many(keys.keys()).items()}
+
+
+def flush_drafts(attempt: Attempt) -> int:
+    """Persist the cached drafts of ``attempt``. Returns the number of drafts flushed."""
+    drafts = pending_drafts(attempt)
+    if not drafts:
+        return 0
+    apply_autosave(attempt, [{f: d[f] for f in ('question_id', *DRAFT_FIELDS) if f in d} for d in drafts.values()])
+
+    # Drop only drafts that were not rewritten while this flush ran.
+    keys = {_draft_key(attempt.id, qid): qid for qid in drafts}
+    current = cache.get_many(keys.keys())
+    cache.delete_many([k for k, v in current.items() if v.get('rev') == drafts[keys[k]].get('rev')])
+    return len(drafts)
+
+
+def discard_drafts(attempt: Attempt) -> None:
+    """Drop every cached draft of a finished ``attempt`` without writing it."""
+    keys = [_draft_key(attempt.id, qid) for qid in _order_ids(attempt)]
+    if keys:
+        cache.delete_many(keys)
+
+
+def flush_pending_attempts() -> tuple[int, int]:
+    """Flush drafts of in-progress attempts.
+
+    Finished attempts are skipped: their responses are graded and
+    ``discard_drafts`` already dropped whatever was buffered after the final flush.
+    Returns ``(attempts_with_drafts, drafts_flushed)``.
+    """
+    attempts = Attempt.objects.filter(status='inprogress').only('id', 'question_order_packed')
+    touched = 0
+    flushed = 0
+    for attempt in attempts.iterator(chunk_size=500):
+        n = flush_drafts(attempt)
+        if n:
+            touched += 1
+            flushed += n
+    return touched, flushed
@@ -0,0 +1,222 @@
+"""Query-count and latency benchmarks for the hot REST endpoints.
+
+Seeds a realistic volume with ``exams.demo_data.seed_volume`` and calls each
+endpoint ``BENCH_ROUNDS`` times through ``APIClient``. The first call is the
+cold-cache path. Each benchmark checks two things:
+
+- the worst round's query count stays within ``QUERY_BUDGETS``
+- p95 stays within ``BENCH_TOLERANCE`` times the p95 recorded in the local
+  JSON baseline
+
+The baseline lives at ``BENCH_BASELINE`` (default
+``.benchmarks/api_baseline.json``, git-ignored). It is written on the first
+run and whenever a new endpoint appears. Rewrite it on purpose with
+``BENCH_UPDATE_BASELINE=1``. Timings are only compared against a baseline
+recorded with the same volume.
+
+Volume knobs: ``BENCH_STUDENTS``, ``BENCH_EXAMS``, ``BENCH_QUESTIONS`` and
+``BENCH_ATTEMPTS`` (attempts per student). For example::
+
+    BENCH_STUDENTS=500 BENCH_ATTEMPTS=10 DEBUG=1 python -m pytest exams/benchmark_tests.py -s
+"""
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .demo_data import seed_volume
+from .models import Attempt
+
+
+def _env_int(name, default):
+    return int(os.getenv(name) or default)
+
+
+VOLUME = {
+    'students': _env_int('BENCH_STUDENTS', 30),
+    'exams': _env_int('BENCH_EXAMS', 8),
+    'questions_per_exam': _env_int('BENCH_QUESTIONS', 20),
+    'attempts_per_student': _env_int('BENCH_ATTEMPTS', 4),
+}
+ROUNDS = _env_int('BENCH_ROUNDS', 15)
+TOLERANCE = float(os.getenv('BENCH_TOLERANCE') or 2.0)
+# Absolute slack so sub-millisecond endpoints do not fail on scheduler noise.
+SLACK_SECONDS = 0.005
+BASELINE_PATH = Path(os.getenv('BENCH_BASELINE') or Path(settings.BASE_DIR) / '.benchmarks' / 'api_baseline.json')
+UPDATE_BASELINE = os.getenv('BENCH_UPDATE_BASELINE') == '1'
+
+# Worst-round (cold cache) query count per endpoint; must not grow with volume.
+QUERY_BUDGETS = {
+    'start_exam': 10,
+    'submit_exam': 22,
+    'save_attempt': 6,
+    'leaderboard': 2,
+    'my_attempts': 1,
+    'exam_list': 1,
+    'curriculum_tree': 4,
+    'review_attempt': 7,
+    'attempt_list': 1,
+    'grading_queue': 1,
+}
+
+
+def _load_baseline() -> dict:
+    try:
+        return json.loads(BASELINE_PATH.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+class ApiBenchmarkTests(TestCase):
+    results: dict = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        data = seed_volume(**VOLUME)
+        cls.exams = data['exams']
+        cls.teacher = data['teacher']
+        cls.student = data['students'][0]
+        cls.attempt = Attempt.objects.filter(user=cls.student).order_by('id').first()
+        User.objects.bulk_create([User(username=f'bench_fresh_{i}') for i in range(ROUNDS)])
+        cls.fresh = list(User.objects.filter(username__startswith='bench_fresh_').order_by('id'))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        baseline = _load_baseline()
+        same_volume = baseline.get('volume') == VOLUME
+        if UPDATE_BASELINE or not same_volume:
+            baseline = {'volume': VOLUME, 'endpoints': {}}
+        missing = {k: v for k, v in cls.results.items() if k not in baseline['endpoints']}
+        if UPDATE_BASELINE or missing:
+            baseline['endpoints'].update(cls.results if UPDATE_BASELINE else missing)
+            BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def _bench(self, name, call, prepare=None, ok=(200,)):
+        timings, worst_queries = [], 0
+        for i in range(ROUNDS):
+            args = (prepare(i) or ()) if prepare else ()
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                res = call(*args)
+                timings.append(time.perf_counter() - started)
+            self.assertIn(res.status_code, ok, getattr(res, 'data', res))
+            worst_queries = max(worst_queries, len(ctx.captured_queries))
+
+        timings.sort()
+        p50 = statistics.median(timings)
+        p95 = timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))]
+        result = {'p50_ms': round(p50 * 1000, 3), 'p95_ms': round(p95 * 1000, 3), 'queries': worst_queries}
+
+        self.assertLessEqual(worst_queries, QUERY_BUDGETS[name], f'{name}: {worst_queries} queries')
+        baseline = _load_baseline()
+        previous = baseline.get('endpoints', {}).get(name) if baseline.get('volume') == VOLUME else None
+        if previous and not UPDATE_BASELINE:
+            limit_ms = previous['p95_ms'] * TOLERANCE + SLACK_SECONDS * 1000
+            self.assertLessEqual(
+                result['p95_ms'], limit_ms,
+                f"{name}: p95 {result['p95_ms']}ms exceeds baseline {previous['p95_ms']}ms x{TOLERANCE}",
+            )
+        type(self).results[name] = result
+        return result
+
+    def _as(self, user):
+        self.client.force_authenticate(user)
+
+    def test_start_exam(self):
+        exam = self.exams[0]
+        self._bench(
+            'start_exam',
+            lambda: self.client.post(f'/api/exams/{exam.id}/start/', {}, format='json'),
+            prepare=lambda i: self._as(self.fresh[i]),
+        )
+
+    def test_submit_exam(self):
+        exam = self.exams[1]
+        questions = list(exam.exam_questions.select_related('question').values_list('question_id', 'question__type'))
+
+        def prepare(i):
+            self._as(self.fresh[i])
+            attempt = Attempt.objects.create(user=self.fresh[i], exam=exam, started_at=timezone.now())
+            attempt.question_order = [qid for qid, _ in questions]
+            attempt.save(update_fields=['question_order_packed'])
+            return (attempt,)
+
+        payload = [
+            {'question_id': qid, 'answer_payload': {'answers': ['A']} if qtype == 'MCQ' else {'text': 'Because.'}}
+            for qid, qtype in questions
+        ]
+        self._bench(
+            'submit_exam',
+            lambda attempt: self.client.post(
+                f'/api/exams/{exam.id}/submit/', {'attempt_id': attempt.id, 'responses': payload}, format='json'
+            ),
+            prepare=prepare,
+        )
+
+    def test_save_attempt(self):
+        exam = self.exams[2]
+        question_ids = list(exam.exam_questions.values_list('question_id', flat=True))
+        attempt = Attempt.objects.create(user=self.fresh[0], exam=exam, started_at=timezone.now())
+        self._as(self.fresh[0])
+        self._bench(
+            'save_attempt',
+            lambda i: self.client.post(
+                f'/api/attempts/{attempt.id}/save/',
+                {'question_id': question_ids[i % len(question_ids)], 'answer': 'A', 'time_spent': 5},
+                format='json',
+            ),
+            prepare=lambda i: (i,),
+        )
+
+    def test_leaderboard(self):
+        self._as(self.student)
+        self._bench('leaderboard', lambda: self.client.get('/api/leaderboard/'))
+
+    def test_my_attempts(self):
+        self._as(self.student)
+        self._bench('my_attempts', lambda: self.client.get('/api/users/me/attempts/'))
+
+    def test_exam_list(self):
+        self._as(self.student)
+        self._bench('exam_list', lambda: self.client.get('/api/exams/'))
+
+    def test_curriculum_tree(self):
+        curriculum_id = self.exams[0].topic.curriculum_id
+        self._bench('curriculum_tree', lambda: self.client.get(f'/api/curriculums/{curriculum_id}/tree/'))
+
+    def test_review_attempt(self):
+        self._as(self.student)
+        self._bench('review_attempt', lambda: self.client.get(f'/api/attempts/{self.attempt.id}/review/'))
+
+    def test_attempt_list(self):
+        self._as(self.teacher)
+        self._bench('attempt_list', lambda: self.client.get('/api/attempts/', {'completed': 1}))
+
+    def test_grading_queue(self):
+        self._as(self.teacher)
+        self.assertGreater(Attempt.objects.filter(pending_struct_count__gt=0).count(), 10)
+        # A page costs one query whatever its size or depth in the backlog.
+        for size in (1, 10):
+            res = self.client.get('/api/grading/queue/', {'page_size': size})
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(res.data['next'])
+            self.assertEqual(len(ctx.captured_queries), QUERY_BUDGETS['grading_queue'])
+        self._bench('grading_queue', lambda: self.client.get('/api/grading/queue/', {'page_size': 50}))
+
@@ -0,0 +1,77 @@
+"""Version counters for cache entries that are invalidated by bumping a number.
+
+Cached data is stored under ``versioned_key(name)`` (``<name>:v<version>``).
+``bump_version(name)`` moves the counter on, so entries built under an older
+version are never read again and expire on their own timeout. Counters are
+seeded with ``time.time_ns()``, so a counter recreated after an eviction
+never matches older entries.
+
+Counters only coordinate processes that share the cache. With a
+per-process backend (``LocMemCache``, the default when ``REDIS_URL`` is not
+set) a bump only reaches the worker that made the write. ``cache_timeout``
+therefore caps entry lifetimes at ``LOCAL_CACHE_MAX_TIMEOUT`` seconds on
+such backends, so every other worker picks up the change within that bound.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+DEFAULT_LOCAL_CACHE_MAX_TIMEOUT = 60
+
+
+def _counter_key(name) -> str:
+    return f'{name}:version'
+
+
+def version(name) -> int:
+    """Current version of ``name``, creating the counter on first use."""
+    key = _counter_key(name)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    return value
+
+
+def versions(names) -> list[int]:
+    """Current versions of several counters in one cache round trip."""
+    keys = [_counter_key(n) for n in names]
+    current = cache.get_many(keys)
+    for key in keys:
+        if key not in current:
+            cache.add(key, time.time_ns(), None)
+            current[key] = cache.get(key)
+    return [current[k] for k in keys]
+
+
+def versioned_key(name) -> str:
+    return f'{name}:v{version(name)}'
+
+
+def bump_version(name) -> None:
+    key = _counter_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # No counter yet (or evicted).
+        cache.set(key, time.time_ns(), None)
+
+
+def cache_is_shared() -> bool:
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    return backend not in LOCAL_CACHE_BACKENDS
+
+
+def cache_timeout(timeout):
+    """``timeout`` for a versioned entry, capped when workers do not share the cache."""
+    if cache_is_shared():
+        return timeout
+    cap = getattr(settings, 'LOCAL_CACHE_MAX_TIMEOUT', DEFAULT_LOCAL_CACHE_MAX_TIMEOUT)
+    return cap if timeout is None else min(timeout, cap)
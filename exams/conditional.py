@@ -0,0 +1,62 @@
+"""HTTP validators (ETag/Last-Modified) for read-mostly API responses.
+
+Views compute a cheap validator before building the body and return
+``not_modified(...)`` when the client's ``If-None-Match`` still matches, so a
+polling client gets a bodyless 304 and the server skips serialization. The
+rules come from ``django.utils.cache.get_conditional_response``.
+
+Only the ETag decides. ``Last-Modified`` is sent for information, but
+``If-Modified-Since`` is not honoured: several payloads contain values that
+change without touching any ``updated_at``, such as an exam's
+``attempts_count`` or an attempt's rank.
+
+ETags are weak, because the same resource is rendered as JSON or as the
+browsable API. The accepted renderer's format is part of every tag.
+Responses also get ``Cache-Control: private, no-cache``, so browsers always
+revalidate instead of guessing a freshness lifetime from ``Last-Modified``.
+"""
+import hashlib
+from datetime import datetime
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+
+
+def make_etag(request, *parts) -> str:
+    renderer = getattr(request, 'accepted_renderer', None)
+    raw = repr((getattr(renderer, 'format', ''), *parts))
+    return f'W/"{hashlib.md5(raw.encode("utf-8")).hexdigest()}"'
+
+
+def content_etag(request, content: bytes) -> str:
+    return make_etag(request, hashlib.md5(content).hexdigest())
+
+
+def timestamp(value) -> int | None:
+    """Seconds since the epoch for a datetime or ISO string (``None`` passes through)."""
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    return int(value.timestamp()) if isinstance(value, datetime) else None
+
+
+def latest_timestamp(*values) -> int | None:
+    stamps = [t for t in (timestamp(v) for v in values) if t is not None]
+    return max(stamps) if stamps else None
+
+
+def set_validators(response, etag, last_modified=None):
+    """Attach ``ETag``/``Last-Modified`` (epoch seconds) and ask clients to revalidate."""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def not_modified(request, etag, last_modified=None):
+    """The 304 (or 412) response for the request's conditional headers, else ``None``."""
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        return None
+    return set_validators(response, etag, last_modified)
@@ -0,0 +1,193 @@
+"""Demo content shared by ``seed_demo_data`` and the API benchmark suite.
+
+``seed_volume`` builds a configurable volume of the same kind of data as
+``seed_demo_data``: students, exams of MCQ and structured questions, and
+finished attempts with responses. It writes with ``bulk_create`` and then
+rebuilds the derived indexes (exam score index, leaderboard, topic mastery),
+so the result looks like data that went through the normal submit path.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from .api_cache import SCOPES, invalidate_api_cache
+from .attempt_state import GRADING_COUNTER_FIELDS
+from .leaderboard import rebuild_leaderboard
+from .mastery import rebuild_topic_mastery
+from .models import Attempt, Curriculum, Exam, ExamQuestion, Question, Response, Topic, pack_question_order, statement_hash
+from .ranking import rebuild_score_index
+from .topic_tree import invalidate_topic_trees
+
+
+TOPICS = [
+    ('Mechanics', 'Forces, motion, energy, and momentum'),
+    ('Waves', 'Wave properties, sound, and light'),
+    ('Thermal Physics', 'Temperature, heat transfer, and thermodynamics'),
+    ('Electricity & Magnetism', 'Circuits, fields, and electromagnetic induction'),
+    ('Atomic Physics', 'Atomic structure and nuclear physics'),
+    ('Quantum Physics', 'Wave-particle duality and quantum phenomena'),
+    ('Relativity', 'Special relativity and spacetime'),
+    ('Astrophysics', 'Stars, galaxies, and cosmology'),
+]
+
+MCQ_TEMPLATES = [
+    {
+        'statement': 'What is the SI unit of force?',
+        'choices': {'A': 'Newton', 'B': 'Joule', 'C': 'Watt', 'D': 'Pascal'},
+        'correct': ['A'],
+    },
+    {
+        'statement': 'Which law states that F = ma?',
+        'choices': {'A': "Newton's Second Law", 'B': "Newton's First Law", 'C': "Newton's Third Law", 'D': "Law of Gravitation"},
+        'correct': ['A'],
+    },
+    {
+        'statement': 'What is the speed of light in vacuum?',
+        'choices': {'A': '3×10^8 m/s', 'B': '3×10^6 m/s', 'C': '3×10^10 m/s', 'D': '3×10^5 m/s'},
+        'correct': ['A'],
+    },
+]
+
+DESCRIPTIVE_TEMPLATES = [
+    'Explain the principle of conservation of energy with an example.',
+    'Derive the equation for kinetic energy starting from Newton\'s second law.',
+    'Describe the photoelectric effect and explain Einstein\'s explanation.',
+    'Explain how a transformer works and derive the transformer equation.',
+]
+
+MCQ_SHARE = 0.7
+
+
+def seed_topics() -> list[Topic]:
+    curriculum, _ = Curriculum.objects.get_or_create(name='IB', defaults={'order': 0})
+    topics = []
+    for name, description in TOPICS:
+        topic, _ = Topic.objects.get_or_create(
+            name=name,
+            defaults={'description': description, 'curriculum': curriculum}
+        )
+        if topic.curriculum_id is None:
+            topic.curriculum = curriculum
+            topic.save(update_fields=['curriculum'])
+        topics.append(topic)
+    return topics
+
+
+def _question(rng, topic, is_mcq, number) -> Question:
+    if is_mcq:
+        template = rng.choice(MCQ_TEMPLATES)
+        statement = f"{template['statement']} ({number})"
+        fields = dict(type='MCQ', choices=template['choices'], correct_answers=template['correct'],
+                      difficulty='medium', marks=1, estimated_time=120)
+    else:
+        statement = f'{rng.choice(DESCRIPTIVE_TEMPLATES)} ({number})'
+        fields = dict(type='STRUCT', difficulty='hard', marks=5, estimated_time=600)
+    return Question(topic=topic, statement=statement, content_hash=statement_hash(statement), **fields)
+
+
+def seed_volume(students=20, exams=5, questions_per_exam=10, attempts_per_student=3, prefix='bench', seed=0) -> dict:
+    """Create a volume of demo data; returns the created teacher, students and exams.
+
+    Each student gets ``attempts_per_student`` finished attempts on distinct
+    exams, with MCQ answers ~70% correct and half of the structured answers
+    teacher-marked (the rest wait in the grading queue).
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+    topics = seed_topics()
+    now = timezone.now()
+    password = make_password('Demo@123')
+
+    teacher = User.objects.create(
+        username=f'{prefix}_teacher', email=f'{prefix}_teacher@demo.com', password=password,
+        role='TEACHER', is_staff=True,
+    )
+    User.objects.bulk_create([
+        User(username=f'{prefix}_student_{i}', email=f'{prefix}_student_{i}@demo.com', password=password,
+             grade=('IB1', 'IB2')[i % 2])
+        for i in range(students)
+    ])
+    student_list = list(User.objects.filter(username__startswith=f'{prefix}_student_').order_by('id'))
+
+    Exam.objects.bulk_create([
+        Exam(title=f'{prefix} exam {i}', topic=topics[i % len(topics)], duration_seconds=3600,
+             total_marks=0, created_by=teacher, is_active=True)
+        for i in range(exams)
+    ])
+    exam_list = list(Exam.objects.filter(title__startswith=f'{prefix} exam ').select_related('topic').order_by('id'))
+
+    mcq_count = int(round(questions_per_exam * MCQ_SHARE))
+    pending = [
+        (exam.id, _question(rng, exam.topic, n < mcq_count, f'{exam.id}.{n}'))
+        for exam in exam_list
+        for n in range(questions_per_exam)
+    ]
+    Question.objects.bulk_create([q for _, q in pending], batch_size=1000)
+    if any(q.pk is None for _, q in pending):  # backends that do not return ids from bulk inserts
+        ids = dict(Question.objects.filter(statement__in=[q.statement for _, q in pending]).values_list('statement', 'id'))
+        for _, q in pending:
+            q.pk = ids[q.statement]
+    questions_by_exam = {}
+    for exam_id, q in pending:
+        questions_by_exam.setdefault(exam_id, []).append(q)
+    ExamQuestion.objects.bulk_create(
+        [
+            ExamQuestion(exam_id=exam_id, question=q, order=n + 1)
+            for exam_id, qs in questions_by_exam.items()
+            for n, q in enumerate(qs)
+        ],
+        batch_size=1000,
+    )
+    for exam in exam_list:
+        exam.total_marks = sum(q.marks for q in questions_by_exam[exam.id])
+    Exam.objects.bulk_update(exam_list, ['total_marks'])
+
+    attempts = []
+    for student in student_list:
+        for exam in rng.sample(exam_list, min(attempts_per_student, len(exam_list))):
+            started = now - timedelta(days=rng.randint(1, 30), seconds=rng.randint(0, 86400))
+            attempts.append(Attempt(
+                user=student, exam=exam, started_at=started,
+                finished_at=started + timedelta(seconds=exam.duration_seconds // 2),
+                duration_seconds=exam.duration_seconds // 2, status='submitted',
+                question_order_packed=pack_question_order(q.id for q in questions_by_exam[exam.id]),
+            ))
+    Attempt.objects.bulk_create(attempts, batch_size=1000)
+    if any(a.pk is None for a in attempts):  # backends that do not return ids from bulk inserts
+        attempts = list(Attempt.objects.filter(user__in=student_list).select_related('exam'))
+
+    responses = []
+    for attempt in attempts:
+        earned = 0.0
+        attempt.struct_total = attempt.struct_graded = 0
+        for q in questions_by_exam[attempt.exam_id]:
+            if q.type == 'MCQ':
+                correct = rng.random() < 0.7
+                earned += q.marks if correct else 0.0
+                responses.append(Response(attempt=attempt, question=q, correct=correct,
+                                          answer_payload={'answers': ['A' if correct else 'B']},
+                                          time_spent_seconds=rng.randint(30, 120)))
+            else:
+                mark = float(rng.randint(0, int(q.marks))) if rng.random() < 0.5 else None
+                earned += mark or 0.0
+                attempt.struct_total += 1
+                attempt.struct_graded += mark is not None
+                responses.append(Response(attempt=attempt, question=q, teacher_mark=mark,
+                                          answer_payload={'text': 'Worked answer.'},
+                                          time_spent_seconds=rng.randint(120, 600)))
+        attempt.pending_struct_count = attempt.struct_total - attempt.struct_graded
+        attempt.max_marks = float(attempt.exam.total_marks)
+        attempt.total_score = earned
+        attempt.percentage = round(100.0 * earned / attempt.exam.total_marks, 2) if attempt.exam.total_marks else 0.0
+    Response.objects.bulk_create(responses, batch_size=1000)
+    Attempt.objects.bulk_update(attempts, ['total_score', 'percentage', *GRADING_COUNTER_FIELDS], batch_size=1000)
+
+    rebuild_score_index([e.id for e in exam_list])
+    rebuild_leaderboard()
+    rebuild_topic_mastery([s.id for s in student_list])
+    invalidate_topic_trees()
+    invalidate_api_cache(*SCOPES)
+    return {'teacher': teacher, 'students': student_list, 'exams': exam_list, 'attempts': len(attempts)}
@@ -0,0 +1,129 @@
+"""Streaming CSV/XLSX export of attempts and responses for teachers.
+
+Rows come straight from ``values_list(...).iterator(chunk_size=...)`` so no
+model instances or serializers are built and memory stays flat regardless
+of row count. CSV is written row by row into a ``StreamingHttpResponse``;
+XLSX uses an openpyxl write-only workbook (rows are flushed to a temporary
+file as they are appended) which is then streamed back with ``FileResponse``.
+"""
+import csv
+import json
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Attempt, Response
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+ATTEMPT_FIELDS = [
+    ('attempt_id', 'id'),
+    ('user_id', 'user_id'),
+    ('username', 'user__username'),
+    ('email', 'user__email'),
+    ('exam_id', 'exam_id'),
+    ('exam_title', 'exam__title'),
+    ('topic', 'exam__topic__name'),
+    ('curriculum', 'exam__topic__curriculum__name'),
+    ('status', 'status'),
+    ('started_at', 'started_at'),
+    ('finished_at', 'finished_at'),
+    ('duration_seconds', 'duration_seconds'),
+    ('total_score', 'total_score'),
+    ('percentage', 'percentage'),
+    ('rank', 'rank'),
+    ('percentile', 'percentile'),
+]
+
+RESPONSE_FIELDS = [
+    ('response_id', 'id'),
+    ('attempt_id', 'attempt_id'),
+    ('user_id', 'attempt__user_id'),
+    ('username', 'attempt__user__username'),
+    ('exam_id', 'attempt__exam_id'),
+    ('exam_title', 'attempt__exam__title'),
+    ('question_id', 'question_id'),
+    ('question_type', 'question__type'),
+    ('question_topic', 'question__topic__name'),
+    ('answer', 'answer_payload'),
+    ('correct', 'correct'),
+    ('teacher_mark', 'teacher_mark'),
+    ('time_spent_seconds', 'time_spent_seconds'),
+    ('flagged_for_review', 'flagged_for_review'),
+]
+
+EXPORT_KINDS = {'attempts': ATTEMPT_FIELDS, 'responses': RESPONSE_FIELDS}
+
+
+def export_queryset(kind: str, exam_id=None, curriculum_id=None, start=None, end=None):
+    """``values_list`` queryset for ``kind`` filtered by exam, curriculum and attempt start window."""
+    if kind == 'responses':
+        qs, prefix, order = Response.objects.all(), 'attempt__', ('attempt_id', 'id')
+    else:
+        qs, prefix, order = Attempt.objects.all(), '', ('id',)
+    filters = {}
+    if exam_id:
+        filters[f'{prefix}exam_id'] = exam_id
+    if curriculum_id:
+        filters[f'{prefix}exam__topic__curriculum_id'] = curriculum_id
+    if start is not None:
+        filters[f'{prefix}started_at__gte'] = start
+    if end is not None:
+        filters[f'{prefix}started_at__lt'] = end
+    return qs.filter(**filters).order_by(*order).values_list(*[f for _, f in EXPORT_KINDS[kind]])
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def export_rows(kind: str, queryset):
+    """Header row, then one list per record, read in chunks."""
+    yield [header for header, _ in EXPORT_KINDS[kind]]
+    for record in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [_cell(v) for v in record]
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value (for ``csv.writer``)."""
+
+    def write(self, value):
+        return value
+
+
+def _filename(kind: str, ext: str) -> str:
+    return f"{kind}_export_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{ext}"
+
+
+def csv_response(kind: str, queryset) -> StreamingHttpResponse:
+    writer = csv.writer(_Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in export_rows(kind, queryset)),
+        content_type='text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{_filename(kind, "csv")}"'
+    return response
+
+
+def xlsx_response(kind: str, queryset) -> FileResponse:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=kind)
+    for row in export_rows(kind, queryset):
+        sheet.append(row)
+    # Spooled to disk past 8 MB; FileResponse streams it back in blocks and closes it.
+    buffer = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    workbook.save(buffer)
+    buffer.seek(0)
+    return FileResponse(buffer, as_attachment=True, filename=_filename(kind, 'xlsx'), content_type=XLSX_CONTENT_TYPE)
@@ -0,0 +1,199 @@
+"""Set-based auto-grading for exam submissions.
+
+``submit_exam`` used to fetch each question and upsert each response one at a
+time. The helpers here grade MCQ/MULTI/FIB answers in memory against a
+compiled answer key and write all responses with a single bulk upsert on
+``(attempt, question)``.
+
+The answer key for an exam (question id -> normalized keys, marks and type)
+is compiled once and kept in the cache framework. Its cache key carries a
+version derived from the exam's questions (count, ids and latest
+``Question.updated_at``), so editing, attaching or detaching a question
+produces a new key instead of serving a stale one.
+"""
+import hashlib
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count, Max, Sum
+from django.http import Http404
+
+from .metrics import record_cache
+from .models import Question, Response
+
+
+RESPONSE_UPSERT_FIELDS = ['answer_payload', 'correct', 'time_spent_seconds', 'flagged_for_review', 'updated_at']
+
+ANSWER_KEY_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+@dataclass(frozen=True)
+class AnswerKeyEntry:
+    type: str
+    marks: float
+    keys: frozenset
+
+    @classmethod
+    def from_question(cls, q: Question) -> 'AnswerKeyEntry':
+        raw = q.correct_answers if isinstance(q.correct_answers, list) else []
+        if q.type == 'FIB':
+            keys = frozenset(str(a).strip().lower() for a in raw)
+        elif q.type in ('MCQ', 'MULTI'):
+            keys = frozenset(map(str, raw))
+        else:
+            keys = frozenset()
+        return cls(type=q.type, marks=float(q.marks or 0), keys=keys)
+
+    def grade(self, payload) -> bool:
+        """Auto-grade MCQ/MULTI/FIB answers. STRUCT always needs a teacher."""
+        if not isinstance(payload, dict):
+            return False
+        if self.type in ('MCQ', 'MULTI'):
+            return set(map(str, payload.get('answers', []) or [])) == self.keys
+        if self.type == 'FIB':
+            return str(payload.get('answer', '')).strip().lower() in self.keys
+        return False
+
+
+def _exam_question_source(exam):
+    """Questions an attempt of ``exam`` is drawn from (mirrors ``start_exam``)."""
+    linked = Question.objects.filter(examquestion__exam_id=exam.id)
+    stats = linked.aggregate(n=Count('id'), id_sum=Sum('id'), last=Max('updated_at'))
+    if stats['n']:
+        return linked, stats
+    by_topic = Question.objects.filter(topic_id=exam.topic_id, is_active=True)
+    return by_topic, by_topic.aggregate(n=Count('id'), id_sum=Sum('id'), last=Max('updated_at'))
+
+
+def _answer_key_version(stats) -> str:
+    last = stats['last'].isoformat() if stats['last'] else ''
+    raw = f"{stats['n']}:{stats['id_sum'] or 0}:{last}"
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def get_answer_key(exam) -> dict[int, AnswerKeyEntry]:
+    """Return the compiled answer key for ``exam``, building it on a cache miss."""
+    source, stats = _exam_question_source(exam)
+    cache_key = f'exams:answer_key:{exam.id}:{_answer_key_version(stats)}'
+    key = cache.get(cache_key)
+    record_cache(key is not None)
+    if key is None:
+        key = {
+            q.id: AnswerKeyEntry.from_question(q)
+            for q in source.only('id', 'type', 'marks', 'correct_answers')
+        }
+        cache.set(cache_key, key, ANSWER_KEY_CACHE_TIMEOUT)
+    return key
+
+
+def _with_missing_entries(key: dict[int, AnswerKeyEntry], question_ids) -> dict[int, AnswerKeyEntry]:
+    """Extend ``key`` with questions referenced outside the exam's current paper."""
+    missing = [qid for qid in question_ids if qid not in key]
+    if not missing:
+        return key
+    extra = Question.objects.only('id', 'type', 'marks', 'correct_answers').in_bulk(missing)
+    merged = dict(key)
+    merged.update({qid: AnswerKeyEntry.from_question(q) for qid, q in extra.items()})
+    return merged
+
+
+def normalize_answer_payload(q_type: str, item: dict):
+    """Return the stored JSON payload for one submitted response item."""
+    payload = item.get('answer_payload')
+    if payload is None:
+        # Accept alternative client shape: {answer, time_spent, flagged}
+        # Normalize to the stored JSON payload used elsewhere.
+        raw_answer = item.get('answer', None)
+        if q_type in ('MCQ', 'MULTI'):
+            payload = {'answers': [raw_answer] if raw_answer is not None else []}
+        else:
+            payload = {'answer': raw_answer}
+    return payload
+
+
+def upsert_responses(responses: list[Response], fields=None) -> None:
+    """Insert or update responses in one statement keyed on (attempt, question).
+
+    ``fields`` are the columns overwritten on conflict (default: everything
+    ``submit_exam`` grades).
+    """
+    if not responses:
+        return
+    db = Response.objects.db
+    kwargs = {'update_conflicts': True, 'update_fields': fields or RESPONSE_UPSERT_FIELDS}
+    # MySQL upserts on any unique key and rejects an explicit conflict target.
+    if connections[db].features.supports_update_conflicts_with_target:
+        kwargs['unique_fields'] = ['attempt', 'question']
+    Response.objects.bulk_create(responses, **kwargs)
+
+
+def _parse_question_id(raw):
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        raise Http404('No Question matches the given query.')
+
+
+def grade_submission(attempt, items) -> tuple[float, float]:
+    """Grade and persist a list of submitted response items for ``attempt``.
+
+    Items use the ``submit_exam`` shape (``question_id`` plus ``answer_payload``
+    or ``answer``, ``time_spent_seconds``/``time_spent`` and
+    ``flagged_for_review``/``flagged``). When the same question appears more
+    than once, the last item wins. Returns ``(score, total)``.
+
+    Raises ``Http404`` if any referenced question does not exist.
+    """
+    latest: dict[int, dict] = {}
+    for item in items or []:
+        if not isinstance(item, dict):
+            continue
+        latest[_parse_question_id(item.get('question_id'))] = item
+
+    key = _with_missing_entries(get_answer_key(attempt.exam), latest.keys())
+    if any(qid not in key for qid in latest):
+        raise Http404('No Question matches the given query.')
+
+    total = 0
+    score = 0
+    rows = []
+    for qid, item in latest.items():
+        entry = key[qid]
+        payload = normalize_answer_payload(entry.type, item)
+        correct = entry.grade(payload)
+        rows.append(
+            Response(
+                attempt=attempt,
+                question_id=qid,
+                answer_payload=payload,
+                correct=correct,
+                time_spent_seconds=int(item.get('time_spent_seconds', item.get('time_spent', 0)) or 0),
+                flagged_for_review=bool(item.get('flagged_for_review', item.get('flagged', False))),
+            )
+        )
+        total += entry.marks
+        if correct:
+            score += entry.marks
+
+    upsert_responses(rows)
+    return score, total
+
+
+def score_attempt(attempt) -> tuple[float, float]:
+    """Return ``(score, max_marks)`` for the stored responses of ``attempt``.
+
+    Teacher marks override auto-grading; question marks come from the
+    compiled answer key instead of a per-response question join.
+    """
+    rows = list(Response.objects.filter(attempt_id=attempt.id).values_list('question_id', 'correct', 'teacher_mark'))
+    key = _with_missing_entries(get_answer_key(attempt.exam), [qid for qid, _, _ in rows])
+    total_marks = 0.0
+    total_score = 0.0
+    for qid, correct, teacher_mark in rows:
+        entry = key.get(qid)
+        marks = entry.marks if entry else 0.0
+        total_marks += marks
+        q_score = teacher_mark if teacher_mark is not None else (marks if correct else 0.0)
+        total_score += float(q_score or 0.0)
+    return total_score, total_marks
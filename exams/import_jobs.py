@@ -0,0 +1,201 @@
+"""Background spreadsheet imports (``ImportJob``).
+
+Upload views save the file to default storage, create a queued job and
+return straight away; the status endpoint then reports progress. Jobs run on
+whichever worker claims them first:
+
+- an in-process thread pool of ``EXAMS_IMPORT_JOB_THREADS`` threads, fed
+  when the creating transaction commits (the default, so single-service
+  deployments need nothing extra), and/or
+- ``manage.py run_import_jobs --interval N`` as a separate worker process
+  (set ``EXAMS_IMPORT_JOB_THREADS=0`` to leave all jobs to it).
+
+A job is claimed with a conditional UPDATE (queued -> running), so several
+workers never run the same job. A restarted web process loses its pool, so
+each dispatch drains the whole queue and fails stale running jobs, and
+reading the status of a job that looks orphaned does the same. Each ``kind`` has a processor
+``(job, fileobj, progress) -> result`` returning ``created_count``,
+``total_rows`` and per-row ``errors``.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import ImportJob
+from .question_import import IMPORT_BATCH_SIZE, import_questions, upload_reader
+
+
+logger = logging.getLogger(__name__)
+
+IMPORT_JOB_MAX_ERRORS = 500
+
+# Running jobs without a progress update for this long are assumed dead.
+IMPORT_JOB_STALE_AFTER = timedelta(minutes=30)
+
+# Queued jobs not claimed after this long are handed to the pool again.
+IMPORT_JOB_PICKUP_AFTER = timedelta(minutes=1)
+
+PROCESSORS = {
+    'exam_questions': 'exams.import_jobs.process_exam_questions',
+    'quiz_questions': 'quizzes.importer.process_quiz_job',
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def process_exam_questions(job, fileobj, progress) -> dict:
+    options = job.options or {}
+    return import_questions(
+        upload_reader(fileobj, job.original_name),
+        dry_run=bool(options.get('dry_run')),
+        dedupe=bool(options.get('dedupe')),
+        skip_invalid=bool(options.get('skip_invalid')),
+        batch_size=options.get('batch_size') or IMPORT_BATCH_SIZE,
+        progress=progress,
+    )
+
+
+def create_job(kind: str, upload, user=None, options=None) -> ImportJob:
+    """Store ``upload`` and queue a job for it; it is dispatched once the transaction commits."""
+    job = ImportJob(kind=kind, created_by=user, original_name=upload.name or '', options=options or {})
+    job.file.save(upload.name or 'upload', upload, save=False)
+    job.save()
+    transaction.on_commit(lambda: dispatch(job.pk))
+    return job
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.EXAMS_IMPORT_JOB_THREADS, thread_name_prefix='import-job'
+            )
+        return _executor
+
+
+def _run_in_thread() -> None:
+    try:
+        run_pending_jobs()
+    finally:
+        connections.close_all()
+
+
+def dispatch(job_id) -> None:
+    """Hand queued jobs to the in-process pool, if one is configured.
+
+    The pool thread drains the whole queue rather than just ``job_id``, so
+    jobs queued on a process that has since restarted are picked up too.
+    """
+    if getattr(settings, 'EXAMS_IMPORT_JOB_THREADS', 0) > 0:
+        fail_stale_jobs()
+        _pool().submit(_run_in_thread)
+
+
+def resume_if_orphaned(job: ImportJob) -> ImportJob:
+    """Recover ``job`` if the worker that owned it went away; called when its status is read."""
+    now = timezone.now()
+    if job.status == ImportJob.RUNNING and job.updated_at < now - IMPORT_JOB_STALE_AFTER:
+        fail_stale_jobs()
+    elif job.status == ImportJob.QUEUED and job.created_at < now - IMPORT_JOB_PICKUP_AFTER:
+        dispatch(job.pk)
+    else:
+        return job
+    job.refresh_from_db()
+    return job
+
+
+def _claim(job_id) -> bool:
+    now = timezone.now()
+    return bool(
+        ImportJob.objects.filter(pk=job_id, status=ImportJob.QUEUED).update(
+            status=ImportJob.RUNNING, started_at=now, updated_at=now
+        )
+    )
+
+
+def run_job(job_id) -> bool:
+    """Claim and run one queued job. Returns False if another worker got it first."""
+    if not _claim(job_id):
+        return False
+    job = ImportJob.objects.get(pk=job_id)
+    rows = ImportJob.objects.filter(pk=job_id)
+
+    def progress(phase, processed):
+        rows.update(phase=phase, processed_rows=processed, updated_at=timezone.now())
+
+    try:
+        with job.file.open('rb') as fileobj:
+            result = import_string(PROCESSORS[job.kind])(job, fileobj, progress)
+    except Exception as exc:
+        logger.exception('Import job %s failed', job_id)
+        rows.update(status=ImportJob.FAILED, message=str(exc)[:2000], finished_at=timezone.now(), updated_at=timezone.now())
+        return True
+
+    errors = result.pop('errors', [])
+    rows.update(
+        status=ImportJob.SUCCEEDED,
+        phase='',
+        total_rows=result.get('total_rows', 0),
+        processed_rows=result.get('total_rows', 0),
+        created_count=result.get('created_count', 0),
+        error_count=len(errors),
+        errors=errors[:IMPORT_JOB_MAX_ERRORS],
+        result=result,
+        finished_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+    return True
+
+
+def fail_stale_jobs() -> int:
+    """Mark running jobs whose worker went away (no progress for ``IMPORT_JOB_STALE_AFTER``) as failed."""
+    cutoff = timezone.now() - IMPORT_JOB_STALE_AFTER
+    return ImportJob.objects.filter(status=ImportJob.RUNNING, updated_at__lt=cutoff).update(
+        status=ImportJob.FAILED,
+        message='Worker stopped before the import finished; upload the file again.',
+        finished_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+def run_pending_jobs(limit=None) -> int:
+    """Run queued jobs oldest first until none are left (or ``limit`` ran). Returns how many ran."""
+    ran = 0
+    while limit is None or ran < limit:
+        job_id = (
+            ImportJob.objects.filter(status=ImportJob.QUEUED).order_by('created_at', 'id').values_list('id', flat=True).first()
+        )
+        if job_id is None:
+            break
+        if run_job(job_id):
+            ran += 1
+    return ran
+
+
+def job_status(job: ImportJob) -> dict:
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'phase': job.phase,
+        'file': job.original_name,
+        'processed_rows': job.processed_rows,
+        'total_rows': job.total_rows,
+        'created_count': job.created_count,
+        'error_count': job.error_count,
+        'errors': job.errors,
+        'result': job.result,
+        'message': job.message,
+        'finished': job.finished,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
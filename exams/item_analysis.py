@@ -0,0 +1,155 @@
+"""Cohort item analysis for one exam.
+
+Built from a single bulk fetch of the exam's ``Response`` rows of finished
+attempts (plus one query each for attempt percentages and question metadata)
+and computed with pandas/NumPy:
+
+- facility index: mean fraction of the question's marks earned, over all
+  finished attempts (unanswered counts as 0)
+- discrimination index: facility in the top 27% of attempts (by percentage)
+  minus facility in the bottom 27%
+- distractor frequencies: how often each MCQ/MULTI choice was picked
+- mean time-on-question over the responses that recorded one
+- score histogram of attempt percentages in 10-point bins
+
+Results are cached per exam under a version key that
+``attempt_sync.sync_attempt_indexes`` bumps whenever an attempt of the exam is
+submitted, timed out or graded.
+"""
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+
+from .cache_versions import bump_version, cache_timeout, versioned_key
+from .metrics import record_cache
+from .models import Attempt, Question, Response
+from .ranking import FINISHED_STATUSES
+
+
+ITEM_ANALYSIS_CACHE_TIMEOUT = 60 * 60
+
+GROUP_FRACTION = 0.27
+
+HISTOGRAM_BINS = np.linspace(0, 100, 11)
+
+RESPONSE_COLUMNS = ['attempt_id', 'question_id', 'correct', 'teacher_mark', 'time_spent_seconds', 'answer_payload']
+
+
+def _analysis_name(exam_id) -> str:
+    return f'exams:item_analysis:{exam_id}'
+
+
+def invalidate_item_analysis(exam_id) -> None:
+    bump_version(_analysis_name(exam_id))
+
+
+def _chosen(payload) -> list[str]:
+    """Choices picked in a stored answer payload (``{'answers': [...]}``, ``{'answer': x}`` or raw)."""
+    if isinstance(payload, dict):
+        payload = payload.get('answers', payload.get('answer'))
+    if payload is None or payload == '':
+        return []
+    if isinstance(payload, (list, tuple)):
+        return [str(p) for p in payload]
+    return [str(payload)]
+
+
+def fetch_exam_data(exam_id) -> tuple[pd.DataFrame, pd.Series, dict]:
+    """Return ``(responses, attempt_percentages, questions)`` for finished attempts of ``exam_id``."""
+    attempts = dict(
+        Attempt.objects.filter(exam_id=exam_id, status__in=FINISHED_STATUSES).values_list('id', 'percentage')
+    )
+    rows = list(
+        Response.objects.filter(attempt__exam_id=exam_id, attempt__status__in=FINISHED_STATUSES)
+        .order_by()
+        .values_list(*RESPONSE_COLUMNS)
+    )
+    responses = pd.DataFrame.from_records(rows, columns=RESPONSE_COLUMNS)
+    question_ids = responses['question_id'].unique().tolist() if len(responses) else []
+    questions = {
+        q['id']: q
+        for q in Question.objects.filter(id__in=question_ids).values('id', 'type', 'marks', 'statement', 'correct_answers')
+    }
+    return responses, pd.Series(attempts, dtype='float64'), questions
+
+
+def compute_item_stats(responses: pd.DataFrame, percentages: pd.Series, questions: dict) -> dict:
+    """Item statistics from response rows (``RESPONSE_COLUMNS``) and attempt percentages by id."""
+    n_attempts = int(len(percentages))
+    counts, edges = np.histogram(np.clip(percentages.to_numpy(dtype=float), 0, 100), bins=HISTOGRAM_BINS)
+    summary = {
+        'attempts': n_attempts,
+        'responses': int(len(responses)),
+        'score_mean': round(float(percentages.mean()), 2) if n_attempts else 0.0,
+        'score_median': round(float(percentages.median()), 2) if n_attempts else 0.0,
+        'score_std': round(float(percentages.std(ddof=0)), 2) if n_attempts else 0.0,
+        'score_histogram': {'bins': edges.tolist(), 'counts': counts.tolist()},
+        'questions': [],
+    }
+    if responses.empty or not n_attempts:
+        return summary
+
+    qids = responses['question_id'].to_numpy()
+    marks = pd.Series({qid: float(q['marks'] or 0) for qid, q in questions.items()}, dtype='float64')
+    q_marks = marks.reindex(qids).fillna(0.0).to_numpy()
+    teacher = pd.to_numeric(responses['teacher_mark'], errors='coerce').to_numpy(dtype=float)
+    auto = np.where(responses['correct'].to_numpy(dtype=bool), q_marks, 0.0)
+    earned = np.where(np.isnan(teacher), auto, teacher)
+    fraction = np.divide(earned, q_marks, out=np.zeros_like(earned), where=q_marks > 0)
+
+    # attempts x questions matrix of earned fractions; unanswered counts as 0.
+    matrix = (
+        pd.DataFrame({'attempt_id': responses['attempt_id'], 'question_id': qids, 'fraction': fraction})
+        .pivot_table(index='attempt_id', columns='question_id', values='fraction', aggfunc='last')
+        .reindex(percentages.index)
+        .fillna(0.0)
+    )
+    facility = matrix.mean(axis=0)
+
+    order = percentages.sort_values(kind='mergesort').index
+    group = max(1, int(round(GROUP_FRACTION * n_attempts)))
+    discrimination = matrix.loc[order[-group:]].mean(axis=0) - matrix.loc[order[:group]].mean(axis=0)
+
+    spent = responses['time_spent_seconds'].astype(float)
+    mean_time = spent.where(spent > 0).groupby(responses['question_id']).mean()
+    answered = responses.groupby('question_id').size()
+
+    choice_pairs = [
+        (qid, choice)
+        for qid, payload in zip(qids, responses['answer_payload'])
+        if questions.get(qid, {}).get('type') in ('MCQ', 'MULTI')
+        for choice in _chosen(payload)
+    ]
+    distractors: dict = {}
+    if choice_pairs:
+        picked = pd.DataFrame(choice_pairs, columns=['question_id', 'choice']).value_counts()
+        for (qid, choice), n in picked.items():
+            distractors.setdefault(qid, {})[choice] = int(n)
+
+    for qid in facility.index:
+        q = questions.get(qid, {})
+        t = mean_time.get(qid)
+        summary['questions'].append({
+            'question_id': int(qid),
+            'type': q.get('type'),
+            'statement': (q.get('statement') or '')[:200],
+            'marks': float(marks.get(qid, 0.0)),
+            'responses': int(answered.get(qid, 0)),
+            'facility': round(float(facility[qid]), 4),
+            'discrimination': round(float(discrimination[qid]), 4),
+            'mean_time_seconds': None if t is None or np.isnan(t) else round(float(t), 2),
+            'correct_choices': [str(c) for c in q.get('correct_answers') or []] if q.get('type') in ('MCQ', 'MULTI') else [],
+            'choice_counts': dict(sorted(distractors.get(qid, {}).items())),
+        })
+    return summary
+
+
+def exam_item_analysis(exam) -> dict:
+    """Cached item analysis for ``exam``."""
+    key = versioned_key(_analysis_name(exam.id))
+    data = cache.get(key)
+    record_cache(data is not None)
+    if data is None:
+        data = {'exam_id': exam.id, 'exam_title': exam.title, **compute_item_stats(*fetch_exam_data(exam.id))}
+        cache.set(key, data, cache_timeout(ITEM_ANALYSIS_CACHE_TIMEOUT))
+    return data
@@ -0,0 +1,148 @@
+"""Materialized leaderboard (``LeaderboardEntry``) per period.
+
+One row per (user, period) holds the user's standing over the period's window:
+tests completed, average percentage and total score of finished attempts that
+no longer wait for STRUCT grading. Rows are refreshed per user whenever one of
+their attempts is submitted, timed out, graded or finalized, which costs one
+aggregate over that user's attempts. Rolling windows (daily/weekly) also need
+attempts to fall out as time passes; ``manage.py rebuild_leaderboard``
+recomputes every row and stores the positional ``rank``. The deploy configs
+schedule it every 15 minutes (DEPLOYMENT.md, "Scheduled jobs").
+
+The public endpoint reads the top rows straight from the
+``(time_period, -avg_percentage, -tests_completed, -total_score, user)`` index.
+"""
+from datetime import timedelta
+
+from django.db import connections
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from .models import Attempt, LeaderboardEntry
+from .ranking import FINISHED_STATUSES
+
+
+PERIODS = ('daily', 'weekly', 'all-time')
+
+LEADERBOARD_ORDERING = ('-avg_percentage', '-tests_completed', '-total_score', 'user_id')
+
+UPSERT_FIELDS = ['avg_percentage', 'tests_completed', 'total_score', 'score_metric', 'updated_at']
+
+
+def normalize_period(raw) -> str:
+    raw = (raw or 'weekly').strip().lower()
+    if raw in ('all-time', 'all_time', 'alltime', 'all'):
+        return 'all-time'
+    if raw in ('daily', 'today'):
+        return 'daily'
+    return 'weekly'
+
+
+def period_start(period: str, now=None):
+    now = now or timezone.now()
+    if period == 'daily':
+        return now - timedelta(days=1)
+    if period == 'weekly':
+        return now - timedelta(days=7)
+    return None
+
+
+def _window_q(period: str, now) -> Q:
+    start = period_start(period, now)
+    return Q(finished_at__gte=start) if start is not None else Q()
+
+
+def ranked_attempts():
+    """Finished attempts that count towards the leaderboard."""
+    return Attempt.objects.filter(status__in=FINISHED_STATUSES, pending_struct_count=0)
+
+
+def _upsert(entries: list[LeaderboardEntry]) -> None:
+    if not entries:
+        return
+    kwargs = {'update_conflicts': True, 'update_fields': UPSERT_FIELDS}
+    if connections[LeaderboardEntry.objects.db].features.supports_update_conflicts_with_target:
+        kwargs['unique_fields'] = ['user', 'time_period']
+    LeaderboardEntry.objects.bulk_create(entries, **kwargs)
+
+
+def _entry(user_id, period, tests, avg_pct, total) -> LeaderboardEntry:
+    return LeaderboardEntry(
+        user_id=user_id,
+        time_period=period,
+        tests_completed=int(tests or 0),
+        avg_percentage=float(avg_pct or 0.0),
+        total_score=float(total or 0.0),
+        score_metric=float(total or 0.0),
+    )
+
+
+def refresh_user_leaderboard(user_id, now=None) -> None:
+    """Recompute every period row for one user from their attempts."""
+    if not user_id:
+        return
+    now = now or timezone.now()
+    aggregates = {}
+    for period in PERIODS:
+        window = _window_q(period, now)
+        aggregates[f'{period}_tests'] = Count('id', filter=window)
+        aggregates[f'{period}_avg'] = Avg('percentage', filter=window)
+        aggregates[f'{period}_total'] = Sum('total_score', filter=window)
+    stats = ranked_attempts().filter(user_id=user_id).aggregate(**aggregates)
+
+    keep = []
+    for period in PERIODS:
+        if stats[f'{period}_tests']:
+            keep.append(
+                _entry(user_id, period, stats[f'{period}_tests'], stats[f'{period}_avg'], stats[f'{period}_total'])
+            )
+    _upsert(keep)
+    LeaderboardEntry.objects.filter(user_id=user_id).exclude(time_period__in=[e.time_period for e in keep]).delete()
+
+
+def rebuild_leaderboard(periods=None, now=None) -> dict:
+    """Recompute all rows (and stored ranks) for ``periods``. Returns row counts."""
+    now = now or timezone.now()
+    written = {}
+    for period in periods or PERIODS:
+        grouped = (
+            ranked_attempts()
+            .filter(_window_q(period, now))
+            .values('user_id')
+            .annotate(tests=Count('id'), avg_pct=Avg('percentage'), total=Sum('total_score'))
+        )
+        entries = [_entry(row['user_id'], period, row['tests'], row['avg_pct'], row['total']) for row in grouped]
+        entries.sort(key=lambda e: (-e.avg_percentage, -e.tests_completed, -e.total_score, e.user_id))
+        for idx, e in enumerate(entries, start=1):
+            e.rank = idx
+        LeaderboardEntry.objects.filter(time_period=period).delete()
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+        written[period] = len(entries)
+    return written
+
+
+def leaderboard_rows(period: str, limit: int = 100):
+    return list(
+        LeaderboardEntry.objects.filter(time_period=period, tests_completed__gt=0)
+        .select_related('user')
+        .order_by(*LEADERBOARD_ORDERING)[:limit]
+    )
+
+
+def user_position(period: str, user_id) -> tuple[LeaderboardEntry | None, int | None]:
+    """Return the caller's row and live rank for ``period``."""
+    own = LeaderboardEntry.objects.filter(time_period=period, user_id=user_id, tests_completed__gt=0).first()
+    if own is None:
+        return None, None
+    better = LeaderboardEntry.objects.filter(time_period=period, tests_completed__gt=0).filter(
+        Q(avg_percentage__gt=own.avg_percentage)
+        | Q(avg_percentage=own.avg_percentage, tests_completed__gt=own.tests_completed)
+        | Q(avg_percentage=own.avg_percentage, tests_completed=own.tests_completed, total_score__gt=own.total_score)
+        | Q(
+            avg_percentage=own.avg_percentage,
+            tests_completed=own.tests_completed,
+            total_score=own.total_score,
+            user_id__lt=own.user_id,
+        )
+    ).count()
+    return own, better + 1
@@ -7,7 +7,9 @@ from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from django.utils.dateparse import parse_date
 
+from exams.api_cache import invalidate_api_cache
 from exams.models import Curriculum, Topic
+from exams.topic_tree import invalidate_topic_trees
 
 
 @dataclass(frozen=True)
@@ -150,3 +152,7 @@ class Command(BaseCommand):
             if archive_topics:
                 topic_updated = Topic.objects.filter(curriculum_id__in=curriculum_ids, is_active=True).update(is_active=False)
                 self.stdout.write(self.style.SUCCESS(f"Archived {topic_updated} topic(s) under those curriculums."))
+
+        # Queryset update() sends no model signals.
+        invalidate_topic_trees()
+        invalidate_api_cache('curriculum', 'topic')
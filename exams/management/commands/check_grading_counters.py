@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from exams.attempt_state import grading_counter_mismatches, repair_grading_counters
+from exams.leaderboard import refresh_user_leaderboard
+from exams.models import Attempt
+from exams.ranking import rebuild_score_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Check the grading counters of finished attempts (struct_total, struct_graded, '
+        'pending_struct_count, max_marks) against their responses; optionally repair them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Recount mismatched attempts and refresh their rank/leaderboard rows.')
+
+    def handle(self, *args, **options):
+        mismatches = grading_counter_mismatches()
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('All grading counters are consistent.'))
+            return
+
+        for attempt_id, stored, expected in mismatches:
+            self.stdout.write(f'Attempt {attempt_id}: stored {stored}, expected {expected}')
+
+        if not options['fix']:
+            raise CommandError(f'{len(mismatches)} attempt(s) with stale grading counters. Re-run with --fix to repair.')
+
+        attempt_ids = [attempt_id for attempt_id, _, _ in mismatches]
+        with transaction.atomic():
+            fixed = repair_grading_counters(attempt_ids)
+            affected = Attempt.objects.filter(pk__in=attempt_ids)
+            rebuild_score_index(sorted(set(affected.values_list('exam_id', flat=True))))
+            for user_id in sorted(set(affected.values_list('user_id', flat=True))):
+                refresh_user_leaderboard(user_id)
+        self.stdout.write(self.style.SUCCESS(f'Repaired {fixed} attempt(s).'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from exams.topic_tree import repair_topic_paths, topic_path_mismatches
+
+
+class Command(BaseCommand):
+    help = 'Check Topic.path (materialized ancestor path) against parent links; optionally repair it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rewrite mismatched paths.')
+
+    def handle(self, *args, **options):
+        mismatches = topic_path_mismatches()
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('All topic paths are consistent.'))
+            return
+
+        for topic_id, stored, expected in mismatches:
+            self.stdout.write(f'Topic {topic_id}: stored {stored!r}, expected {expected!r}')
+
+        if not options['fix']:
+            raise CommandError(f'{len(mismatches)} topic path(s) out of date. Re-run with --fix to repair.')
+
+        with transaction.atomic():
+            fixed = repair_topic_paths(mismatches)
+        self.stdout.write(self.style.SUCCESS(f'Repaired {fixed} topic path(s).'))
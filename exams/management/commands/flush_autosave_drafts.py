@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from exams.autosave import flush_pending_attempts
+
+
+class Command(BaseCommand):
+    help = (
+        'Persist write-behind autosave drafts (EXAMS_AUTOSAVE_WRITE_BEHIND) from the cache to Response rows. '
+        'Run from cron, or with --interval as a long-running worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running and flush every N seconds (default: flush once and exit).',
+        )
+
+    def handle(self, *args, **options):
+        interval = options.get('interval') or 0
+        while True:
+            attempts, drafts = flush_pending_attempts()
+            self.stdout.write(f'Flushed {drafts} draft(s) from {attempts} attempt(s).')
+            if interval <= 0:
+                return
+            time.sleep(interval)
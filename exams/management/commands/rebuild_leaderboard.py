@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from exams.leaderboard import PERIODS, rebuild_leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the materialized leaderboard (LeaderboardEntry) from finished attempts. '
+        'Run every 15 minutes (--period daily --period weekly) so attempts roll out of the daily/weekly windows; '
+        'see DEPLOYMENT.md, "Scheduled jobs".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--period',
+            action='append',
+            choices=PERIODS,
+            default=None,
+            help='Period to rebuild (repeatable). Default: all periods.',
+        )
+
+    def handle(self, *args, **options):
+        periods = options.get('period') or list(PERIODS)
+        if not periods:
+            raise CommandError('No periods selected.')
+        with transaction.atomic():
+            written = rebuild_leaderboard(periods)
+        for period, count in written.items():
+            self.stdout.write(self.style.SUCCESS(f'{period}: {count} row(s)'))
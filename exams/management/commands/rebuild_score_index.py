@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from exams.ranking import rebuild_score_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-exam rank/percentile index (ExamScoreEntry) from finished attempts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--exam',
+            type=str,
+            default=None,
+            help='Comma-separated exam IDs to rebuild (default: all exams).',
+        )
+
+    def handle(self, *args, **options):
+        exam_ids = None
+        raw = (options.get('exam') or '').strip()
+        if raw:
+            try:
+                exam_ids = sorted({int(p) for p in raw.split(',') if p.strip()})
+            except ValueError as exc:
+                raise CommandError(f"Invalid --exam value '{raw}'") from exc
+
+        with transaction.atomic():
+            written = rebuild_score_index(exam_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt score index: {written} entr{"y" if written == 1 else "ies"}.'))
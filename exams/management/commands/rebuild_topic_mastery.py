@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from exams.mastery import rebuild_topic_mastery
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user topic mastery rollup (TopicMastery) from finished attempts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            default=None,
+            help='Comma-separated user IDs to rebuild (default: all users).',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        raw = (options.get('user') or '').strip()
+        if raw:
+            try:
+                user_ids = sorted({int(p) for p in raw.split(',') if p.strip()})
+            except ValueError as exc:
+                raise CommandError(f"Invalid --user value '{raw}'") from exc
+
+        with transaction.atomic():
+            written = rebuild_topic_mastery(user_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt topic mastery: {written} row(s).'))
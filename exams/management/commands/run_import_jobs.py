@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from exams.import_jobs import fail_stale_jobs, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued spreadsheet import jobs (ImportJob). '
+        'Run from cron, or with --interval as a long-running worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running and poll for queued jobs every N seconds (default: drain the queue once and exit).',
+        )
+
+    def handle(self, *args, **options):
+        interval = options.get('interval') or 0
+        while True:
+            stale = fail_stale_jobs()
+            if stale:
+                self.stdout.write(f'Marked {stale} stale job(s) as failed.')
+            ran = run_pending_jobs()
+            if ran or interval <= 0:
+                self.stdout.write(f'Ran {ran} import job(s).')
+            if interval <= 0:
+                return
+            time.sleep(interval)
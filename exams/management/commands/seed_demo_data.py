@@ -1,11 +1,12 @@
 """
 Management command to seed the database with sample data for demo purposes.
-Usage: python manage.py seed_demo_data
+Usage: python manage.py seed_demo_data [--students N --exams N --questions N --attempts N]
 """
 
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
-from exams.models import Curriculum, Topic, Exam, Question, Attempt, Response
+from exams.demo_data import DESCRIPTIVE_TEMPLATES, MCQ_TEMPLATES, seed_topics, seed_volume
+from exams.models import Topic, Exam, Question, Attempt, Response
 from accounts.models import CustomUser
 import random
 from datetime import datetime, timedelta
@@ -15,6 +16,14 @@ User = get_user_model()
 class Command(BaseCommand):
     help = 'Seeds database with demo data for client presentation'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=0,
+                            help='Also create this many extra students with bulk volume data (see exams.demo_data).')
+        parser.add_argument('--exams', type=int, default=20, help='Exams in the volume data.')
+        parser.add_argument('--questions', type=int, default=20, help='Questions per exam in the volume data.')
+        parser.add_argument('--attempts', type=int, default=5, help='Finished attempts per volume student.')
+        parser.add_argument('--prefix', default='volume', help='Username/exam title prefix for the volume data.')
+
     def handle(self, *args, **kwargs):
         self.stdout.write(self.style.SUCCESS('🌱 Starting database seeding...'))
         
@@ -29,6 +38,19 @@ class Command(BaseCommand):
         
         # Create sample attempts
         self.create_sample_attempts()
+
+        if kwargs.get('students'):
+            data = seed_volume(
+                students=kwargs['students'],
+                exams=kwargs['exams'],
+                questions_per_exam=kwargs['questions'],
+                attempts_per_student=kwargs['attempts'],
+                prefix=kwargs['prefix'],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"   ✓ Created volume data: {len(data['students'])} students, {len(data['exams'])} exams, "
+                f"{data['attempts']} attempts"
+            ))
         
         self.stdout.write(self.style.SUCCESS('✅ Database seeded successfully!'))
         self.stdout.write(self.style.SUCCESS('\n📋 Demo Accounts:'))
@@ -88,29 +110,9 @@ class Command(BaseCommand):
     def create_topics(self):
         self.stdout.write('Creating topics...')
 
-        curriculum, _ = Curriculum.objects.get_or_create(name='IB', defaults={'order': 0})
+        topics = seed_topics()
         
-        topics_data = [
-            ('Mechanics', 'Forces, motion, energy, and momentum'),
-            ('Waves', 'Wave properties, sound, and light'),
-            ('Thermal Physics', 'Temperature, heat transfer, and thermodynamics'),
-            ('Electricity & Magnetism', 'Circuits, fields, and electromagnetic induction'),
-            ('Atomic Physics', 'Atomic structure and nuclear physics'),
-            ('Quantum Physics', 'Wave-particle duality and quantum phenomena'),
-            ('Relativity', 'Special relativity and spacetime'),
-            ('Astrophysics', 'Stars, galaxies, and cosmology'),
-        ]
-        
-        for name, description in topics_data:
-            topic, _ = Topic.objects.get_or_create(
-                name=name,
-                defaults={'description': description, 'curriculum': curriculum}
-            )
-            if topic.curriculum_id is None:
-                topic.curriculum = curriculum
-                topic.save(update_fields=['curriculum'])
-        
-        self.stdout.write(self.style.SUCCESS(f'   ✓ Created {len(topics_data)} topics'))
+        self.stdout.write(self.style.SUCCESS(f'   ✓ Created {len(topics)} topics'))
 
     def create_exams_and_questions(self):
         self.stdout.write('Creating exams and questions...')
@@ -151,25 +153,7 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(f'   ✓ Created {len(exam_configs)} exams'))
 
     def create_mcq_question(self, exam, topic, number):
-        mcq_templates = [
-            {
-                'statement': 'What is the SI unit of force?',
-                'choices': {'A': 'Newton', 'B': 'Joule', 'C': 'Watt', 'D': 'Pascal'},
-                'correct': ['A'],
-            },
-            {
-                'statement': 'Which law states that F = ma?',
-                'choices': {'A': "Newton's Second Law", 'B': "Newton's First Law", 'C': "Newton's Third Law", 'D': "Law of Gravitation"},
-                'correct': ['A'],
-            },
-            {
-                'statement': 'What is the speed of light in vacuum?',
-                'choices': {'A': '3×10^8 m/s', 'B': '3×10^6 m/s', 'C': '3×10^10 m/s', 'D': '3×10^5 m/s'},
-                'correct': ['A'],
-            },
-        ]
-        
-        template = random.choice(mcq_templates)
+        template = random.choice(MCQ_TEMPLATES)
         
         question = Question.objects.create(
             topic=topic,
@@ -191,17 +175,10 @@ class Command(BaseCommand):
         )
 
     def create_descriptive_question(self, exam, topic, number):
-        descriptive_templates = [
-            'Explain the principle of conservation of energy with an example.',
-            'Derive the equation for kinetic energy starting from Newton\'s second law.',
-            'Describe the photoelectric effect and explain Einstein\'s explanation.',
-            'Explain how a transformer works and derive the transformer equation.',
-        ]
-        
         question = Question.objects.create(
             topic=topic,
             type='STRUCT',
-            statement=random.choice(descriptive_templates),
+            statement=random.choice(DESCRIPTIVE_TEMPLATES),
             difficulty='hard',
             marks=5,
             estimated_time=600
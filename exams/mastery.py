@@ -0,0 +1,141 @@
+"""Per-user topic mastery rollup (``TopicMastery``).
+
+One row per (user, topic) with counters over the user's finished
+(submitted/timed-out) attempts: attempts touching the topic, responses,
+correct responses, marks earned/possible, time spent and last activity.
+Marks earned use the teacher mark when present, otherwise the question's
+marks for a correct auto-graded answer.
+
+``refresh_attempt_mastery`` recomputes the rows for the topics an attempt
+touched, from the user's responses in those topics, so re-grading or
+finalizing an attempt never double counts. It runs from
+``attempt_sync.sync_attempt_indexes`` inside the submit/finalize
+transaction. Dashboards then read O(topics) rows instead of scanning
+responses.
+"""
+from django.db import connections
+from django.db.models import Case, Count, F, FloatField, Max, Q, Sum, When
+from django.db.models.functions import Coalesce
+
+from .models import Response, TopicMastery
+from .ranking import FINISHED_STATUSES
+
+
+UPSERT_FIELDS = [
+    'attempts', 'attempted', 'correct', 'marks_earned', 'marks_possible',
+    'time_spent_seconds', 'last_activity', 'updated_at',
+]
+
+
+def _finished_responses():
+    return Response.objects.filter(attempt__status__in=FINISHED_STATUSES)
+
+
+def _grouped(responses):
+    earned = Case(
+        When(teacher_mark__isnull=False, then=F('teacher_mark')),
+        When(correct=True, then=F('question__marks')),
+        default=0.0,
+        output_field=FloatField(),
+    )
+    return (
+        responses.order_by()
+        .values('attempt__user_id', 'question__topic_id')
+        .annotate(
+            n_attempts=Count('attempt_id', distinct=True),
+            n_attempted=Count('id'),
+            n_correct=Count('id', filter=Q(correct=True)),
+            earned=Coalesce(Sum(earned), 0.0),
+            possible=Coalesce(Sum('question__marks'), 0.0),
+            spent=Coalesce(Sum('time_spent_seconds'), 0),
+            last=Max('attempt__finished_at'),
+        )
+    )
+
+
+def _entry(row) -> TopicMastery:
+    return TopicMastery(
+        user_id=row['attempt__user_id'],
+        topic_id=row['question__topic_id'],
+        attempts=row['n_attempts'],
+        attempted=row['n_attempted'],
+        correct=row['n_correct'],
+        marks_earned=float(row['earned'] or 0.0),
+        marks_possible=float(row['possible'] or 0.0),
+        time_spent_seconds=int(row['spent'] or 0),
+        last_activity=row['last'],
+    )
+
+
+def _upsert(entries: list[TopicMastery]) -> None:
+    if not entries:
+        return
+    kwargs = {'update_conflicts': True, 'update_fields': UPSERT_FIELDS}
+    if connections[TopicMastery.objects.db].features.supports_update_conflicts_with_target:
+        kwargs['unique_fields'] = ['user', 'topic']
+    TopicMastery.objects.bulk_create(entries, **kwargs)
+
+
+def refresh_user_topics(user_id, topic_ids) -> None:
+    """Recompute ``user_id``'s rows for ``topic_ids``; drop rows left empty."""
+    topic_ids = set(topic_ids)
+    if not user_id or not topic_ids:
+        return
+    rows = _grouped(_finished_responses().filter(attempt__user_id=user_id, question__topic_id__in=topic_ids))
+    entries = [_entry(r) for r in rows]
+    _upsert(entries)
+    kept = {e.topic_id for e in entries}
+    if topic_ids - kept:
+        TopicMastery.objects.filter(user_id=user_id, topic_id__in=topic_ids - kept).delete()
+
+
+def refresh_attempt_mastery(attempt) -> None:
+    topic_ids = Response.objects.filter(attempt_id=attempt.id).values_list('question__topic_id', flat=True).distinct()
+    refresh_user_topics(attempt.user_id, list(topic_ids))
+
+
+def rebuild_topic_mastery(user_ids=None) -> int:
+    """Recreate rollup rows from responses. Returns the number of rows written."""
+    existing = TopicMastery.objects.all()
+    responses = _finished_responses()
+    if user_ids:
+        existing = existing.filter(user_id__in=user_ids)
+        responses = responses.filter(attempt__user_id__in=user_ids)
+    existing.delete()
+    entries = [_entry(r) for r in _grouped(responses)]
+    TopicMastery.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+def user_mastery(user_id):
+    """The user's rollup rows, strongest topics first."""
+    return (
+        TopicMastery.objects.filter(user_id=user_id, attempted__gt=0)
+        .select_related('topic')
+        .order_by('-marks_earned', 'topic_id')
+    )
+
+
+def top_topics(limit=10) -> list[dict]:
+    """Topics with the most finished attempts across users, then best score."""
+    rows = (
+        TopicMastery.objects.filter(topic__is_active=True)
+        .values('topic_id', 'topic__name')
+        .annotate(
+            n_attempts=Sum('attempts'),
+            earned=Sum('marks_earned'),
+            possible=Sum('marks_possible'),
+        )
+        .filter(n_attempts__gt=0)
+    )
+    data = [
+        {
+            'id': r['topic_id'],
+            'name': r['topic__name'],
+            'attempts': int(r['n_attempts'] or 0),
+            'avg_score': round(100.0 * r['earned'] / r['possible'], 2) if r['possible'] else 0.0,
+        }
+        for r in rows
+    ]
+    data.sort(key=lambda t: (-t['attempts'], -t['avg_score'], t['id']))
+    return data[:limit]
@@ -0,0 +1,252 @@
+"""Opt-in per-request instrumentation (``REQUEST_METRICS_ENABLED``).
+
+``RequestMetricsMiddleware`` records, for every request, the resolved view
+name, wall time, number and duration of SQL queries (through a database
+``execute_wrapper``), cache hits/misses and the response size. Each request:
+
+- gets a ``Server-Timing`` header (visible in the browser's network panel)
+- is logged as one JSON line on the ``exams.metrics`` logger
+- is added to an in-process registry that keeps counters and a rolling window
+  of the last ``REQUEST_METRICS_WINDOW`` samples per view for percentiles
+
+``/api/metrics/`` (admins only) renders the registry in the Prometheus text
+format. The registry is per process, so with several workers each scrape
+sees the worker that served it.
+
+When the setting is off the middleware raises ``MiddlewareNotUsed`` and
+Django drops it from the chain, so the only remaining cost is the
+``record_cache`` calls in the cache helpers, which return straight away when
+no request is being measured.
+"""
+import json
+import logging
+import math
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 1024
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+UNRESOLVED_VIEW = '<unresolved>'
+
+_current = ContextVar('exams_request_stats', default=None)
+
+
+class RequestStats:
+    """Counters for the request being served; also the SQL ``execute_wrapper``."""
+
+    __slots__ = ('queries', 'db_seconds', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+def record_cache(hit: bool) -> None:
+    """Count a cache lookup against the current request (no-op when not measuring)."""
+    stats = _current.get()
+    if stats is None:
+        return
+    if hit:
+        stats.cache_hits += 1
+    else:
+        stats.cache_misses += 1
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return math.nan
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+class _ViewMetrics:
+    def __init__(self, window):
+        self.durations = deque(maxlen=window)
+        self.queries = deque(maxlen=window)
+        self.db_durations = deque(maxlen=window)
+        self.responses = Counter()  # (method, status) -> count
+        self.count = 0
+        self.duration_sum = 0.0
+        self.query_sum = 0
+        self.db_duration_sum = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    """Thread-safe per-view aggregates for the Prometheus endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views = {}
+
+    def observe(self, view, method, status, seconds, stats: RequestStats, size) -> None:
+        with self._lock:
+            m = self._views.get(view)
+            if m is None:
+                m = self._views[view] = _ViewMetrics(getattr(settings, 'REQUEST_METRICS_WINDOW', DEFAULT_WINDOW))
+            m.durations.append(seconds)
+            m.queries.append(stats.queries)
+            m.db_durations.append(stats.db_seconds)
+            m.responses[(method, str(status))] += 1
+            m.count += 1
+            m.duration_sum += seconds
+            m.query_sum += stats.queries
+            m.db_duration_sum += stats.db_seconds
+            m.cache_hits += stats.cache_hits
+            m.cache_misses += stats.cache_misses
+            m.response_bytes += size or 0
+
+    def snapshot(self) -> dict:
+        """``{view: {...}}`` with counters and sorted copies of the rolling windows."""
+        with self._lock:
+            return {
+                view: {
+                    'count': m.count,
+                    'responses': dict(m.responses),
+                    'durations': sorted(m.durations),
+                    'queries': sorted(m.queries),
+                    'db_durations': sorted(m.db_durations),
+                    'duration_sum': m.duration_sum,
+                    'query_sum': m.query_sum,
+                    'db_duration_sum': m.db_duration_sum,
+                    'cache_hits': m.cache_hits,
+                    'cache_misses': m.cache_misses,
+                    'response_bytes': m.response_bytes,
+                }
+                for view, m in self._views.items()
+            }
+
+
+registry = MetricsRegistry()
+
+
+def _label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value) -> str:
+    if isinstance(value, float) and math.isnan(value):
+        return 'NaN'
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snapshot=None) -> str:
+    """The registry in the Prometheus text exposition format (0.0.4)."""
+    snapshot = registry.snapshot() if snapshot is None else snapshot
+    views = sorted(snapshot.items())
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    family('mentara_http_requests_total', 'counter', 'Requests handled, by view, method and status.')
+    for view, m in views:
+        for (method, status), count in sorted(m['responses'].items()):
+            lines.append(
+                f'mentara_http_requests_total{{view="{_label(view)}",method="{method}",status="{status}"}} {count}'
+            )
+
+    for name, window, total, help_text in (
+        ('mentara_http_request_duration_seconds', 'durations', 'duration_sum', 'Wall time per request.'),
+        ('mentara_http_request_db_queries', 'queries', 'query_sum', 'SQL queries per request.'),
+        ('mentara_http_request_db_duration_seconds', 'db_durations', 'db_duration_sum', 'Time spent in SQL per request.'),
+    ):
+        family(name, 'summary', f'{help_text} Quantiles cover the most recent requests of each view.')
+        for view, m in views:
+            label = f'view="{_label(view)}"'
+            for q in QUANTILES:
+                lines.append(f'{name}{{{label},quantile="{q}"}} {_number(_quantile(m[window], q))}')
+            lines.append(f'{name}_sum{{{label}}} {_number(m[total])}')
+            lines.append(f'{name}_count{{{label}}} {m["count"]}')
+
+    for name, field, kind, help_text in (
+        ('mentara_http_response_size_bytes_total', 'response_bytes', 'counter', 'Response body bytes sent (streamed bodies excluded).'),
+        ('mentara_cache_hits_total', 'cache_hits', 'counter', 'Application cache lookups that hit.'),
+        ('mentara_cache_misses_total', 'cache_misses', 'counter', 'Application cache lookups that missed.'),
+    ):
+        family(name, kind, help_text)
+        for view, m in views:
+            lines.append(f'{name}{{view="{_label(view)}"}} {m[field]}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def _response_size(response):
+    if getattr(response, 'streaming', False):
+        length = response.get('Content-Length')
+        return int(length) if length and length.isdigit() else None
+    return len(response.content)
+
+
+class RequestMetricsMiddleware:
+    """Measure each request; see the module docstring. Place it first in ``MIDDLEWARE``."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else '') or UNRESOLVED_VIEW
+        size = _response_size(response)
+        response['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, '
+            f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+            f'cache;desc="{stats.cache_hits} hits {stats.cache_misses} misses"'
+        )
+        record = {
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'db_queries': stats.queries,
+            'db_ms': round(stats.db_seconds * 1000, 2),
+            'cache_hits': stats.cache_hits,
+            'cache_misses': stats.cache_misses,
+            'response_bytes': size,
+        }
+        logger.info(json.dumps(record, sort_keys=True), extra={'request_metrics': record})
+        registry.observe(view, request.method, response.status_code, elapsed, stats, size)
+        return response
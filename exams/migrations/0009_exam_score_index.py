@@ -0,0 +1,61 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def backfill_score_index(apps, schema_editor):
+    Attempt = apps.get_model('exams', 'Attempt')
+    Response = apps.get_model('exams', 'Response')
+    ExamScoreEntry = apps.get_model('exams', 'ExamScoreEntry')
+    pending = Response.objects.filter(
+        attempt_id=OuterRef('pk'),
+        question__type='STRUCT',
+        teacher_mark__isnull=True,
+    )
+    attempts = (
+        Attempt.objects.filter(status__in=['submitted', 'timedout'])
+        .annotate(pending_struct=Exists(pending))
+        .iterator(chunk_size=2000)
+    )
+    ExamScoreEntry.objects.bulk_create(
+        (
+            ExamScoreEntry(
+                attempt_id=a.id,
+                exam_id=a.exam_id,
+                total_score=float(a.total_score or 0),
+                duration_seconds=int(a.duration_seconds or 0),
+                started_at=a.started_at,
+                needs_grading=bool(a.pending_struct),
+            )
+            for a in attempts
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0008_attempt_assignment_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamScoreEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_score', models.FloatField(default=0)),
+                ('duration_seconds', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField()),
+                ('needs_grading', models.BooleanField(default=False)),
+                ('attempt', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='score_entry', to='exams.attempt')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_entries', to='exams.exam')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['exam', 'needs_grading', '-total_score', 'duration_seconds', 'started_at', 'attempt'], name='exams_score_rank_idx'), models.Index(fields=['exam', 'total_score'], name='exams_score_pct_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_score_index, migrations.RunPython.noop),
+    ]
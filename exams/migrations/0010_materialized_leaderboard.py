@@ -0,0 +1,85 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:59
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Avg, Count, Exists, OuterRef, Sum
+from django.utils import timezone
+
+
+def clear_legacy_entries(apps, schema_editor):
+    # Legacy rows were an unread weekly running sum; they are recomputed below.
+    apps.get_model('exams', 'LeaderboardEntry').objects.all().delete()
+
+
+def backfill_leaderboard(apps, schema_editor):
+    Attempt = apps.get_model('exams', 'Attempt')
+    Response = apps.get_model('exams', 'Response')
+    LeaderboardEntry = apps.get_model('exams', 'LeaderboardEntry')
+    pending = Response.objects.filter(
+        attempt_id=OuterRef('pk'),
+        question__type='STRUCT',
+        teacher_mark__isnull=True,
+    )
+    ranked = (
+        Attempt.objects.filter(status__in=['submitted', 'timedout'])
+        .annotate(needs_grading=Exists(pending))
+        .filter(needs_grading=False)
+    )
+    now = timezone.now()
+    windows = {'daily': now - timedelta(days=1), 'weekly': now - timedelta(days=7), 'all-time': None}
+    for period, start in windows.items():
+        qs = ranked if start is None else ranked.filter(finished_at__gte=start)
+        rows = qs.values('user_id').annotate(tests=Count('id'), avg_pct=Avg('percentage'), total=Sum('total_score'))
+        entries = [
+            LeaderboardEntry(
+                user_id=row['user_id'],
+                time_period=period,
+                tests_completed=row['tests'],
+                avg_percentage=float(row['avg_pct'] or 0.0),
+                total_score=float(row['total'] or 0.0),
+                score_metric=float(row['total'] or 0.0),
+            )
+            for row in rows
+        ]
+        entries.sort(key=lambda e: (-e.avg_percentage, -e.tests_completed, -e.total_score, e.user_id))
+        for idx, e in enumerate(entries, start=1):
+            e.rank = idx
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0009_exam_score_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_legacy_entries, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='avg_percentage',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='tests_completed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='total_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['time_period', '-avg_percentage', '-tests_completed', '-total_score', 'user'], name='exams_leaderboard_order_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('user', 'time_period'), name='exams_leaderboard_user_period_uniq'),
+        ),
+        migrations.RunPython(backfill_leaderboard, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:02
+
+from django.db import migrations, models
+
+
+def backfill_topic_paths(apps, schema_editor):
+    Topic = apps.get_model('exams', 'Topic')
+    parents = dict(Topic.objects.values_list('id', 'parent_id'))
+    paths = {}
+
+    def path_for(topic_id, seen=()):
+        if topic_id in paths:
+            return paths[topic_id]
+        parent_id = parents.get(topic_id)
+        if parent_id is None or parent_id in seen:
+            prefix = '/'
+        else:
+            prefix = path_for(parent_id, seen + (topic_id,))
+        paths[topic_id] = f'{prefix}{topic_id}/'
+        return paths[topic_id]
+
+    topics = []
+    for topic_id in parents:
+        topics.append(Topic(id=topic_id, path=path_for(topic_id)))
+    Topic.objects.bulk_update(topics, ['path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0010_materialized_leaderboard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_topic_paths, migrations.RunPython.noop),
+    ]
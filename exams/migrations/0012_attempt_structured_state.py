@@ -0,0 +1,196 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:08
+
+import struct
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.dateparse import parse_datetime
+
+
+# Keys moved out of Attempt.metadata into columns/tables by this migration.
+MOVED_KEYS = (
+    'question_order', 'flagged', 'teacher_remarks', 'student_uploads',
+    'grades_finalized', 'graded_by', 'graded_at', 'evaluated_pdf', 'evaluated_pdf_url',
+)
+
+
+def _int_list(raw):
+    out = []
+    for item in raw if isinstance(raw, list) else []:
+        try:
+            out.append(int(item))
+        except (TypeError, ValueError):
+            continue
+    return out
+
+
+def split_attempt_metadata(apps, schema_editor):
+    Attempt = apps.get_model('exams', 'Attempt')
+    AttemptFlag = apps.get_model('exams', 'AttemptFlag')
+    AttemptUpload = apps.get_model('exams', 'AttemptUpload')
+    Response = apps.get_model('exams', 'Response')
+    Question = apps.get_model('exams', 'Question')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    question_ids = set(Question.objects.values_list('id', flat=True))
+    user_ids = set(User.objects.values_list('id', flat=True))
+
+    for attempt in Attempt.objects.iterator(chunk_size=500):
+        meta = attempt.metadata if isinstance(attempt.metadata, dict) else {}
+        if not any(k in meta for k in MOVED_KEYS):
+            continue
+
+        order = _int_list(meta.get('question_order'))
+        attempt.question_order_packed = struct.pack(f'<{len(order)}I', *order)
+
+        flags = []
+        for qid, flagged in (meta.get('flagged') or {}).items():
+            if str(qid).isdigit() and int(qid) in question_ids:
+                flags.append(AttemptFlag(attempt_id=attempt.id, question_id=int(qid), flagged=bool(flagged)))
+        AttemptFlag.objects.bulk_create(flags, ignore_conflicts=True)
+
+        uploads = []
+        for u in meta.get('student_uploads') or []:
+            if isinstance(u, dict) and u.get('path'):
+                uploaded_at = parse_datetime(str(u.get('uploaded_at') or '')) or attempt.started_at
+                uploads.append(AttemptUpload(
+                    attempt_id=attempt.id,
+                    name=str(u.get('name') or '')[:255],
+                    path=str(u['path'])[:500],
+                    url=str(u.get('url') or '')[:500],
+                    uploaded_at=uploaded_at,
+                ))
+        AttemptUpload.objects.bulk_create(uploads)
+
+        # Remarks belong to graded responses; keep any without a response in metadata.
+        remarks = {str(k): v for k, v in (meta.get('teacher_remarks') or {}).items()}
+        responses = list(Response.objects.filter(attempt_id=attempt.id, question_id__in=[
+            int(k) for k in remarks if k.isdigit()
+        ]))
+        for r in responses:
+            r.teacher_feedback = str(remarks.pop(str(r.question_id)) or '')
+        Response.objects.bulk_update(responses, ['teacher_feedback'])
+
+        attempt.grades_finalized = meta.get('grades_finalized') is True
+        graded_by = meta.get('graded_by')
+        attempt.graded_by_id = graded_by if graded_by in user_ids else None
+        attempt.graded_at = parse_datetime(str(meta.get('graded_at') or '')) if meta.get('graded_at') else None
+        attempt.evaluated_pdf = str(meta.get('evaluated_pdf') or '')[:500]
+        attempt.evaluated_pdf_url = str(meta.get('evaluated_pdf_url') or '')[:500]
+
+        attempt.metadata = {k: v for k, v in meta.items() if k not in MOVED_KEYS}
+        if remarks:
+            attempt.metadata['teacher_remarks'] = remarks
+        attempt.save(update_fields=[
+            'metadata', 'question_order_packed', 'grades_finalized', 'graded_by',
+            'graded_at', 'evaluated_pdf', 'evaluated_pdf_url',
+        ])
+
+
+def merge_attempt_metadata(apps, schema_editor):
+    Attempt = apps.get_model('exams', 'Attempt')
+    AttemptFlag = apps.get_model('exams', 'AttemptFlag')
+    AttemptUpload = apps.get_model('exams', 'AttemptUpload')
+    Response = apps.get_model('exams', 'Response')
+
+    for attempt in Attempt.objects.iterator(chunk_size=500):
+        meta = dict(attempt.metadata) if isinstance(attempt.metadata, dict) else {}
+        data = bytes(attempt.question_order_packed or b'')
+        if data:
+            meta['question_order'] = list(struct.unpack(f'<{len(data) // 4}I', data))
+        flags = {str(q): f for q, f in AttemptFlag.objects.filter(attempt_id=attempt.id).values_list('question_id', 'flagged')}
+        if flags:
+            meta['flagged'] = flags
+        uploads = [
+            {'name': u.name, 'path': u.path, 'url': u.url or None, 'uploaded_at': u.uploaded_at.isoformat()}
+            for u in AttemptUpload.objects.filter(attempt_id=attempt.id).order_by('uploaded_at', 'id')
+        ]
+        if uploads:
+            meta['student_uploads'] = uploads
+        remarks = dict(
+            (str(q), fb) for q, fb in Response.objects.filter(attempt_id=attempt.id).exclude(teacher_feedback='')
+            .values_list('question_id', 'teacher_feedback')
+        )
+        if remarks:
+            meta['teacher_remarks'] = {**(meta.get('teacher_remarks') or {}), **remarks}
+        if attempt.grades_finalized:
+            meta['grades_finalized'] = True
+            meta['graded_by'] = attempt.graded_by_id
+            meta['graded_at'] = attempt.graded_at.isoformat() if attempt.graded_at else None
+        if attempt.evaluated_pdf:
+            meta['evaluated_pdf'] = attempt.evaluated_pdf
+            meta['evaluated_pdf_url'] = attempt.evaluated_pdf_url or None
+        if meta != attempt.metadata:
+            attempt.metadata = meta
+            attempt.save(update_fields=['metadata'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0011_topic_materialized_path'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='evaluated_pdf',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='evaluated_pdf_url',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='graded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='graded_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='grades_finalized',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='question_order_packed',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.CreateModel(
+            name='AttemptUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('path', models.CharField(max_length=500)),
+                ('url', models.CharField(blank=True, default='', max_length=500)),
+                ('uploaded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='exams.attempt')),
+            ],
+            options={
+                'ordering': ['uploaded_at', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AttemptFlag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('flagged', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flags', to='exams.attempt')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='exams.question')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('attempt', 'question'), name='exams_attempt_flag_uniq')],
+            },
+        ),
+        migrations.RunPython(split_attempt_metadata, merge_attempt_metadata),
+    ]
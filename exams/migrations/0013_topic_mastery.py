@@ -0,0 +1,81 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, F, FloatField, Max, Q, Sum, When
+from django.db.models.functions import Coalesce
+
+
+def backfill_topic_mastery(apps, schema_editor):
+    Response = apps.get_model('exams', 'Response')
+    TopicMastery = apps.get_model('exams', 'TopicMastery')
+    earned = Case(
+        When(teacher_mark__isnull=False, then=F('teacher_mark')),
+        When(correct=True, then=F('question__marks')),
+        default=0.0,
+        output_field=FloatField(),
+    )
+    rows = (
+        Response.objects.filter(attempt__status__in=['submitted', 'timedout'])
+        .order_by()
+        .values('attempt__user_id', 'question__topic_id')
+        .annotate(
+            n_attempts=Count('attempt_id', distinct=True),
+            n_attempted=Count('id'),
+            n_correct=Count('id', filter=Q(correct=True)),
+            earned=Coalesce(Sum(earned), 0.0),
+            possible=Coalesce(Sum('question__marks'), 0.0),
+            spent=Coalesce(Sum('time_spent_seconds'), 0),
+            last=Max('attempt__finished_at'),
+        )
+    )
+    TopicMastery.objects.bulk_create(
+        [
+            TopicMastery(
+                user_id=r['attempt__user_id'],
+                topic_id=r['question__topic_id'],
+                attempts=r['n_attempts'],
+                attempted=r['n_attempted'],
+                correct=r['n_correct'],
+                marks_earned=float(r['earned'] or 0.0),
+                marks_possible=float(r['possible'] or 0.0),
+                time_spent_seconds=int(r['spent'] or 0),
+                last_activity=r['last'],
+            )
+            for r in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0012_attempt_structured_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicMastery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('attempted', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('marks_earned', models.FloatField(default=0)),
+                ('marks_possible', models.FloatField(default=0)),
+                ('time_spent_seconds', models.PositiveIntegerField(default=0)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mastery', to='exams.topic')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_mastery', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['topic', 'user'], name='exams_topic_mastery_topic_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'topic'), name='exams_topic_mastery_user_topic_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_topic_mastery, migrations.RunPython.noop),
+    ]
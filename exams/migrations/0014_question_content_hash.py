@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:16
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_content_hash(apps, schema_editor):
+    Question = apps.get_model('exams', 'Question')
+    batch = []
+    for question in Question.objects.only('id', 'statement').iterator(chunk_size=2000):
+        normalized = ' '.join((question.statement or '').split()).casefold()
+        question.content_hash = hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+        batch.append(question)
+        if len(batch) >= 1000:
+            Question.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    if batch:
+        Question.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0013_topic_mastery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['topic', 'content_hash'], name='exams_quest_topic_i_93565c_idx'),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
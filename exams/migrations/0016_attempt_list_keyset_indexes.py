@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0015_import_job'),
+        ('learning', '0002_learningassignment_archived_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(fields=['-started_at', '-id'], name='exams_attem_started_e9191b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(fields=['user', '-started_at', '-id'], name='exams_attem_user_id_c6ca37_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:35
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_pending_struct_count(apps, schema_editor):
+    Attempt = apps.get_model('exams', 'Attempt')
+    Response = apps.get_model('exams', 'Response')
+    pending = (
+        Response.objects.filter(attempt=OuterRef('pk'), question__type='STRUCT', teacher_mark__isnull=True)
+        .order_by()
+        .values('attempt')
+        .annotate(n=Count('pk'))
+        .values('n')[:1]
+    )
+    Attempt.objects.filter(status__in=['submitted', 'timedout']).update(
+        pending_struct_count=Coalesce(Subquery(pending, output_field=IntegerField()), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0016_attempt_list_keyset_indexes'),
+        ('learning', '0002_learningassignment_archived_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='pending_struct_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(condition=models.Q(('pending_struct_count__gt', 0)), fields=['finished_at', 'id'], name='exams_attempt_grading_queue'),
+        ),
+        migrations.RunPython(backfill_pending_struct_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:41
+
+import django.db.models.expressions
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_grading_counters(apps, schema_editor):
+    Attempt = apps.get_model('exams', 'Attempt')
+    Response = apps.get_model('exams', 'Response')
+
+    def total(expression, output_field, condition=Q()):
+        rows = (
+            Response.objects.filter(condition, attempt=OuterRef('pk'))
+            .order_by()
+            .values('attempt')
+            .annotate(v=expression)
+            .values('v')[:1]
+        )
+        return Coalesce(Subquery(rows, output_field=output_field), Value(0), output_field=output_field)
+
+    Attempt.objects.filter(status__in=['submitted', 'timedout']).update(
+        struct_total=total(Count('pk'), IntegerField(), Q(question__type='STRUCT')),
+        struct_graded=total(Count('pk'), IntegerField(), Q(question__type='STRUCT', teacher_mark__isnull=False)),
+        pending_struct_count=total(Count('pk'), IntegerField(), Q(question__type='STRUCT', teacher_mark__isnull=True)),
+        max_marks=total(Sum('question__marks'), FloatField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0017_attempt_pending_struct_count'),
+        ('learning', '0002_learningassignment_archived_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='max_marks',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='struct_graded',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='struct_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(fields=['user', 'status', 'pending_struct_count'], name='exams_attempt_user_grading'),
+        ),
+        migrations.RunPython(backfill_grading_counters, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attempt',
+            constraint=models.CheckConstraint(condition=models.Q(('pending_struct_count', django.db.models.expressions.CombinedExpression(models.F('struct_total'), '-', models.F('struct_graded')))), name='exams_attempt_pending_struct_count'),
+        ),
+    ]
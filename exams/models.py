@@ -1,5 +1,10 @@
+import hashlib
+import struct
+
 from django.db import models
 from django.conf import settings
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
 from django.utils import timezone
 
 class TimeStamped(models.Model):
@@ -44,6 +49,9 @@ class Topic(TimeStamped):
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='children')
     order = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
+    # Materialized path of ancestor ids including self, e.g. "/3/17/42/".
+    # Maintained by save(); check/repair with `manage.py check_topic_paths`.
+    path = models.CharField(max_length=255, blank=True, default='', editable=False, db_index=True)
     class Meta:
         indexes = [
             models.Index(fields=['curriculum', 'parent', 'order']),
@@ -53,6 +61,40 @@ class Topic(TimeStamped):
     def __str__(self):
         return self.name
 
+    def build_path(self) -> str:
+        parent_path = '/'
+        if self.parent_id:
+            parent_path = self.parent.path or self.parent.build_path()
+        return f'{parent_path}{self.pk}/'
+
+    def save(self, *args, **kwargs):
+        old_path = self.path
+        super().save(*args, **kwargs)
+        new_path = self.build_path()
+        if new_path == old_path:
+            return
+        Topic.objects.filter(pk=self.pk).update(path=new_path)
+        if old_path:
+            # Moved: rewrite the prefix of every descendant in one statement.
+            Topic.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1))
+            )
+        self.path = new_path
+
+    def subtree(self, include_self=True):
+        """This topic and all its descendants (one indexed prefix query)."""
+        qs = Topic.objects.filter(path__startswith=self.path or self.build_path())
+        return qs if include_self else qs.exclude(pk=self.pk)
+
+    def ancestor_ids(self) -> list[int]:
+        """Ancestor ids from the root down (excluding self)."""
+        return [int(p) for p in (self.path or self.build_path()).strip('/').split('/')[:-1] if p]
+
+    def ancestors(self) -> list['Topic']:
+        ids = self.ancestor_ids()
+        by_id = Topic.objects.in_bulk(ids)
+        return [by_id[i] for i in ids if i in by_id]
+
 QUESTION_TYPES = (
     ('MCQ', 'MCQ'),
     ('MULTI', 'Multi-select'),
@@ -60,6 +102,12 @@ QUESTION_TYPES = (
     ('STRUCT', 'Structured'),
 )
 
+def statement_hash(statement) -> str:
+    """sha256 of the statement with whitespace collapsed and case folded (import dedup key)."""
+    normalized = ' '.join(str(statement or '').split()).casefold()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
 class Question(TimeStamped):
     topic = models.ForeignKey(Topic, on_delete=models.PROTECT, related_name='questions')
     type = models.CharField(max_length=12, choices=QUESTION_TYPES)
@@ -73,12 +121,24 @@ class Question(TimeStamped):
     tags = models.JSONField(default=list, blank=True)
     image = models.ImageField(upload_to='question_images/', null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    # statement_hash(statement); maintained by save() and the bulk importer.
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
     class Meta:
-        indexes = [models.Index(fields=['topic','is_active'])]
+        indexes = [
+            models.Index(fields=['topic','is_active']),
+            models.Index(fields=['topic', 'content_hash']),
+        ]
         ordering = ['id']
     def __str__(self):
         return self.statement[:80]
 
+    def save(self, *args, **kwargs):
+        self.content_hash = statement_hash(self.statement)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'statement' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'content_hash'}
+        super().save(*args, **kwargs)
+
 class Exam(TimeStamped):
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -109,6 +169,16 @@ class ExamQuestion(models.Model):
         unique_together = ('exam','question')
         ordering = ['order']
 
+def pack_question_order(question_ids) -> bytes:
+    ids = [int(q) for q in question_ids or []]
+    return struct.pack(f'<{len(ids)}I', *ids)
+
+
+def unpack_question_order(raw) -> list[int]:
+    data = bytes(raw or b'')
+    return list(struct.unpack(f'<{len(data) // 4}I', data[: len(data) - len(data) % 4]))
+
+
 class Attempt(TimeStamped):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='exams_attempts')
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='attempts')
@@ -128,6 +198,25 @@ class Attempt(TimeStamped):
     rank = models.IntegerField(null=True, blank=True)
     percentile = models.FloatField(null=True, blank=True)
     metadata = models.JSONField(default=dict, blank=True)
+    # Paper order as packed little-endian uint32 question ids; use ``question_order``.
+    question_order_packed = models.BinaryField(default=b'', blank=True, editable=False)
+    grades_finalized = models.BooleanField(default=False)
+    graded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    graded_at = models.DateTimeField(null=True, blank=True)
+    evaluated_pdf = models.CharField(max_length=500, blank=True, default='')
+    evaluated_pdf_url = models.CharField(max_length=500, blank=True, default='')
+    # Grading counters of a finished attempt, recounted by exams.attempt_state.refresh_grading_counters:
+    # STRUCT responses, those with a teacher_mark, the ungraded rest and the marks of all answered questions.
+    struct_total = models.PositiveIntegerField(default=0)
+    struct_graded = models.PositiveIntegerField(default=0)
+    pending_struct_count = models.PositiveIntegerField(default=0)
+    max_marks = models.FloatField(default=0)
     
     class Meta:
         ordering = ['-started_at']
@@ -135,30 +224,55 @@ class Attempt(TimeStamped):
             models.Index(fields=['user', 'exam']),
             models.Index(fields=['status']),
             models.Index(fields=['assignment']),
+            # Keyset pagination of attempt lists (AttemptCursorPagination).
+            models.Index(fields=['-started_at', '-id']),
+            models.Index(fields=['user', '-started_at', '-id']),
+            # Per-user ranked attempts (leaderboard refresh): finished and fully graded.
+            models.Index(fields=['user', 'status', 'pending_struct_count'], name='exams_attempt_user_grading'),
+            # Teacher grading queue: only attempts still waiting for marks.
+            models.Index(
+                fields=['finished_at', 'id'],
+                name='exams_attempt_grading_queue',
+                condition=models.Q(pending_struct_count__gt=0),
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(pending_struct_count=models.F('struct_total') - models.F('struct_graded')),
+                name='exams_attempt_pending_struct_count',
+            ),
         ]
     
+    @property
+    def question_order(self) -> list[int]:
+        return unpack_question_order(self.question_order_packed)
+
+    @question_order.setter
+    def question_order(self, question_ids):
+        self.question_order_packed = pack_question_order(question_ids)
+
     def calculate_score(self):
         """Calculate total score from responses"""
-        total = sum(
-            (r.teacher_mark if r.teacher_mark is not None else (r.question.marks if r.correct else 0))
-            for r in self.responses.all()
-        )
+        from .grading import score_attempt
+
+        total, _ = score_attempt(self)
         self.total_score = total
         if self.exam.total_marks > 0:
             self.percentage = (total / self.exam.total_marks) * 100
         self.save()
+        if self.status in ('submitted', 'timedout'):
+            from .attempt_sync import sync_attempt_indexes
+
+            sync_attempt_indexes(self)
     
     def calculate_percentile(self):
-        """Calculate percentile based on all attempts"""
-        all_attempts = Attempt.objects.filter(
-            exam=self.exam, 
-            status__in=['submitted', 'timedout']
-        ).exclude(id=self.id)
-        
-        if all_attempts.count() > 0:
-            lower_scores = all_attempts.filter(total_score__lt=self.total_score).count()
-            self.percentile = (lower_scores / all_attempts.count()) * 100
-            self.save()
+        """Calculate percentile based on all attempts (read from the exam score index)"""
+        from .ranking import percentile_in_exam
+
+        percentile = percentile_in_exam(self)
+        if percentile is not None:
+            self.percentile = percentile
+            self.save(update_fields=['percentile'])
 
 class Response(TimeStamped):
     attempt = models.ForeignKey(Attempt, on_delete=models.CASCADE, related_name='responses')
@@ -183,15 +297,173 @@ class Response(TimeStamped):
             self.correct = set(user_answer) == set(self.question.correct_answers)
             self.save()
 
+class AttemptFlag(models.Model):
+    """Student "flag for review" state, one row per (attempt, question)."""
+    attempt = models.ForeignKey(Attempt, on_delete=models.CASCADE, related_name='flags')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='+')
+    flagged = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['attempt', 'question'], name='exams_attempt_flag_uniq'),
+        ]
+
+
+class AttemptUpload(models.Model):
+    """A file the student uploaded as (part of) their submission."""
+    attempt = models.ForeignKey(Attempt, on_delete=models.CASCADE, related_name='uploads')
+    name = models.CharField(max_length=255, blank=True)
+    path = models.CharField(max_length=500)
+    url = models.CharField(max_length=500, blank=True, default='')
+    uploaded_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['uploaded_at', 'id']
+
+    def as_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'path': self.path,
+            'url': self.url or None,
+            'uploaded_at': self.uploaded_at.isoformat(),
+        }
+
+
+class ExamScoreEntry(models.Model):
+    """Per-exam ordered score index of finished attempts.
+
+    Mirrors the ranking columns of each submitted/timed-out Attempt so rank and
+    percentile are answered from one indexed range instead of scanning attempts.
+    Maintained by ``exams.ranking``; rebuild with ``manage.py rebuild_score_index``.
+    """
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='score_entries')
+    attempt = models.OneToOneField(Attempt, on_delete=models.CASCADE, related_name='score_entry')
+    total_score = models.FloatField(default=0)
+    duration_seconds = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField()
+    needs_grading = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['exam', 'needs_grading', '-total_score', 'duration_seconds', 'started_at', 'attempt'],
+                name='exams_score_rank_idx',
+            ),
+            models.Index(fields=['exam', 'total_score'], name='exams_score_pct_idx'),
+        ]
+
 class Badge(TimeStamped):
     name = models.CharField(max_length=120)
     description = models.TextField(blank=True)
     criteria_json = models.JSONField(default=dict)
 
 class LeaderboardEntry(TimeStamped):
+    """Materialized leaderboard row for one user and period (daily/weekly/all-time).
+
+    Maintained by ``exams.leaderboard``. ``rank`` is positional as of the last
+    ``rebuild_leaderboard`` run; the API derives live ranks from the ordering.
+    """
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     score_metric = models.FloatField(default=0)
     time_period = models.CharField(max_length=20, default='weekly')
     rank = models.PositiveIntegerField(default=0)
+    tests_completed = models.PositiveIntegerField(default=0)
+    avg_percentage = models.FloatField(default=0)
+    total_score = models.FloatField(default=0)
+    class Meta:
+        indexes = [
+            models.Index(fields=['time_period','rank']),
+            models.Index(
+                fields=['time_period', '-avg_percentage', '-tests_completed', '-total_score', 'user'],
+                name='exams_leaderboard_order_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'time_period'], name='exams_leaderboard_user_period_uniq'),
+        ]
+
+
+class TopicMastery(models.Model):
+    """Per-user, per-topic rollup of finished-attempt responses.
+
+    Maintained by ``exams.mastery`` whenever an attempt's result changes;
+    ``manage.py rebuild_topic_mastery`` recomputes it from scratch.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='topic_mastery')
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='mastery')
+    attempts = models.PositiveIntegerField(default=0)
+    attempted = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    marks_earned = models.FloatField(default=0)
+    marks_possible = models.FloatField(default=0)
+    time_spent_seconds = models.PositiveIntegerField(default=0)
+    last_activity = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
-        indexes = [models.Index(fields=['time_period','rank'])]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'topic'], name='exams_topic_mastery_user_topic_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['topic', 'user'], name='exams_topic_mastery_topic_idx'),
+        ]
+
+    @property
+    def accuracy_pct(self) -> float:
+        return round(100.0 * self.correct / self.attempted, 2) if self.attempted else 0.0
+
+    @property
+    def mastery_pct(self) -> float:
+        return round(100.0 * self.marks_earned / self.marks_possible, 2) if self.marks_possible else 0.0
+
+
+class ImportJob(TimeStamped):
+    """A queued spreadsheet import processed off the request thread.
+
+    The upload is kept in default storage; ``exams.import_jobs`` runs the job
+    on a background thread or the ``run_import_jobs`` worker and records
+    progress here for the status endpoint.
+    """
+    QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+    KIND_CHOICES = (
+        ('exam_questions', 'Exam questions'),
+        ('quiz_questions', 'Quiz questions'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='import_jobs')
+    file = models.FileField(upload_to='imports/%Y/%m/')
+    original_name = models.CharField(max_length=255, blank=True)
+    options = models.JSONField(default=dict, blank=True)
+    phase = models.CharField(max_length=20, blank=True, default='')
+    processed_rows = models.PositiveIntegerField(default=0)
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    created_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)  # first IMPORT_JOB_MAX_ERRORS row errors
+    result = models.JSONField(default=dict, blank=True)
+    message = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='exams_import_job_queue_idx'),
+            models.Index(fields=['created_by', 'created_at'], name='exams_import_job_owner_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} import #{self.pk} ({self.status})'
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.SUCCEEDED, self.FAILED)
@@ -0,0 +1,22 @@
+"""Keyset pagination for large, append-mostly tables."""
+from rest_framework.pagination import CursorPagination
+
+
+class AttemptCursorPagination(CursorPagination):
+    """Newest attempts first; ``?cursor=`` walks the ``(started_at, id)`` index instead of OFFSET.
+
+    Each page costs the same whatever its depth, and rows inserted while a
+    client pages are neither skipped nor repeated.
+    """
+    ordering = ('-started_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class GradingQueuePagination(CursorPagination):
+    """Oldest submission first, walking the partial ``(finished_at, id)`` grading-queue index."""
+    ordering = ('finished_at', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,134 @@
+"""Cached, pre-serialized exam papers for ``start_exam``.
+
+The question list a student sees is the same for everyone taking an exam;
+only the order differs per attempt. ``get_exam_paper`` serializes it once and
+keeps it in the cache framework under a per-exam version counter, so starting
+or resuming an attempt only has to reorder cached entries.
+
+The cache key also carries a fingerprint of the questions the paper is
+built from (count, ids, paper order and latest ``Question.updated_at``, the
+same idea as ``grading.get_answer_key``). Every worker therefore sees an
+edit on its next ``start_exam``, even when the cache is per process and
+the version bump only reached the worker that made the write.
+
+``invalidate_exam_paper`` bumps the version. It is called from the model
+signals in ``exams.signals`` and from code paths that bypass signals
+(``bulk_update`` of ``ExamQuestion`` rows, question imports).
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Sum
+
+from .cache_versions import bump_version, cache_timeout, versioned_key
+from .metrics import record_cache
+from .models import ExamQuestion, Question
+
+
+PAPER_CACHE_TIMEOUT = 60 * 60 * 24
+
+DEFAULT_MCQ_CHOICES = {'A': 'Option A', 'B': 'Option B', 'C': 'Option C', 'D': 'Option D'}
+
+
+def _paper_name(exam_id) -> str:
+    return f'exams:paper:{exam_id}'
+
+
+def map_question_type(t):
+    return {'MCQ': 'mcq', 'MULTI': 'multi', 'FIB': 'fib', 'STRUCT': 'structured'}.get(t, 'mcq')
+
+
+def serialize_paper_question(q: Question) -> dict:
+    """Student-facing question dict (no correct answers).
+
+    ``image`` is the storage URL; callers turn it into an absolute URL for the
+    requesting host.
+    """
+    # Keep choices as-is if dict, otherwise convert to dict format
+    choices = q.choices if isinstance(q.choices, dict) else {}
+    if not choices and q.type == 'MCQ':
+        choices = dict(DEFAULT_MCQ_CHOICES)
+    return {
+        'id': q.id,
+        'type': map_question_type(q.type),
+        'statement': q.statement,
+        'choices': choices,
+        'time_est': q.estimated_time,
+        'marks': q.marks,
+        'image': q.image.url if q.image else None,
+    }
+
+
+def _paper_state(exam) -> str:
+    """Fingerprint of the questions ``exam``'s paper is built from."""
+    stats = ExamQuestion.objects.filter(exam_id=exam.id).aggregate(
+        n=Count('id'),
+        id_sum=Sum('question_id'),
+        order_sum=Sum(F('question_id') * F('order')),
+        last=Max('question__updated_at'),
+    )
+    if not stats['n']:
+        stats = Question.objects.filter(topic_id=exam.topic_id, is_active=True).aggregate(
+            n=Count('id'), id_sum=Sum('id'), last=Max('updated_at'),
+        )
+        stats['order_sum'] = 'topic'
+    last = stats['last'].isoformat() if stats['last'] else ''
+    raw = f"{exam.topic_id}:{stats['n']}:{stats['id_sum'] or 0}:{stats['order_sum'] or 0}:{last}"
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _build_paper(exam) -> dict:
+    eqs = list(ExamQuestion.objects.filter(exam=exam).select_related('question').order_by('order'))
+    if eqs:
+        questions = [eq.question for eq in eqs]
+    else:
+        questions = list(Question.objects.filter(topic=exam.topic_id, is_active=True))
+    return {
+        'question_ids': [int(q.id) for q in questions],
+        'questions': {int(q.id): serialize_paper_question(q) for q in questions},
+    }
+
+
+def get_exam_paper(exam) -> dict:
+    """Return ``{'question_ids': [...], 'questions': {id: dict}}`` for ``exam``.
+
+    ``question_ids`` is the paper order (``ExamQuestion.order``, or the
+    topic's active questions when nothing is attached).
+    """
+    key = f'{versioned_key(_paper_name(exam.id))}:{_paper_state(exam)}'
+    paper = cache.get(key)
+    record_cache(paper is not None)
+    if paper is None:
+        paper = _build_paper(exam)
+        cache.set(key, paper, cache_timeout(PAPER_CACHE_TIMEOUT))
+    return paper
+
+
+def invalidate_exam_paper(exam_id) -> None:
+    bump_version(_paper_name(exam_id))
+
+
+def paper_questions_for_order(paper: dict, question_order: list[int], build_absolute_uri) -> list[dict]:
+    """Materialize the student question list for one attempt's stored order.
+
+    Questions that were detached from the exam after the attempt started are
+    not in the cached paper; they are loaded from the database so the
+    attempt still shows what it started with.
+    """
+    cached = paper.get('questions', {})
+    missing = [qid for qid in question_order if qid not in cached]
+    extra = {}
+    if missing:
+        extra = {q.id: serialize_paper_question(q) for q in Question.objects.filter(id__in=missing)}
+
+    questions = []
+    for qid in question_order:
+        entry = cached.get(qid) or extra.get(qid)
+        if not entry:
+            continue
+        entry = dict(entry)
+        # Frontend runs on a different origin (e.g. :3000), so return an absolute URL.
+        if entry.get('image'):
+            entry['image'] = build_absolute_uri(entry['image'])
+        questions.append(entry)
+    return questions
@@ -0,0 +1,284 @@
+"""Bulk question import for ``bulk_create_questions``.
+
+The upload is read incrementally (``csv.DictReader`` over a text wrapper of
+the uploaded file, or an openpyxl read-only worksheet for ``.xlsx``) in two
+passes, so memory stays flat in the number of rows:
+
+1. validate: every row is parsed and checked; topic ids are resolved through
+   a per-import cache (one query per chunk of unseen ids) and, with
+   ``dedupe``, statements are matched by ``Question.content_hash`` against
+   existing questions of the same topic and earlier rows of the file.
+2. write: unless it is a dry run, or a row failed validation and
+   ``skip_invalid`` is off, the file is read again and the accepted rows are
+   inserted with ``bulk_create`` in batches inside one transaction, so a
+   failure leaves nothing behind.
+
+JSON ``items`` lists go through the same pipeline. ``progress(phase, rows)``
+is called after every validated chunk and before the write transaction, so
+background import jobs can report how far they got.
+"""
+import csv
+import io
+import math
+import zipfile
+from itertools import islice
+
+from django.core.files import File
+from django.db import transaction
+
+from .api_cache import invalidate_api_cache
+from .models import QUESTION_TYPES, Exam, Question, Topic, statement_hash
+from .papers import invalidate_exam_paper
+from .topic_tree import invalidate_topic_trees
+
+
+IMPORT_BATCH_SIZE = 500
+
+MAX_IMPORT_BATCH_SIZE = 5000
+
+QUESTION_TYPE_CODES = {code for code, _ in QUESTION_TYPES}
+
+CHOICE_TYPES = ('MCQ', 'MULTI')
+
+
+class ImportFileError(ValueError):
+    """The uploaded file could not be read as CSV/XLSX."""
+
+
+def csv_rows(fileobj):
+    """Yield ``(row_number, dict)`` from a binary CSV file (header is row 1)."""
+    while isinstance(fileobj, File):
+        fileobj = fileobj.file
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        for row_number, row in enumerate(csv.DictReader(text), start=2):
+            yield row_number, row
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ImportFileError(str(exc)) from exc
+    finally:
+        text.detach()
+
+
+def xlsx_rows(fileobj):
+    """Yield ``(row_number, dict)`` from the first sheet of an ``.xlsx`` file, skipping blank rows."""
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError) as exc:
+        raise ImportFileError(str(exc)) from exc
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else '' for h in next(rows, ())]
+        for row_number, values in enumerate(rows, start=2):
+            if any(v not in (None, '') for v in values):
+                yield row_number, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def upload_reader(upload, name=None):
+    """Zero-argument callable returning a fresh row iterator over ``upload`` each time."""
+    name = name or getattr(upload, 'name', None) or ''
+    parse = xlsx_rows if name.lower().endswith(('.xlsx', '.xlsm')) else csv_rows
+
+    def read():
+        upload.seek(0)
+        return parse(upload)
+
+    return read
+
+
+def items_reader(items):
+    return lambda: enumerate(items, start=1)
+
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _split(value) -> list[str]:
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if not _blank(v)]
+    return [part.strip() for part in str(value).split('|') if part.strip()]
+
+
+def _number(value, cast, default):
+    if _blank(value):
+        return default
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError
+    if cast is int:
+        if not number.is_integer():
+            raise ValueError
+        return int(number)
+    return number
+
+
+def clean_row(raw) -> tuple[dict, dict]:
+    """Parse one input row into ``Question`` field values and ``{field: error}``."""
+    if not isinstance(raw, dict):
+        return {}, {'row': 'Expected an object with question fields.'}
+    fields, errors = {}, {}
+
+    try:
+        fields['topic_id'] = int(_number(raw.get('topic_id'), int, None))
+    except (TypeError, ValueError):
+        errors['topic_id'] = 'A numeric topic_id is required.'
+
+    qtype = 'MCQ' if _blank(raw.get('type')) else str(raw.get('type')).strip().upper()
+    if qtype not in QUESTION_TYPE_CODES:
+        errors['type'] = f'Unknown type {qtype!r}; expected one of {", ".join(sorted(QUESTION_TYPE_CODES))}.'
+    fields['type'] = qtype
+
+    statement = '' if raw.get('statement') is None else str(raw.get('statement')).strip()
+    if not statement:
+        errors['statement'] = 'Statement is required.'
+    fields['statement'] = statement
+
+    choices = raw.get('choices')
+    if isinstance(choices, dict):
+        fields['choices'] = {str(k): v for k, v in choices.items()}
+    elif _blank(choices):
+        fields['choices'] = {}
+    else:
+        fields['choices'] = {chr(65 + i): c for i, c in enumerate(_split(choices))}
+
+    correct = raw.get('correct_answers')
+    fields['correct_answers'] = [] if _blank(correct) else _split(correct)
+    if qtype in CHOICE_TYPES:
+        if not fields['choices']:
+            errors['choices'] = f'{qtype} questions need choices.'
+        elif not fields['correct_answers']:
+            errors['correct_answers'] = f'{qtype} questions need at least one correct answer.'
+        elif not set(fields['correct_answers']) <= set(fields['choices']):
+            errors['correct_answers'] = 'Correct answers must be choice keys (A, B, ...).'
+
+    fields['difficulty'] = '' if _blank(raw.get('difficulty')) else str(raw.get('difficulty')).strip()
+    if len(fields['difficulty']) > Question._meta.get_field('difficulty').max_length:
+        errors['difficulty'] = 'Difficulty is too long.'
+
+    try:
+        fields['marks'] = _number(raw.get('marks'), float, 1.0)
+        if fields['marks'] < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors['marks'] = 'Marks must be a non-negative number.'
+    try:
+        fields['estimated_time'] = _number(raw.get('estimated_time'), int, 60)
+        if fields['estimated_time'] < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors['estimated_time'] = 'Estimated time must be a non-negative whole number of seconds.'
+
+    tags = raw.get('tags')
+    fields['tags'] = [] if _blank(tags) else _split(tags)
+    return fields, errors
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _validate(read_rows, dedupe: bool, chunk_size: int, progress) -> dict:
+    """First pass: per-row errors, duplicates and the row numbers to import."""
+    topics: dict[int, bool] = {}
+    seen_hashes: dict[tuple[int, str], int] = {}
+    report = {'total_rows': 0, 'accepted': [], 'errors': [], 'duplicates': []}
+    for chunk in _chunks(read_rows(), chunk_size):
+        parsed = [(n, *clean_row(raw)) for n, raw in chunk]
+        report['total_rows'] += len(parsed)
+
+        unseen = {f['topic_id'] for _, f, _ in parsed if 'topic_id' in f} - topics.keys()
+        if unseen:
+            found = set(Topic.objects.filter(id__in=unseen).values_list('id', flat=True))
+            topics.update({topic_id: topic_id in found for topic_id in unseen})
+
+        existing = set()
+        keys = {(f['topic_id'], statement_hash(f['statement'])) for _, f, e in parsed if not e} if dedupe else set()
+        if keys:
+            # Both columns so the (topic, content_hash) index serves the lookup.
+            existing = set(
+                Question.objects.filter(
+                    topic_id__in={t for t, _ in keys}, content_hash__in={h for _, h in keys}
+                ).values_list('topic_id', 'content_hash')
+            )
+
+        for row_number, fields, errors in parsed:
+            if 'topic_id' in fields and not topics[fields['topic_id']]:
+                errors['topic_id'] = f"Topic {fields['topic_id']} does not exist."
+            if errors:
+                report['errors'].append({'row': row_number, 'errors': errors})
+                continue
+            if dedupe:
+                key = (fields['topic_id'], statement_hash(fields['statement']))
+                if key in existing:
+                    report['duplicates'].append({'row': row_number, 'reason': 'existing question'})
+                    continue
+                if key in seen_hashes:
+                    report['duplicates'].append({'row': row_number, 'reason': f'same as row {seen_hashes[key]}'})
+                    continue
+                seen_hashes[key] = row_number
+            report['accepted'].append(row_number)
+        if progress:
+            progress('validating', report['total_rows'])
+    return report
+
+
+def _write(read_rows, accepted: set, batch_size: int) -> list:
+    """Second pass: insert the accepted rows in batches inside one transaction."""
+    created_ids = []
+    topic_ids = set()
+    with transaction.atomic():
+        batch = []
+        for row_number, raw in read_rows():
+            if row_number not in accepted:
+                continue
+            fields, _ = clean_row(raw)
+            topic_ids.add(fields['topic_id'])
+            batch.append(Question(content_hash=statement_hash(fields['statement']), **fields))
+            if len(batch) >= batch_size:
+                created_ids.extend(q.pk for q in Question.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            created_ids.extend(q.pk for q in Question.objects.bulk_create(batch))
+    # bulk_create() sends no model signals.
+    for exam_id in Exam.objects.filter(topic_id__in=topic_ids).values_list('id', flat=True):
+        invalidate_exam_paper(exam_id)
+    invalidate_topic_trees()
+    invalidate_api_cache('question')
+    return [pk for pk in created_ids if pk is not None]
+
+
+def import_questions(
+    read_rows, *, dry_run=False, dedupe=False, skip_invalid=False, batch_size=IMPORT_BATCH_SIZE, progress=None
+) -> dict:
+    """Validate and import the rows yielded by ``read_rows()`` (called once per pass).
+
+    Nothing is written on a dry run, or when any row is invalid unless
+    ``skip_invalid`` is set. Duplicates found with ``dedupe`` are skipped
+    and reported, never treated as errors.
+    """
+    batch_size = max(1, min(int(batch_size), MAX_IMPORT_BATCH_SIZE))
+    report = _validate(read_rows, dedupe, batch_size, progress)
+    accepted = report.pop('accepted')
+    result = {
+        'dry_run': bool(dry_run),
+        'total_rows': report['total_rows'],
+        'valid_count': len(accepted),
+        'created_count': 0,
+        'created_ids': [],
+        'duplicates': report['duplicates'],
+        'errors': report['errors'],
+    }
+    if dry_run or not accepted or (report['errors'] and not skip_invalid):
+        return result
+    if progress:
+        progress('writing', report['total_rows'])
+    result['created_ids'] = _write(read_rows, set(accepted), batch_size)
+    result['created_count'] = len(accepted)
+    return result
@@ -0,0 +1,113 @@
+"""Incremental per-exam rank/percentile index.
+
+Every finished (submitted/timed-out) attempt has one ``ExamScoreEntry`` row
+holding its ranking key. ``sync_score_entry`` keeps the row current and is
+called wherever an attempt's score, timing, status or grading state changes
+(submit, timeout, grade, finalize, admin recalculation; see
+``exams.attempt_sync``). Rank and percentile are then a single aggregate
+over the ``(exam, needs_grading, score, duration, started_at, id)`` index
+instead of several COUNTs over all attempts plus a pending-grading
+subquery. Whether an attempt still needs grading comes from its
+``pending_struct_count`` column.
+
+Cost: the aggregate is an index range scan over the entries ranked ahead
+of (or scoring below) the attempt. That is O(k) in those entries, so O(n)
+per exam in the worst case, not an O(log n) order-statistic lookup. B-tree
+indexes keep no subtree counts, so true O(log n) ranks would need a separate
+structure (for example a Redis sorted set per exam) kept in step with this
+table. The scan reads only index pages and stays cheap at per-exam volumes.
+
+Rank ordering: higher score first; ties broken by shorter duration, then
+earlier start, then lower id. Attempts that still need STRUCT grading are
+not ranked and do not count towards other attempts' ranks. Percentile is the
+share of other finished attempts with a strictly lower score.
+"""
+from django.db.models import Count, Q
+
+from .models import Attempt, ExamScoreEntry
+
+
+FINISHED_STATUSES = ('submitted', 'timedout')
+
+
+def _entry_fields(attempt: Attempt, needs_grading: bool) -> dict:
+    return {
+        'exam_id': attempt.exam_id,
+        'total_score': float(attempt.total_score or 0),
+        'duration_seconds': int(attempt.duration_seconds or 0),
+        'started_at': attempt.started_at,
+        'needs_grading': bool(needs_grading),
+    }
+
+
+def sync_score_entry(attempt: Attempt, needs_grading: bool | None = None) -> ExamScoreEntry | None:
+    """Create, update or drop the index row for ``attempt``."""
+    if attempt.status not in FINISHED_STATUSES:
+        ExamScoreEntry.objects.filter(attempt_id=attempt.id).delete()
+        return None
+    if needs_grading is None:
+        needs_grading = attempt.pending_struct_count > 0
+    entry, _ = ExamScoreEntry.objects.update_or_create(
+        attempt_id=attempt.id,
+        defaults=_entry_fields(attempt, needs_grading),
+    )
+    return entry
+
+
+def _better_than(attempt: Attempt) -> Q:
+    score = float(attempt.total_score or 0)
+    duration = int(attempt.duration_seconds or 0)
+    return (
+        Q(total_score__gt=score)
+        | Q(total_score=score, duration_seconds__lt=duration)
+        | Q(total_score=score, duration_seconds=duration, started_at__lt=attempt.started_at)
+        | Q(
+            total_score=score,
+            duration_seconds=duration,
+            started_at=attempt.started_at,
+            attempt_id__lt=attempt.id,
+        )
+    )
+
+
+def rank_in_exam(attempt: Attempt, needs_grading: bool = False) -> int | None:
+    """1-based rank of ``attempt`` among graded finished attempts of its exam."""
+    if not attempt or not getattr(attempt, 'exam_id', None):
+        return None
+    if attempt.status not in FINISHED_STATUSES or needs_grading:
+        return None
+    better = ExamScoreEntry.objects.filter(
+        exam_id=attempt.exam_id,
+        needs_grading=False,
+    ).filter(_better_than(attempt)).count()
+    return int(better) + 1
+
+
+def percentile_in_exam(attempt: Attempt) -> float | None:
+    """Percent of other finished attempts that scored lower, or None if alone."""
+    stats = ExamScoreEntry.objects.filter(exam_id=attempt.exam_id).exclude(attempt_id=attempt.id).aggregate(
+        others=Count('id'),
+        lower=Count('id', filter=Q(total_score__lt=float(attempt.total_score or 0))),
+    )
+    if not stats['others']:
+        return None
+    return (stats['lower'] / stats['others']) * 100
+
+
+def rebuild_score_index(exam_ids=None) -> int:
+    """Recreate index rows from ``Attempt``. Returns the number of rows written."""
+    entries = ExamScoreEntry.objects.all()
+    attempts = Attempt.objects.filter(status__in=FINISHED_STATUSES)
+    if exam_ids:
+        entries = entries.filter(exam_id__in=exam_ids)
+        attempts = attempts.filter(exam_id__in=exam_ids)
+    entries.delete()
+
+    rows = [
+        ExamScoreEntry(attempt_id=a.id, **_entry_fields(a, a.pending_struct_count > 0))
+        for a in attempts.only(
+            'id', 'exam_id', 'total_score', 'duration_seconds', 'started_at', 'pending_struct_count'
+        ).iterator(chunk_size=2000)
+    ]
+    ExamScoreEntry.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
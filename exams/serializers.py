@@ -1,8 +1,28 @@
 from rest_framework import serializers
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from .models import Curriculum, Topic, Question, Exam, ExamQuestion, Attempt, Response, LeaderboardEntry
 from accounts.serializers import UserMinimalSerializer
 
 
+def _count_subquery(qs, group_by):
+    counted = qs.order_by().values(group_by).annotate(n=Count('pk')).values('n')[:1]
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def annotate_exam_counts(qs):
+    """Annotate the per-exam values ExamSerializer would otherwise query row by row."""
+    return qs.annotate(
+        question_total=_count_subquery(ExamQuestion.objects.filter(exam=OuterRef('pk')), 'exam'),
+        attempt_total=_count_subquery(
+            Attempt.objects.filter(exam=OuterRef('pk'), status__in=['submitted', 'timedout']), 'exam'
+        ),
+        struct_question_exists=Exists(
+            ExamQuestion.objects.filter(exam=OuterRef('pk'), question__type='STRUCT')
+        ),
+    )
+
+
 class CurriculumSerializer(serializers.ModelSerializer):
     class Meta:
         model = Curriculum
@@ -20,15 +40,33 @@ class TopicSerializer(serializers.ModelSerializer):
         fields = '__all__'
     
     def get_children(self, obj):
-        children = obj.children.filter(is_active=True)
-        return TopicSerializer(children, many=True).data
+        # With a prebuilt exams.topic_tree index in context, walk it in memory.
+        index = self.context.get('topic_index')
+        if index is not None:
+            children = index.children_of(obj.id)
+        else:
+            children = obj.children.filter(is_active=True)
+        return TopicSerializer(children, many=True, context=self.context).data
     
     def get_questions_count(self, obj):
+        index = self.context.get('topic_index')
+        if index is not None:
+            return index.questions_count(obj.id)
         return obj.questions.filter(is_active=True).count()
     
     def get_exams_count(self, obj):
+        index = self.context.get('topic_index')
+        if index is not None:
+            return index.exams_count(obj.id)
         return obj.exams.filter(is_active=True).count()
 
+    def validate_parent(self, parent):
+        # Reject cycles: a topic cannot move under itself or its own subtree.
+        if parent is not None and self.instance is not None and self.instance.path:
+            if (parent.path or parent.build_path()).startswith(self.instance.path):
+                raise serializers.ValidationError('A topic cannot be moved under itself or one of its descendants.')
+        return parent
+
 
 class QuestionSerializer(serializers.ModelSerializer):
     topic_name = serializers.CharField(source='topic.name', read_only=True)
@@ -72,7 +110,10 @@ class ExamSerializer(serializers.ModelSerializer):
         fields = '__all__'
     
     def get_questions_count(self, obj):
-        count = obj.exam_questions.count()
+        # Prefer the annotate_exam_counts() value; fall back for plain instances.
+        count = getattr(obj, 'question_total', None)
+        if count is None:
+            count = obj.exam_questions.count()
         return count
 
     def get_created_by_name(self, obj):
@@ -97,7 +138,10 @@ class ExamSerializer(serializers.ModelSerializer):
         return self.get_questions_count(obj)
     
     def get_attempts_count(self, obj):
-        return obj.attempts.filter(status__in=['submitted', 'timedout']).count()
+        count = getattr(obj, 'attempt_total', None)
+        if count is None:
+            count = obj.attempts.filter(status__in=['submitted', 'timedout']).count()
+        return count
     
     def get_attempt_count(self, obj):
         return self.get_attempts_count(obj)
@@ -107,6 +151,9 @@ class ExamSerializer(serializers.ModelSerializer):
         return obj.duration_seconds // 60
 
     def get_has_struct_questions(self, obj):
+        annotated = getattr(obj, 'struct_question_exists', None)
+        if annotated is not None:
+            return bool(annotated)
         try:
             return obj.exam_questions.filter(question__type='STRUCT').exists()
         except Exception:
@@ -201,41 +248,71 @@ class ResponseSerializer(serializers.ModelSerializer):
         read_only_fields = ['correct', 'teacher_mark', 'teacher_feedback']
 
 
-class AttemptSerializer(serializers.ModelSerializer):
+class _AttemptGradingFlags:
+    """STRUCT grading flags read from the attempt's grading counters."""
+
+    def get_requires_teacher_grading(self, obj):
+        return obj.struct_total > 0
+
+    def get_needs_grading(self, obj):
+        return obj.pending_struct_count > 0
+
+
+class AttemptExamSummarySerializer(serializers.ModelSerializer):
+    """The exam fields an attempt list row shows; read from ``select_related`` joins only."""
+    topic_name = serializers.CharField(source='topic.name', read_only=True, default='')
+    curriculum_name = serializers.CharField(source='topic.curriculum.name', read_only=True, default='')
+
+    class Meta:
+        model = Exam
+        fields = ['id', 'title', 'topic', 'topic_name', 'curriculum_name', 'level', 'paper_number',
+                  'answer_type', 'total_marks', 'duration_seconds']
+
+
+class AttemptListSerializer(_AttemptGradingFlags, serializers.ModelSerializer):
+    """Slim attempt rows for list endpoints: no per-row queries when used with
+    ``select_related('user', 'exam__topic__curriculum')``."""
+    user = UserMinimalSerializer(read_only=True)
+    exam = AttemptExamSummarySerializer(read_only=True)
+    requires_teacher_grading = serializers.SerializerMethodField()
+    needs_grading = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Attempt
+        fields = ['id', 'user', 'exam', 'assignment', 'started_at', 'finished_at', 'duration_seconds', 'status',
+                  'total_score', 'percentage', 'rank', 'percentile', 'grades_finalized',
+                  'max_marks', 'pending_struct_count', 'requires_teacher_grading', 'needs_grading']
+        read_only_fields = fields
+
+
+class AttemptSerializer(_AttemptGradingFlags, serializers.ModelSerializer):
     user = UserMinimalSerializer(read_only=True)
     exam = ExamSerializer(read_only=True)
     exam_id = serializers.IntegerField(write_only=True)
     requires_teacher_grading = serializers.SerializerMethodField()
     needs_grading = serializers.SerializerMethodField()
+    question_order = serializers.ListField(child=serializers.IntegerField(), read_only=True)
     
     class Meta:
         model = Attempt
-        fields = '__all__'
-        read_only_fields = ['total_score', 'percentage', 'rank', 'percentile']
+        exclude = ['question_order_packed']
+        read_only_fields = [
+            'total_score', 'percentage', 'rank', 'percentile',
+            'struct_total', 'struct_graded', 'pending_struct_count', 'max_marks',
+        ]
 
-    def get_requires_teacher_grading(self, obj):
-        return obj.responses.filter(question__type='STRUCT').exists()
 
-    def get_needs_grading(self, obj):
-        return obj.responses.filter(question__type='STRUCT', teacher_mark__isnull=True).exists()
-
-
-class AttemptDetailSerializer(serializers.ModelSerializer):
+class AttemptDetailSerializer(_AttemptGradingFlags, serializers.ModelSerializer):
     user = UserMinimalSerializer(read_only=True)
     exam = ExamDetailSerializer(read_only=True)
     responses = ResponseSerializer(many=True, read_only=True)
     requires_teacher_grading = serializers.SerializerMethodField()
     needs_grading = serializers.SerializerMethodField()
+    question_order = serializers.ListField(child=serializers.IntegerField(), read_only=True)
     
     class Meta:
         model = Attempt
-        fields = '__all__'
-
-    def get_requires_teacher_grading(self, obj):
-        return obj.responses.filter(question__type='STRUCT').exists()
-
-    def get_needs_grading(self, obj):
-        return obj.responses.filter(question__type='STRUCT', teacher_mark__isnull=True).exists()
+        exclude = ['question_order_packed']
 
 
 class AttemptStartSerializer(serializers.Serializer):
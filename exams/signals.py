@@ -0,0 +1,48 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .api_cache import invalidate_api_cache
+from .models import Curriculum, Exam, ExamQuestion, Question, Topic
+from .papers import invalidate_exam_paper
+from .topic_tree import invalidate_topic_trees
+
+
+@receiver([post_save, post_delete], sender=Exam)
+def exam_changed(sender, instance, **kwargs):
+    invalidate_exam_paper(instance.id)
+    invalidate_topic_trees()
+    invalidate_api_cache('exam')
+
+
+@receiver([post_save, post_delete], sender=ExamQuestion)
+def exam_question_changed(sender, instance, **kwargs):
+    invalidate_exam_paper(instance.exam_id)
+    invalidate_api_cache('exam')
+
+
+@receiver(pre_save, sender=Question)
+def question_saving(sender, instance, **kwargs):
+    # Remember the stored topic so question_changed can refresh the old topic's exams after a move.
+    instance._previous_topic_id = (
+        Question.objects.filter(pk=instance.pk).values_list('topic_id', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    # Exams that attach the question, plus exams that fall back to their topic's questions
+    # (the old topic's as well when the question moved).
+    topic_ids = {instance.topic_id, getattr(instance, '_previous_topic_id', None)} - {None}
+    exam_ids = set(ExamQuestion.objects.filter(question_id=instance.id).values_list('exam_id', flat=True))
+    exam_ids.update(Exam.objects.filter(topic_id__in=topic_ids).values_list('id', flat=True))
+    for exam_id in exam_ids:
+        invalidate_exam_paper(exam_id)
+    invalidate_topic_trees()
+    invalidate_api_cache('question')
+
+
+@receiver([post_save, post_delete], sender=Curriculum)
+@receiver([post_save, post_delete], sender=Topic)
+def topic_tree_changed(sender, instance, **kwargs):
+    invalidate_topic_trees()
+    invalidate_api_cache(sender._meta.model_name)
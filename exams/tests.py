@@ -1,7 +1,24 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from io import StringIO
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from .models import Topic, Question, Exam, ExamQuestion, Attempt
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.utils import timezone
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from .models import Curriculum, Topic, Question, Exam, ExamQuestion, Attempt, Response, ExamScoreEntry, LeaderboardEntry, TopicMastery, ImportJob, statement_hash
+from . import views
+from .attempt_state import flagged_map, sync_grading_counters
+from .attempt_sync import sync_attempt_indexes
+from .autosave import pending_drafts
+from .cache_versions import bump_version, cache_timeout, versioned_key
+from .grading import get_answer_key, grade_submission
+from .mastery import refresh_attempt_mastery
+from .ranking import percentile_in_exam, sync_score_entry
 from rest_framework.test import APIClient
 
 User = get_user_model()
@@ -155,3 +172,1244 @@ class ReviewAndGradingPermissionsTests(TestCase):
         grade_url = reverse('grade_response', args=[response_id])
         grade_res = self.client.post(grade_url, data={'teacher_mark': 1, 'remarks': 'nope'}, format='json')
         self.assertEqual(grade_res.status_code, 403)
+
+
+class SubmitExamBulkGradingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.topic = Topic.objects.create(name='Bulk Topic')
+
+    def _make_exam(self, n_questions):
+        exam = Exam.objects.create(title=f'Bulk {n_questions}', topic=self.topic, duration_seconds=600)
+        for i in range(n_questions):
+            if i % 3 == 0:
+                q = Question.objects.create(topic=self.topic, type='FIB', statement=f'fib {i}', correct_answers=['Yes'])
+            else:
+                q = Question.objects.create(
+                    topic=self.topic, type='MCQ', statement=f'mcq {i}', choices={'A': 'a', 'B': 'b'}, correct_answers=['A']
+                )
+            ExamQuestion.objects.create(exam=exam, question=q, order=i + 1)
+        return exam
+
+    def _start_and_submit(self, exam, username):
+        user = User.objects.create_user(username=username, password='pw12345')
+        self.client.force_authenticate(user=user)
+        attempt_id = self.client.post(reverse('start_exam', args=[exam.id])).data['attempt_id']
+        responses = []
+        for eq in exam.exam_questions.select_related('question'):
+            if eq.question.type == 'FIB':
+                responses.append({'question_id': eq.question_id, 'answer_payload': {'answer': ' yes '}})
+            else:
+                responses.append({'question_id': eq.question_id, 'answer': 'A', 'time_spent': 3})
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(
+                reverse('submit_exam', args=[exam.id]),
+                data={'attempt_id': attempt_id, 'responses': responses},
+                format='json',
+            )
+        self.assertEqual(res.status_code, 200)
+        return res.data, len(ctx.captured_queries)
+
+    def test_submit_grades_in_memory_and_upserts(self):
+        exam = self._make_exam(4)
+        data, _ = self._start_and_submit(exam, 'bulk_a')
+        self.assertEqual(data['score'], 4)
+        self.assertEqual(data['total'], 4)
+        attempt = Attempt.objects.get(pk=data['attempt_id'])
+        self.assertEqual(attempt.responses.count(), 4)
+        self.assertTrue(all(r.correct for r in attempt.responses.all()))
+
+        # A repeated submit answers from the attempt row alone.
+        with self.assertNumQueries(1):
+            res = self.client.post(
+                reverse('submit_exam', args=[exam.id]), data={'attempt_id': attempt.id, 'responses': []}, format='json',
+            )
+        self.assertEqual((res.data['score'], res.data['total']), (4, 4))
+
+    def test_submit_query_count_is_constant_in_question_count(self):
+        _, small = self._start_and_submit(self._make_exam(5), 'bulk_small')
+        _, large = self._start_and_submit(self._make_exam(60), 'bulk_large')
+        self.assertEqual(small, large)
+
+
+class AnswerKeyCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.topic = Topic.objects.create(name='Key Topic')
+        self.q1 = Question.objects.create(topic=self.topic, type='MULTI', statement='pick', correct_answers=['A', 'C'], marks=2)
+        self.q2 = Question.objects.create(topic=self.topic, type='FIB', statement='fill', correct_answers=[' Newton '])
+        self.exam = Exam.objects.create(title='Key Exam', topic=self.topic, duration_seconds=600)
+        ExamQuestion.objects.create(exam=self.exam, question=self.q1, order=1)
+        ExamQuestion.objects.create(exam=self.exam, question=self.q2, order=2)
+
+    def test_warm_key_grades_without_reading_question_metadata(self):
+        key = get_answer_key(self.exam)
+        self.assertEqual(key[self.q1.id].keys, frozenset({'A', 'C'}))
+        self.assertEqual(key[self.q2.id].keys, frozenset({'newton'}))
+
+        attempt = Attempt.objects.create(user=User.objects.create_user(username='key_u'), exam=self.exam)
+        items = [
+            {'question_id': self.q1.id, 'answer_payload': {'answers': ['C', 'A']}},
+            {'question_id': self.q2.id, 'answer': 'newton'},
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            score, total = grade_submission(attempt, items)
+        self.assertEqual((score, total), (3, 3))
+        self.assertFalse(any('correct_answers' in q['sql'] for q in ctx.captured_queries))
+
+    def test_editing_a_question_changes_the_key_version(self):
+        get_answer_key(self.exam)
+        self.q2.correct_answers = ['Joule']
+        self.q2.save()
+        self.assertEqual(get_answer_key(self.exam)[self.q2.id].keys, frozenset({'joule'}))
+
+
+class ExamPaperCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.topic = Topic.objects.create(name='Paper Topic')
+        self.exam = Exam.objects.create(title='Paper Exam', topic=self.topic, duration_seconds=600, shuffle_questions=False)
+        self.questions = []
+        for i in range(3):
+            q = Question.objects.create(topic=self.topic, type='MCQ', statement=f'q{i}', choices={'A': 'x'}, correct_answers=['A'])
+            ExamQuestion.objects.create(exam=self.exam, question=q, order=i + 1)
+            self.questions.append(q)
+
+    def _start(self, username):
+        user = User.objects.create_user(username=username, password='pw12345')
+        self.client.force_authenticate(user=user)
+        res = self.client.post(reverse('start_exam', args=[self.exam.id]))
+        self.assertEqual(res.status_code, 200)
+        return res.data
+
+    def test_resume_reads_questions_from_cached_paper(self):
+        first = self._start('paper_a')
+        with CaptureQueriesContext(connection) as ctx:
+            again = self.client.post(reverse('start_exam', args=[self.exam.id]))
+        self.assertEqual(again.data['questions'], first['questions'])
+        # Only the fingerprint aggregate touches the question table; no question rows are loaded.
+        self.assertFalse(any('"exams_question"."statement"' in q['sql'] for q in ctx.captured_queries))
+
+    def test_question_edit_invalidates_cached_paper(self):
+        self._start('paper_b')
+        q = self.questions[0]
+        q.statement = 'edited'
+        q.save()
+        data = self._start('paper_c')
+        self.assertEqual(data['questions'][0]['statement'], 'edited')
+
+    def test_edit_without_version_bump_is_seen(self):
+        # Another worker's write: no signal reaches this process's version counter.
+        self._start('paper_d')
+        Question.objects.filter(pk=self.questions[1].pk).update(statement='elsewhere', updated_at=timezone.now())
+        self.assertEqual(self._start('paper_e')['questions'][1]['statement'], 'elsewhere')
+
+    def test_moving_a_question_refreshes_the_old_topics_exams(self):
+        fallback = Exam.objects.create(title='Fallback Exam', topic=self.topic, duration_seconds=600)
+        before = versioned_key(f'exams:paper:{fallback.id}')
+        q = self.questions[0]
+        q.topic = Topic.objects.create(name='Elsewhere')
+        q.save()
+        self.assertNotEqual(versioned_key(f'exams:paper:{fallback.id}'), before)
+
+
+class ScoreIndexTests(TestCase):
+    def setUp(self):
+        self.topic = Topic.objects.create(name='Rank Topic')
+        self.exam = Exam.objects.create(title='Rank Exam', topic=self.topic, duration_seconds=600)
+        self.struct_q = Question.objects.create(topic=self.topic, type='STRUCT', statement='explain', marks=5)
+
+    def _finished(self, username, score, duration, needs_grading=False):
+        user = User.objects.create_user(username=username)
+        attempt = Attempt.objects.create(
+            user=user, exam=self.exam, status='submitted', total_score=score, duration_seconds=duration
+        )
+        if needs_grading:
+            Response.objects.create(attempt=attempt, question=self.struct_q)
+        sync_grading_counters(attempt)
+        sync_score_entry(attempt)
+        return attempt
+
+    def test_rank_tie_breaks_and_pending_grading(self):
+        fast = self._finished('r_fast', 8, 100)
+        slow = self._finished('r_slow', 8, 200)
+        top = self._finished('r_top', 9, 300)
+        pending = self._finished('r_pending', 10, 50, needs_grading=True)
+
+        self.assertEqual(views._compute_attempt_rank(top), 1)
+        self.assertEqual(views._compute_attempt_rank(fast), 2)
+        self.assertEqual(views._compute_attempt_rank(slow), 3)
+        self.assertIsNone(views._compute_attempt_rank(pending))
+
+        # Percentile counts every finished attempt, including ones awaiting grading.
+        self.assertAlmostEqual(percentile_in_exam(top), 200 / 3)
+
+    def test_admin_recalculation_refreshes_derived_rows(self):
+        from django.contrib.admin.sites import site
+        from .admin import AttemptAdmin
+
+        attempt = self._finished('r_recalc', 0, 100)
+        attempt.finished_at = timezone.now()
+        attempt.save(update_fields=['finished_at'])
+        Response.objects.create(attempt=attempt, question=self.struct_q, teacher_mark=4)
+        model_admin = AttemptAdmin(Attempt, site)
+        model_admin.message_user = lambda *args, **kwargs: None
+        model_admin.recalculate_scores(None, Attempt.objects.filter(pk=attempt.pk))
+
+        self.assertEqual(ExamScoreEntry.objects.get(attempt=attempt).total_score, 4.0)
+        self.assertEqual(LeaderboardEntry.objects.get(user=attempt.user, time_period='all-time').total_score, 4.0)
+        self.assertEqual(TopicMastery.objects.get(user=attempt.user, topic=self.topic).attempted, 1)
+
+    def test_rebuild_command_restores_index(self):
+        a = self._finished('r_a', 5, 100)
+        self._finished('r_b', 7, 100, needs_grading=True)
+        ExamScoreEntry.objects.all().delete()
+
+        call_command('rebuild_score_index', stdout=StringIO())
+
+        self.assertEqual(ExamScoreEntry.objects.filter(exam=self.exam).count(), 2)
+        self.assertEqual(ExamScoreEntry.objects.filter(needs_grading=True).count(), 1)
+        self.assertEqual(views._compute_attempt_rank(a), 1)
+
+
+class MaterializedLeaderboardTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.topic = Topic.objects.create(name='Board Topic')
+        self.q = Question.objects.create(topic=self.topic, type='MCQ', statement='2+2', choices={'A': '4'}, correct_answers=['A'])
+        self.exam = Exam.objects.create(title='Board Exam', topic=self.topic, duration_seconds=600)
+        ExamQuestion.objects.create(exam=self.exam, question=self.q, order=1)
+
+    def _submit(self, username, answer):
+        user = User.objects.create_user(username=username, password='pw12345')
+        self.client.force_authenticate(user=user)
+        attempt_id = self.client.post(reverse('start_exam', args=[self.exam.id])).data['attempt_id']
+        res = self.client.post(
+            reverse('submit_exam', args=[self.exam.id]),
+            data={'attempt_id': attempt_id, 'responses': [{'question_id': self.q.id, 'answer': answer}]},
+            format='json',
+        )
+        self.assertEqual(res.status_code, 200)
+        return user
+
+    def test_submit_maintains_rows_and_endpoint_reads_them(self):
+        winner = self._submit('lb_winner', 'A')
+        self._submit('lb_loser', 'B')
+        self.assertEqual(LeaderboardEntry.objects.filter(user=winner).count(), 3)
+
+        res = self.client.get(reverse('leaderboard'), {'period': 'all'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['period'], 'all-time')
+        self.assertEqual([r['name'] for r in res.data['rankings']], ['lb_winner', 'lb_loser'])
+        self.assertEqual(res.data['user_rank']['rank'], 2)
+
+    def test_rebuild_rolls_old_attempts_out_of_windows(self):
+        user = self._submit('lb_old', 'A')
+        Attempt.objects.filter(user=user).update(finished_at=timezone.now() - timedelta(days=3))
+        call_command('rebuild_leaderboard', stdout=StringIO())
+        periods = set(LeaderboardEntry.objects.filter(user=user).values_list('time_period', flat=True))
+        self.assertEqual(periods, {'weekly', 'all-time'})
+
+
+class ExamListQueryCountTests(TestCase):
+    def test_exam_list_query_count_is_constant(self):
+        teacher = User.objects.create_user(username='list_teacher', role='TEACHER')
+        topic = Topic.objects.create(name='List Topic')
+        mcq = Question.objects.create(topic=topic, type='MCQ', statement='m', correct_answers=['A'])
+        struct = Question.objects.create(topic=topic, type='STRUCT', statement='s')
+        exams = Exam.objects.bulk_create(
+            [Exam(title=f'Exam {i}', topic=topic, created_by=teacher) for i in range(200)]
+        )
+        ExamQuestion.objects.bulk_create(
+            [ExamQuestion(exam=e, question=mcq, order=1) for e in exams]
+            + [ExamQuestion(exam=exams[0], question=struct, order=2)]
+        )
+        Attempt.objects.create(user=teacher, exam=exams[0], status='submitted')
+
+        client = APIClient()
+        with self.assertNumQueries(1):
+            res = client.get('/api/exams/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data), 200)
+        by_id = {row['id']: row for row in res.data}
+        self.assertEqual(by_id[exams[0].id]['question_count'], 2)
+        self.assertEqual(by_id[exams[0].id]['attempts_count'], 1)
+        self.assertTrue(by_id[exams[0].id]['has_struct_questions'])
+        self.assertFalse(by_id[exams[1].id]['has_struct_questions'])
+
+
+class TopicTreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.curriculum = Curriculum.objects.create(name='Tree Curriculum')
+        self.root = Topic.objects.create(name='Physics', curriculum=self.curriculum)
+        parent = self.root
+        for depth in range(4):
+            parent = Topic.objects.create(name=f'Level {depth}', curriculum=self.curriculum, parent=parent)
+            Question.objects.create(topic=parent, type='MCQ', statement=f'q{depth}', correct_answers=['A'])
+            Exam.objects.create(title=f'E{depth}', topic=parent)
+        self.leaf = parent
+
+    def test_tree_is_built_in_constant_queries_and_cached(self):
+        url = f'/api/curriculums/{self.curriculum.id}/tree/'
+        # curriculum lookup + topics + grouped question and exam counts
+        with self.assertNumQueries(4):
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        node = res.data['roots'][0]
+        depth = 0
+        while node['children']:
+            node = node['children'][0]
+            depth += 1
+        self.assertEqual(depth, 4)
+        self.assertEqual((node['questions_count'], node['exams_count']), (1, 1))
+
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+    def test_topic_write_invalidates_cached_tree(self):
+        url = f'/api/curriculums/{self.curriculum.id}/tree/'
+        self.client.get(url)
+        self.leaf.name = 'Renamed leaf'
+        self.leaf.save()
+        node = self.client.get(url).data['roots'][0]
+        while node['children']:
+            node = node['children'][0]
+        self.assertEqual(node['name'], 'Renamed leaf')
+
+    def test_topic_list_uses_prebuilt_index(self):
+        with self.assertNumQueries(4):
+            res = self.client.get('/api/topics/', {'curriculum': self.curriculum.id, 'parent': 'null'})
+        self.assertEqual([t['id'] for t in res.data], [self.root.id])
+        self.assertEqual(len(res.data[0]['children']), 1)
+
+
+class TopicPathTests(TestCase):
+    def setUp(self):
+        self.curriculum = Curriculum.objects.create(name='Path Curriculum')
+        self.root = Topic.objects.create(name='Root', curriculum=self.curriculum)
+        self.mid = Topic.objects.create(name='Mid', curriculum=self.curriculum, parent=self.root)
+        self.leaf = Topic.objects.create(name='Leaf', curriculum=self.curriculum, parent=self.mid)
+        self.other = Topic.objects.create(name='Other', curriculum=self.curriculum)
+
+    def test_path_is_set_on_create_and_rewritten_on_move(self):
+        self.assertEqual(self.leaf.path, f'/{self.root.id}/{self.mid.id}/{self.leaf.id}/')
+        self.mid.parent = self.other
+        self.mid.save()
+        self.leaf.refresh_from_db()
+        self.assertEqual(self.leaf.path, f'/{self.other.id}/{self.mid.id}/{self.leaf.id}/')
+        self.assertEqual(self.leaf.ancestor_ids(), [self.other.id, self.mid.id])
+
+    def test_subtree_and_ancestors_are_single_queries(self):
+        with self.assertNumQueries(1):
+            ids = set(self.root.subtree().values_list('id', flat=True))
+        self.assertEqual(ids, {self.root.id, self.mid.id, self.leaf.id})
+        with self.assertNumQueries(1):
+            names = [t.name for t in self.leaf.ancestors()]
+        self.assertEqual(names, ['Root', 'Mid'])
+
+        res = APIClient().get(f'/api/topics/{self.leaf.id}/breadcrumbs/')
+        self.assertEqual([t['name'] for t in res.data], ['Root', 'Mid', 'Leaf'])
+
+    def test_check_topic_paths_reports_and_repairs_drift(self):
+        Topic.objects.filter(id=self.leaf.id).update(path='/stale/')
+        with self.assertRaises(CommandError):
+            call_command('check_topic_paths', stdout=StringIO())
+        call_command('check_topic_paths', '--fix', stdout=StringIO())
+        self.leaf.refresh_from_db()
+        self.assertEqual(self.leaf.path, f'/{self.root.id}/{self.mid.id}/{self.leaf.id}/')
+
+
+class BatchedAutosaveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='autosaver', password='pw', email='autosaver@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.topic = Topic.objects.create(name='Autosave Topic')
+        self.exam = Exam.objects.create(title='Autosave Exam', topic=self.topic, duration_seconds=3600)
+        self.questions = [
+            Question.objects.create(topic=self.topic, type='MCQ', statement=f'q{i}', correct_answers=['A'])
+            for i in range(20)
+        ]
+        self.attempt = Attempt.objects.create(
+            user=self.user,
+            exam=self.exam,
+            question_order=[q.id for q in self.questions],
+        )
+        self.url = f'/api/attempts/{self.attempt.id}/autosave/'
+
+    def test_batch_is_coalesced_and_written_in_constant_queries(self):
+        items = [{'question_id': q.id, 'answer': 'A', 'time_spent': 5, 'flagged': False} for q in self.questions]
+        items.append({'question_id': self.questions[0].id, 'answer': 'B', 'time_spent': 9, 'flagged': True})
+        # attempt + response upsert + flag upsert (+ savepoints)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(self.url, {'items': items}, format='json')
+        self.assertEqual(res.status_code, 200)
+        self.assertLessEqual(len(ctx.captured_queries), 8)
+        self.assertEqual(res.data['saved'], 20)
+
+        self.assertEqual(Response.objects.filter(attempt=self.attempt).count(), 20)
+        first = Response.objects.get(attempt=self.attempt, question=self.questions[0])
+        self.assertEqual((first.answer_payload, first.time_spent_seconds, first.flagged_for_review), ('B', 9, True))
+        flags = flagged_map(self.attempt)
+        self.assertEqual(len(flags), 20)
+        self.assertEqual([qid for qid, flagged in flags.items() if flagged], [str(self.questions[0].id)])
+
+    def test_flag_only_delta_keeps_saved_answer(self):
+        qid = self.questions[1].id
+        self.client.post(self.url, {'items': [{'question_id': qid, 'answer': 'C'}]}, format='json')
+        self.client.post(self.url, {'items': [{'question_id': qid, 'flagged': True}]}, format='json')
+        self.assertEqual(Response.objects.get(attempt=self.attempt, question_id=qid).answer_payload, 'C')
+        self.assertEqual(flagged_map(self.attempt), {str(qid): True})
+
+    def test_rejects_unknown_question_and_finished_attempt(self):
+        res = self.client.post(self.url, {'items': [{'question_id': 999999, 'answer': 'A'}]}, format='json')
+        self.assertEqual(res.status_code, 404)
+        self.assertFalse(Response.objects.filter(attempt=self.attempt).exists())
+
+        Attempt.objects.filter(pk=self.attempt.pk).update(status='submitted')
+        res = self.client.post(self.url, {'items': [{'question_id': self.questions[0].id, 'answer': 'A'}]}, format='json')
+        self.assertEqual(res.status_code, 409)
+
+
+@override_settings(EXAMS_AUTOSAVE_WRITE_BEHIND=True)
+class WriteBehindAutosaveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='drafter', password='pw', email='drafter@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.topic = Topic.objects.create(name='Draft Topic')
+        self.exam = Exam.objects.create(title='Draft Exam', topic=self.topic, duration_seconds=3600)
+        self.q1 = Question.objects.create(topic=self.topic, type='MCQ', statement='q1', correct_answers=['A'], marks=1)
+        self.q2 = Question.objects.create(topic=self.topic, type='MCQ', statement='q2', correct_answers=['B'], marks=1)
+        self.attempt = Attempt.objects.create(
+            user=self.user, exam=self.exam, question_order=[self.q1.id, self.q2.id]
+        )
+
+    def _autosave(self, *items):
+        return self.client.post(f'/api/attempts/{self.attempt.id}/autosave/', {'items': list(items)}, format='json')
+
+    def test_drafts_stay_in_cache_and_resume_reads_them(self):
+        res = self._autosave({'question_id': self.q1.id, 'answer': 'A', 'time_spent': 7, 'flagged': True})
+        self.assertEqual(res.data['buffered'], 1)
+        self.assertFalse(Response.objects.filter(attempt=self.attempt).exists())
+
+        data = self.client.get(f'/api/attempts/{self.attempt.id}/resume/').data
+        self.assertEqual(data['answers'][self.q1.id], 'A')
+        self.assertEqual(data['times'][self.q1.id], 7)
+        self.assertTrue(data['flagged'][str(self.q1.id)])
+
+    def test_crashed_worker_drafts_are_recovered_by_flusher(self):
+        # The web process "dies" after buffering: nothing reached the database yet.
+        self._autosave({'question_id': self.q1.id, 'answer': 'A'}, {'question_id': self.q2.id, 'flagged': True})
+        self.assertFalse(Response.objects.filter(attempt=self.attempt).exists())
+
+        out = StringIO()
+        call_command('flush_autosave_drafts', stdout=out)
+        self.assertIn('Flushed 2 draft(s) from 1 attempt(s)', out.getvalue())
+        self.assertEqual(Response.objects.get(attempt=self.attempt, question=self.q1).answer_payload, 'A')
+        self.assertEqual(flagged_map(self.attempt), {str(self.q2.id): True})
+
+        # Drafts are dropped once persisted; a second run is a no-op.
+        out = StringIO()
+        call_command('flush_autosave_drafts', stdout=out)
+        self.assertIn('Flushed 0 draft(s)', out.getvalue())
+
+    def test_submit_flushes_drafts_before_grading(self):
+        self._autosave({'question_id': self.q1.id, 'answer': 'A', 'time_spent': 3})
+        res = self.client.post(
+            f'/api/exams/{self.exam.id}/submit/',
+            {'attempt_id': self.attempt.id, 'responses': [{'question_id': self.q2.id, 'answer': 'B'}]},
+            format='json',
+        )
+        self.assertEqual(res.status_code, 200)
+        stored = dict(Response.objects.filter(attempt=self.attempt).values_list('question_id', 'time_spent_seconds'))
+        self.assertEqual(stored, {self.q1.id: 3, self.q2.id: 0})
+        self.assertEqual(pending_drafts(self.attempt), {})
+
+    def test_drafts_buffered_after_the_final_flush_never_reach_graded_responses(self):
+        from unittest import mock
+
+        from . import views
+        real_flush = views.flush_drafts
+
+        def flush_then_autosave(attempt):
+            # An autosave request that lands while the submission is being graded.
+            n = real_flush(attempt)
+            self._autosave({'question_id': self.q2.id, 'answer': 'late'})
+            return n
+
+        with self.captureOnCommitCallbacks(execute=True), mock.patch.object(views, 'flush_drafts', flush_then_autosave):
+            res = self.client.post(
+                f'/api/exams/{self.exam.id}/submit/',
+                {'attempt_id': self.attempt.id, 'responses': [{'question_id': self.q2.id, 'answer': 'B'}]},
+                format='json',
+            )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(pending_drafts(self.attempt), {})
+
+        # A draft stranded on a finished attempt is left alone by the periodic flush.
+        cache.set(f'exams:autosave_draft:{self.attempt.id}:{self.q2.id}', {'question_id': self.q2.id, 'answer': 'late'})
+        call_command('flush_autosave_drafts', stdout=StringIO())
+        self.assertEqual(Response.objects.get(attempt=self.attempt, question=self.q2).answer_payload, {'answers': ['B']})
+
+
+class AttemptStructuredStateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='meta_student', password='pw')
+        self.teacher = User.objects.create_user(username='meta_teacher', password='pw')
+        self.topic = Topic.objects.create(name='Meta Topic')
+        self.exam = Exam.objects.create(title='Meta Exam', topic=self.topic)
+        self.q1 = Question.objects.create(topic=self.topic, type='STRUCT', statement='s1', marks=2)
+        self.q2 = Question.objects.create(topic=self.topic, type='MCQ', statement='m1', correct_answers=['A'])
+
+    def test_question_order_round_trips_as_packed_integers(self):
+        order = [self.q2.id, self.q1.id, 70000]
+        attempt = Attempt.objects.create(user=self.user, exam=self.exam, question_order=order)
+        self.assertEqual(len(attempt.question_order_packed), 12)
+        self.assertEqual(Attempt.objects.get(pk=attempt.pk).question_order, order)
+
+    def test_legacy_metadata_is_split_into_structured_storage(self):
+        import importlib
+        from django.apps import apps
+
+        migration = importlib.import_module('exams.migrations.0012_attempt_structured_state')
+        attempt = Attempt.objects.create(user=self.user, exam=self.exam, status='submitted')
+        Response.objects.create(attempt=attempt, question=self.q1, teacher_mark=1.5)
+        Attempt.objects.filter(pk=attempt.pk).update(metadata={
+            'question_order': [self.q1.id, str(self.q2.id)],
+            'flagged': {str(self.q2.id): True},
+            'teacher_remarks': {str(self.q1.id): 'Show working'},
+            'student_uploads': [{'name': 'a.pdf', 'path': 'answer_uploads/a.pdf', 'url': '/media/a.pdf',
+                                 'uploaded_at': '2025-01-01T10:00:00+00:00'}],
+            'grades_finalized': True,
+            'graded_by': self.teacher.id,
+            'graded_at': '2025-01-02T10:00:00+00:00',
+            'evaluated_pdf': 'evaluated_pdfs/x.pdf',
+            'exam_snapshot': {'exam_title': 'Meta Exam'},
+        })
+
+        migration.split_attempt_metadata(apps, None)
+
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.metadata, {'exam_snapshot': {'exam_title': 'Meta Exam'}})
+        self.assertEqual(attempt.question_order, [self.q1.id, self.q2.id])
+        self.assertEqual(flagged_map(attempt), {str(self.q2.id): True})
+        self.assertEqual(Response.objects.get(attempt=attempt).teacher_feedback, 'Show working')
+        self.assertEqual(list(attempt.uploads.values_list('path', flat=True)), ['answer_uploads/a.pdf'])
+        self.assertTrue(attempt.grades_finalized)
+        self.assertEqual((attempt.graded_by_id, attempt.evaluated_pdf), (self.teacher.id, 'evaluated_pdfs/x.pdf'))
+
+
+class UserTopicAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='analyst', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.curriculum = Curriculum.objects.create(name='Analytics Curriculum')
+        self.parent = Topic.objects.create(name='Mechanics', curriculum=self.curriculum)
+        self.child = Topic.objects.create(name='Kinematics', curriculum=self.curriculum, parent=self.parent)
+        self.exam = Exam.objects.create(title='Analytics Exam', topic=self.child)
+        attempt = Attempt.objects.create(user=self.user, exam=self.exam, status='submitted', finished_at=timezone.now())
+        for i, topic in enumerate([self.parent, self.child, self.child]):
+            q = Question.objects.create(topic=topic, type='MCQ', statement=f'a{i}', correct_answers=['A'])
+            Response.objects.create(attempt=attempt, question=q, correct=(i != 2))
+        refresh_attempt_mastery(attempt)
+
+    def test_grouped_in_one_query_and_cached(self):
+        url = '/api/analytics/user/me/topics/'
+        with self.assertNumQueries(1):
+            res = self.client.get(url)
+        by_topic = {t['topic_id']: (t['correct'], t['total']) for t in res.data['topics']}
+        self.assertEqual(by_topic, {self.parent.id: (1, 1), self.child.id: (1, 2)})
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        rolled = self.client.get(url, {'rollup': 1}).data['topics']
+        self.assertEqual({t['topic_id']: t['total'] for t in rolled}, {self.parent.id: 3, self.child.id: 2})
+
+    def test_filters_and_invalidation_on_attempt_change(self):
+        url = '/api/analytics/user/me/topics/'
+        later = (timezone.now() + timedelta(days=2)).date().isoformat()
+        self.assertEqual(self.client.get(url, {'since': later}).data['topics'], [])
+        self.assertEqual(self.client.get(url, {'curriculum': 999999}).data['topics'], [])
+        self.assertEqual(self.client.get(url, {'since': 'nope'}).status_code, 400)
+
+        self.assertEqual(len(self.client.get(url).data['topics']), 2)
+        other = Topic.objects.create(name='Optics', curriculum=self.curriculum)
+        attempt = Attempt.objects.create(user=self.user, exam=self.exam, status='submitted', finished_at=timezone.now())
+        q = Question.objects.create(topic=other, type='MCQ', statement='o', correct_answers=['A'])
+        Response.objects.create(attempt=attempt, question=q, correct=True)
+        sync_attempt_indexes(attempt)
+        self.assertEqual(len(self.client.get(url).data['topics']), 3)
+
+
+class TopicMasteryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user(username='master', password='pw')
+        self.teacher = User.objects.create_user(username='master_t', password='pw', role='TEACHER')
+        self.client = APIClient()
+        self.topic = Topic.objects.create(name='Waves')
+        self.mcq = Question.objects.create(topic=self.topic, type='MCQ', statement='m', correct_answers=['A'], marks=2)
+        self.struct = Question.objects.create(topic=self.topic, type='STRUCT', statement='s', marks=4)
+        self.exam = Exam.objects.create(title='Waves Exam', topic=self.topic, duration_seconds=600)
+        ExamQuestion.objects.create(exam=self.exam, question=self.mcq, order=1)
+        ExamQuestion.objects.create(exam=self.exam, question=self.struct, order=2)
+
+    def _submit(self):
+        self.client.force_authenticate(self.student)
+        attempt_id = self.client.post(f'/api/exams/{self.exam.id}/start/').data['attempt_id']
+        self.client.post(
+            f'/api/exams/{self.exam.id}/submit/',
+            {'attempt_id': attempt_id, 'responses': [
+                {'question_id': self.mcq.id, 'answer': 'A', 'time_spent': 30},
+                {'question_id': self.struct.id, 'answer': 'essay', 'time_spent': 90},
+            ]},
+            format='json',
+        )
+        return Attempt.objects.get(pk=attempt_id)
+
+    def test_submit_and_finalize_keep_rollup_current(self):
+        attempt = self._submit()
+        m = TopicMastery.objects.get(user=self.student, topic=self.topic)
+        self.assertEqual((m.attempts, m.attempted, m.correct), (1, 2, 1))
+        self.assertEqual((m.marks_earned, m.marks_possible, m.time_spent_seconds), (2.0, 6.0, 120))
+
+        self.client.force_authenticate(self.teacher)
+        response_id = Response.objects.get(attempt=attempt, question=self.struct).id
+        self.client.post(f'/api/responses/{response_id}/grade/', {'teacher_mark': 3}, format='json')
+        self.client.post(f'/api/attempts/{attempt.id}/finalize-grading/')
+        m.refresh_from_db()
+        self.assertEqual((m.attempted, m.marks_earned), (2, 5.0))
+
+        self.client.force_authenticate(self.student)
+        topics = self.client.get('/api/users/stats/').data['topics']
+        self.assertEqual([(t['topic_id'], t['mastery_pct']) for t in topics], [(self.topic.id, round(500 / 6, 2))])
+
+    def test_rebuild_command_matches_incremental_rows(self):
+        self._submit()
+        before = list(TopicMastery.objects.values_list('user_id', 'topic_id', 'attempted', 'correct', 'marks_earned'))
+        TopicMastery.objects.all().delete()
+        call_command('rebuild_topic_mastery', stdout=StringIO())
+        after = list(TopicMastery.objects.values_list('user_id', 'topic_id', 'attempted', 'correct', 'marks_earned'))
+        self.assertEqual(before, after)
+
+
+class ItemAnalysisTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username='item_t', password='pw', role='TEACHER')
+        self.topic = Topic.objects.create(name='Items')
+        self.exam = Exam.objects.create(title='Items Exam', topic=self.topic)
+        self.easy = Question.objects.create(topic=self.topic, type='MCQ', statement='easy', correct_answers=['A'])
+        self.hard = Question.objects.create(topic=self.topic, type='MCQ', statement='hard', correct_answers=['B'])
+        # Four students: only the strongest gets the hard question right.
+        for i, (easy_ans, hard_ans) in enumerate([('A', 'B'), ('A', 'C'), ('A', 'C'), ('D', 'A')]):
+            student = User.objects.create_user(username=f'item_s{i}', password='pw')
+            score = (easy_ans == 'A') + (hard_ans == 'B')
+            attempt = Attempt.objects.create(user=student, exam=self.exam, status='submitted', percentage=50.0 * score)
+            Response.objects.create(attempt=attempt, question=self.easy, correct=easy_ans == 'A',
+                                    answer_payload={'answers': [easy_ans]}, time_spent_seconds=10)
+            Response.objects.create(attempt=attempt, question=self.hard, correct=hard_ans == 'B',
+                                    answer_payload={'answers': [hard_ans]}, time_spent_seconds=30)
+
+    def test_item_statistics(self):
+        client = APIClient()
+        client.force_authenticate(self.teacher)
+        data = client.get(f'/api/analytics/exams/{self.exam.id}/items/').data
+        self.assertEqual((data['attempts'], data['responses']), (4, 8))
+        items = {q['question_id']: q for q in data['questions']}
+        self.assertEqual(items[self.easy.id]['facility'], 0.75)
+        self.assertEqual(items[self.hard.id]['facility'], 0.25)
+        # Top 27% of 4 attempts is one attempt: it got both right; the bottom one got both wrong.
+        self.assertEqual(items[self.hard.id]['discrimination'], 1.0)
+        self.assertEqual(items[self.hard.id]['choice_counts'], {'A': 1, 'B': 1, 'C': 2})
+        self.assertEqual(items[self.hard.id]['mean_time_seconds'], 30.0)
+        self.assertEqual(data['score_histogram']['counts'][0], 1)
+        self.assertEqual(sum(data['score_histogram']['counts']), 4)
+
+        with self.assertNumQueries(1):  # exam lookup only; analysis served from cache
+            client.get(f'/api/analytics/exams/{self.exam.id}/items/')
+
+    def test_ten_thousand_responses_compute_well_under_a_second(self):
+        import time
+        import numpy as np
+        import pandas as pd
+        from .item_analysis import RESPONSE_COLUMNS, compute_item_stats
+
+        rng = np.random.default_rng(0)
+        n_attempts, n_questions = 250, 40
+        qids = np.tile(np.arange(1, n_questions + 1), n_attempts)
+        aids = np.repeat(np.arange(1, n_attempts + 1), n_questions)
+        correct = rng.random(len(qids)) < 0.6
+        picks = rng.choice(list('ABCD'), len(qids))
+        responses = pd.DataFrame({
+            'attempt_id': aids,
+            'question_id': qids,
+            'correct': correct,
+            'teacher_mark': None,
+            'time_spent_seconds': rng.integers(5, 120, len(qids)),
+            'answer_payload': [{'answers': [p]} for p in picks],
+        }, columns=RESPONSE_COLUMNS)
+        percentages = pd.Series(rng.random(n_attempts) * 100, index=np.arange(1, n_attempts + 1))
+        questions = {q: {'id': q, 'type': 'MCQ', 'marks': 1, 'statement': '', 'correct_answers': ['A']}
+                     for q in range(1, n_questions + 1)}
+
+        started = time.perf_counter()
+        result = compute_item_stats(responses, percentages, questions)
+        elapsed = time.perf_counter() - started
+        self.assertEqual(result['responses'], 10_000)
+        self.assertEqual(len(result['questions']), n_questions)
+        self.assertLess(elapsed, 0.5)
+
+
+class StreamingExportTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='export_t', password='pw', role='TEACHER')
+        self.student = User.objects.create_user(username='export_s', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.curriculum = Curriculum.objects.create(name='Export Curriculum')
+        topic = Topic.objects.create(name='Export Topic', curriculum=self.curriculum)
+        self.exam = Exam.objects.create(title='Export Exam', topic=topic)
+        other = Exam.objects.create(title='Other Exam', topic=Topic.objects.create(name='Elsewhere'))
+        q = Question.objects.create(topic=topic, type='MCQ', statement='e', correct_answers=['A'])
+        for exam in (self.exam, self.exam, other):
+            attempt = Attempt.objects.create(user=self.student, exam=exam, status='submitted', percentage=50)
+            Response.objects.create(attempt=attempt, question=q, answer_payload={'answers': ['A']}, correct=True)
+
+    def test_csv_streams_filtered_rows_in_constant_queries(self):
+        import csv as csv_module
+
+        res = self.client.get('/api/exports/attempts/', {'curriculum': self.curriculum.id})
+        self.assertTrue(res.streaming)
+        with self.assertNumQueries(1):
+            body = b''.join(res.streaming_content).decode()
+        rows = list(csv_module.reader(body.splitlines()))
+        self.assertEqual(rows[0][:3], ['attempt_id', 'user_id', 'username'])
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({r[5] for r in rows[1:]}, {'Export Exam'})
+
+        res = self.client.get('/api/exports/attempts/', {'kind': 'responses', 'exam': self.exam.id})
+        rows = list(csv_module.reader(b''.join(res.streaming_content).decode().splitlines()))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][9], '{"answers": ["A"]}')
+
+    def test_xlsx_export_and_permissions(self):
+        from io import BytesIO
+        from openpyxl import load_workbook
+
+        res = self.client.get('/api/exports/attempts/', {'output': 'xlsx', 'from': '2000-01-01'})
+        self.assertEqual(res.status_code, 200)
+        sheet = load_workbook(BytesIO(b''.join(res.streaming_content))).active
+        self.assertEqual(sheet.max_row, 4)
+
+        self.assertEqual(self.client.get('/api/exports/attempts/', {'from': 'soon'}).status_code, 400)
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get('/api/exports/attempts/').status_code, 403)
+
+
+class BulkQuestionImportTests(TestCase):
+    HEADER = 'topic_id,type,statement,choices,correct_answers,difficulty,marks,estimated_time,tags\n'
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='import_t', password='pw', role='TEACHER')
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.topic = Topic.objects.create(name='Import Topic')
+
+    def _upload(self, body, name='questions.csv', **params):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        upload = SimpleUploadedFile(name, body if isinstance(body, bytes) else body.encode(), content_type='text/csv')
+        query = '&'.join(f'{k}={v}' for k, v in params.items())
+        return self.client.post(f'/api/questions/bulk/?{query}', {'csv': upload}, format='multipart')
+
+    def test_csv_import_is_batched_and_all_or_nothing(self):
+        t = self.topic.id
+        rows = ''.join(f'{t},MCQ,Question {i}?,1|2|3,B,Easy,2,30,a|b\n' for i in range(12))
+        exam = Exam.objects.create(title='Import Exam', topic=self.topic, duration_seconds=600)
+        paper_key = versioned_key(f'exams:paper:{exam.id}')
+        with self.assertNumQueries(7):  # topic lookup, savepoint, 3 batched inserts, release, topic exams
+            res = self._upload(self.HEADER + rows, batch_size=5)
+        self.assertNotEqual(versioned_key(f'exams:paper:{exam.id}'), paper_key)
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertEqual(res.data['created_count'], 12)
+        q = Question.objects.get(statement='Question 3?')
+        self.assertEqual((q.choices, q.correct_answers, q.marks, q.tags), ({'A': '1', 'B': '2', 'C': '3'}, ['B'], 2.0, ['a', 'b']))
+        self.assertEqual(q.content_hash, statement_hash('  question 3? '))
+
+        bad = f'{t},MCQ,Fine?,1|2,A,,1,30,\n999,MCQ,Orphan,1|2,A,,1,30,\n{t},MCQ,Bad key,1|2,E,,x,30,\n'
+        res = self._upload(self.HEADER + bad)
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual([e['row'] for e in res.data['errors']], [3, 4])
+        self.assertIn('topic_id', res.data['errors'][0]['errors'])
+        self.assertEqual(set(res.data['errors'][1]['errors']), {'correct_answers', 'marks'})
+        self.assertFalse(Question.objects.filter(statement='Fine?').exists())
+
+        res = self._upload(self.HEADER + bad, skip_invalid=1)
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data['created_count'], 1)
+
+    def test_dry_run_dedupe_and_xlsx(self):
+        from io import BytesIO
+        from openpyxl import Workbook
+
+        Question.objects.create(topic=self.topic, type='FIB', statement='Existing   statement', correct_answers=['x'])
+        other = Topic.objects.create(name='Other Import Topic')
+        Question.objects.create(topic=other, type='FIB', statement='New one', correct_answers=['y'])
+        t = self.topic.id
+        body = self.HEADER + f'{t},FIB,existing statement,,x,,1,30,\n{t},FIB,New one,,y,,1,30,\n{t},FIB,new ONE,,y,,1,30,\n'
+        res = self._upload(body, dry_run=1, dedupe=1)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual((res.data['valid_count'], res.data['created_count']), (1, 0))
+        self.assertEqual([d['row'] for d in res.data['duplicates']], [2, 4])
+        self.assertEqual(Question.objects.count(), 2)
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['topic_id', 'type', 'statement', 'choices', 'correct_answers', 'marks', 'estimated_time'])
+        sheet.append([t, 'multi', 'Pick two', 'a|b|c', 'A|C', 3, 45.0])
+        sheet.append([None] * 7)
+        buffer = BytesIO()
+        workbook.save(buffer)
+        res = self._upload(buffer.getvalue(), name='bank.xlsx')
+        self.assertEqual(res.status_code, 201, res.data)
+        q = Question.objects.get(id=res.data['created_ids'][0])
+        self.assertEqual((q.type, q.correct_answers, q.estimated_time), ('MULTI', ['A', 'C'], 45))
+
+        res = self.client.post('/api/questions/bulk/', {'items': [{'topic_id': t, 'type': 'FIB', 'statement': 'Json'}]}, format='json')
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(self._upload(b'\xff\xfe\x00bad').status_code, 400)
+
+
+class ImportJobTests(TestCase):
+    def setUp(self):
+        import tempfile
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name, EXAMS_IMPORT_JOB_THREADS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.teacher = User.objects.create_user(username='job_t', password='pw', role='TEACHER', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.topic = Topic.objects.create(name='Job Topic')
+
+    def _csv(self, body, name='bank.csv'):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        return SimpleUploadedFile(name, body.encode(), content_type='text/csv')
+
+    def test_async_question_upload_is_queued_then_processed_by_worker(self):
+        body = BulkQuestionImportTests.HEADER + ''.join(
+            f'{self.topic.id},FIB,Async {i},,x,,1,30,\n' for i in range(3)
+        ) + '999,FIB,Orphan,,x,,1,30,\n'
+        res = self.client.post('/api/questions/bulk/?async=1&skip_invalid=1', {'csv': self._csv(body)}, format='multipart')
+        self.assertEqual(res.status_code, 202)
+        job_id = res.data['job']['id']
+        self.assertEqual(res.data['job']['status'], 'queued')
+        self.assertFalse(Question.objects.filter(statement__startswith='Async').exists())
+
+        out = StringIO()
+        call_command('run_import_jobs', stdout=out)
+        self.assertIn('Ran 1 import job(s).', out.getvalue())
+        self.assertEqual(Question.objects.filter(statement__startswith='Async').count(), 3)
+
+        res = self.client.get(f'/api/imports/{job_id}/')
+        self.assertEqual(res.data['status'], 'succeeded')
+        self.assertEqual((res.data['total_rows'], res.data['created_count'], res.data['error_count']), (4, 3, 1))
+        self.assertEqual(res.data['errors'][0]['row'], 5)
+
+        student = User.objects.create_user(username='job_s', password='pw')
+        self.client.force_authenticate(student)
+        self.assertEqual(self.client.get(f'/api/imports/{job_id}/').status_code, 404)
+
+    def test_quiz_upload_runs_as_job_and_failures_are_recorded(self):
+        from exams.import_jobs import fail_stale_jobs, run_job
+        from quizzes.models import Quiz, Question as QuizQuestion
+
+        self.client.force_login(self.teacher)
+        body = 'quiz_title,subject,difficulty,text,option_a,option_b,correct_option\nQ1,Math,Easy,1+1?,2,3,a\nQ1,Math,Easy,2+2?,4,5,A\n'
+        res = self.client.post(reverse('quizzes:upload_quiz_excel'), {'excel': self._csv(body, 'quiz.csv')})
+        job = ImportJob.objects.get(kind='quiz_questions')
+        self.assertRedirects(res, reverse('quizzes:import_status', args=[job.id]), fetch_redirect_response=False)
+        self.assertTrue(run_job(job.id))
+        self.assertFalse(run_job(job.id))  # already claimed
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.created_count), ('succeeded', 2))
+        self.assertEqual(QuizQuestion.objects.filter(quiz__in=Quiz.objects.filter(title='Q1')).count(), 2)
+
+        broken = ImportJob.objects.create(kind='exam_questions', file='imports/missing.csv', original_name='missing.csv')
+        run_job(broken.id)
+        broken.refresh_from_db()
+        self.assertEqual(broken.status, 'failed')
+
+        ImportJob.objects.filter(pk=broken.pk).update(status='running', updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(fail_stale_jobs(), 1)
+
+    def test_orphaned_jobs_are_recovered_when_their_status_is_read(self):
+        from unittest import mock
+
+        stuck = ImportJob.objects.create(kind='exam_questions', file='imports/a.csv', original_name='a.csv', status='running')
+        ImportJob.objects.filter(pk=stuck.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        res = self.client.get(f'/api/imports/{stuck.id}/')
+        self.assertEqual(res.data['status'], 'failed')
+
+        # Queued on a process that restarted before its pool ran the job.
+        body = BulkQuestionImportTests.HEADER + f'{self.topic.id},FIB,Orphaned job,,x,,1,30,\n'
+        job_id = self.client.post('/api/questions/bulk/?async=1', {'csv': self._csv(body)}, format='multipart').data['job']['id']
+        ImportJob.objects.filter(pk=job_id).update(created_at=timezone.now() - timedelta(minutes=5))
+        with override_settings(EXAMS_IMPORT_JOB_THREADS=1), mock.patch('exams.import_jobs._pool') as pool:
+            self.assertEqual(self.client.get(f'/api/imports/{job_id}/').data['status'], 'queued')
+        (task,), _ = pool.return_value.submit.call_args
+        task()
+        self.assertEqual(self.client.get(f'/api/imports/{job_id}/').data['status'], 'succeeded')
+        self.assertTrue(Question.objects.filter(statement='Orphaned job').exists())
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        from .metrics import registry
+        registry.reset()
+        cache.clear()
+        self.client = APIClient()
+        self.curriculum = Curriculum.objects.create(name='Metrics Curriculum')
+        Topic.objects.create(name='Metrics Topic', curriculum=self.curriculum)
+
+    def test_server_timing_log_and_prometheus_endpoint(self):
+        url = f'/api/curriculums/{self.curriculum.id}/tree/'
+        with self.assertLogs('exams.metrics', level='INFO') as logs:
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', res['Server-Timing'])
+        self.assertIn('cache;desc="1 hits 0 misses"', res['Server-Timing'])
+        first, second = (json.loads(r.getMessage()) for r in logs.records)
+        self.assertEqual((first['view'], first['cache_misses'], second['cache_hits']), ('curriculum-tree', 1, 1))
+        self.assertEqual(second['response_bytes'], len(res.content))
+
+        self.client.force_authenticate(User.objects.create_user(username='metrics_student', password='pw12345'))
+        self.assertEqual(self.client.get(reverse('request_metrics')).status_code, 403)
+        self.client.force_authenticate(User.objects.create_user(username='metrics_admin', password='pw12345', role='ADMIN'))
+        body = self.client.get(reverse('request_metrics')).content.decode()
+        self.assertIn('mentara_http_requests_total{view="curriculum-tree",method="GET",status="200"} 2', body)
+        self.assertIn('mentara_http_request_duration_seconds_count{view="curriculum-tree"} 2', body)
+        self.assertIn('mentara_cache_hits_total{view="curriculum-tree"} 1', body)
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled_middleware_is_not_installed(self):
+        res = self.client.get(f'/api/curriculums/{self.curriculum.id}/tree/')
+        self.assertNotIn('Server-Timing', res)
+
+
+class ApiResponseCacheTests(TestCase):
+    def setUp(self):
+        from .api_cache import reset_cache_stats
+        reset_cache_stats()
+        cache.clear()
+        self.client = APIClient()
+        self.topic = Topic.objects.create(name='Cached Topic')
+        Exam.objects.create(title='Cached Exam', topic=self.topic, duration_seconds=600)
+
+    def test_list_is_served_from_cache_until_a_signal_invalidates_it(self):
+        url = reverse('exam-list')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+        self.assertEqual((res['X-Cache'], len(ctx.captured_queries)), ('HIT', 0))
+        self.assertEqual([e['title'] for e in res.data], ['Cached Exam'])
+        self.assertEqual(self.client.get(url, {'topic': self.topic.id})['X-Cache'], 'MISS')
+
+        Question.objects.create(topic=self.topic, type='MCQ', statement='Q?', choices={'A': '1'}, correct_answers=['A'])
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        Exam.objects.create(title='Second Exam', topic=self.topic, duration_seconds=600)
+        res = self.client.get(url)
+        self.assertEqual((res['X-Cache'], len(res.data)), ('MISS', 2))
+
+    def test_role_is_part_of_the_key_and_counters_are_exported(self):
+        from .api_cache import cache_stats
+        admin = User.objects.create_user(username='cache_admin', password='pw12345', role='ADMIN')
+        Curriculum.objects.create(name='Archived', is_active=False)
+        url = reverse('curriculum-list')
+        self.assertEqual(len(self.client.get(url, {'include_archived': 1}).data), 0)
+        self.client.force_authenticate(admin)
+        res = self.client.get(url, {'include_archived': 1})
+        self.assertEqual((res['X-Cache'], len(res.data)), ('MISS', 1))
+        self.assertEqual(self.client.get(url, {'include_archived': 1})['X-Cache'], 'HIT')
+        self.assertEqual(cache_stats()['curriculum'], {'hit': 1, 'miss': 2})
+        body = self.client.get(reverse('request_metrics')).content.decode()
+        self.assertIn('mentara_api_cache_requests_total{resource="curriculum",result="hit"} 1', body)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.curriculum = Curriculum.objects.create(name='Etag Curriculum')
+        self.topic = Topic.objects.create(name='Etag Topic', curriculum=self.curriculum)
+        self.q = Question.objects.create(topic=self.topic, type='STRUCT', statement='Explain.', marks=4)
+        self.exam = Exam.objects.create(title='Etag Exam', topic=self.topic, duration_seconds=600)
+
+    def _revalidate(self, url, etag):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return res, len(ctx.captured_queries)
+
+    def test_cached_list_answers_304_without_queries(self):
+        url = reverse('exam-list')
+        first = self.client.get(url)
+        self.assertTrue(first['ETag'].startswith('W/"'))
+        self.assertIn('Last-Modified', first)
+        self.assertIn('no-cache', first['Cache-Control'])
+        res, queries = self._revalidate(url, first['ETag'])
+        self.assertEqual((res.status_code, queries, res.content), (304, 0, b''))
+        self.assertEqual(res['ETag'], first['ETag'])
+
+        Exam.objects.create(title='Another Exam', topic=self.topic, duration_seconds=600)
+        res, _ = self._revalidate(url, first['ETag'])
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res['ETag'], first['ETag'])
+
+    def test_curriculum_tree_etag_follows_the_tree_generation(self):
+        url = f'/api/curriculums/{self.curriculum.id}/tree/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self._revalidate(url, etag)[0].status_code, 304)
+        Topic.objects.create(name='Etag Child', curriculum=self.curriculum, parent=self.topic)
+        self.assertEqual(self._revalidate(url, etag)[0].status_code, 200)
+
+    def test_review_attempt_revalidates_until_graded(self):
+        student = User.objects.create_user(username='etag_student', password='pw12345')
+        attempt = Attempt.objects.create(user=student, exam=self.exam, status='submitted', finished_at=timezone.now())
+        response = Response.objects.create(attempt=attempt, question=self.q, answer_payload={'text': 'x'})
+        self.client.force_authenticate(student)
+        url = reverse('review_attempt', args=[attempt.id])
+
+        with CaptureQueriesContext(connection) as ctx:
+            first = self.client.get(url)
+        res, queries = self._revalidate(url, first['ETag'])
+        self.assertEqual(res.status_code, 304)
+        self.assertLess(queries, len(ctx.captured_queries))
+
+        response.teacher_mark = 3
+        response.save()
+        res, _ = self._revalidate(url, first['ETag'])
+        self.assertEqual((res.status_code, res.data['responses'][0]['teacher_mark']), (200, 3))
+        Attempt.objects.filter(pk=attempt.pk).update(rank=1)
+        self.assertEqual(self._revalidate(url, res['ETag'])[0].status_code, 200)
+
+
+class AttemptListPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(username='page_teacher', password='pw12345', role='TEACHER')
+        self.student = User.objects.create_user(username='page_student', password='pw12345')
+        topic = Topic.objects.create(name='Paging Topic')
+        self.structs = [Question.objects.create(topic=topic, type='STRUCT', statement=f'S{i}', marks=2) for i in range(2)]
+        self.exam = Exam.objects.create(title='Paging Exam', topic=topic, duration_seconds=600)
+        now = timezone.now()
+        self.attempts = [
+            Attempt.objects.create(user=self.student, exam=self.exam, status='submitted', started_at=now - timedelta(minutes=i))
+            for i in range(5)
+        ]
+        for q in self.structs:
+            Response.objects.create(attempt=self.attempts[1], question=q, answer_payload={})
+        Response.objects.create(attempt=self.attempts[2], question=self.structs[0], answer_payload={}, teacher_mark=1)
+        for attempt in self.attempts:
+            sync_grading_counters(attempt)
+
+    def _walk(self, params):
+        ids, url, queries = [], reverse('attempt-list'), []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(url, params if not ids else None)
+            self.assertEqual(res.status_code, 200)
+            queries.append(len(ctx.captured_queries))
+            ids.extend(row['id'] for row in res.data['results'])
+            url = res.data['next']
+        return ids, queries
+
+    def test_cursor_pages_are_slim_and_constant_cost(self):
+        self.client.force_authenticate(self.teacher)
+        ids, queries = self._walk({'page_size': 2})
+        self.assertEqual(ids, [a.id for a in self.attempts])
+        self.assertEqual(len(set(queries)), 1)
+        row = self.client.get(reverse('attempt-list'), {'page_size': 5}).data['results'][1]
+        self.assertEqual((row['requires_teacher_grading'], row['needs_grading']), (True, True))
+        self.assertEqual((row['exam']['title'], row['exam']['topic_name'], row['user']['username']),
+                         ('Paging Exam', 'Paging Topic', 'page_student'))
+        self.assertNotIn('attempts_count', row['exam'])
+
+        detail = self.client.get(reverse('attempt-detail', args=[self.attempts[1].id])).data
+        self.assertEqual((detail['needs_grading'], detail['exam']['questions_count']), (True, 0))
+
+    def test_needs_grading_filter_returns_each_attempt_once(self):
+        self.client.force_authenticate(self.teacher)
+        ids, _ = self._walk({'needs_grading': 1})
+        self.assertEqual(ids, [self.attempts[1].id])
+        other = User.objects.create_user(username='page_other', password='pw12345')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(reverse('attempt-list')).data['results'], [])
+
+
+class GradingQueueTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(username='queue_teacher', password='pw12345', role='TEACHER')
+        self.student = User.objects.create_user(username='queue_student', password='pw12345')
+        topic = Topic.objects.create(name='Queue Topic')
+        self.structs = [Question.objects.create(topic=topic, type='STRUCT', statement=f'Q{i}', marks=3) for i in range(2)]
+        self.exam = Exam.objects.create(title='Queue Exam', topic=topic, duration_seconds=600, total_marks=6)
+        for n, q in enumerate(self.structs):
+            ExamQuestion.objects.create(exam=self.exam, question=q, order=n + 1)
+        now = timezone.now()
+        self.attempts = []
+        for i in range(4):
+            attempt = Attempt.objects.create(
+                user=self.student, exam=self.exam, status='submitted',
+                started_at=now - timedelta(hours=i + 1), finished_at=now - timedelta(minutes=10 * i),
+            )
+            for q in self.structs:
+                Response.objects.create(attempt=attempt, question=q, answer_payload={'text': 'x'})
+            sync_grading_counters(attempt)
+            self.attempts.append(attempt)
+
+    def _walk(self, params):
+        ids, url, queries = [], reverse('grading_queue'), []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(url, params if not ids else None)
+            self.assertEqual(res.status_code, 200)
+            queries.append(len(ctx.captured_queries))
+            ids.extend(row['id'] for row in res.data['results'])
+            url = res.data['next']
+        return ids, queries
+
+    def test_queue_is_oldest_submission_first_with_constant_page_cost(self):
+        self.client.force_authenticate(self.teacher)
+        ids, queries = self._walk({'page_size': 1})
+        self.assertEqual(ids, [a.id for a in reversed(self.attempts)])
+        self.assertEqual(len(set(queries)), 1)
+        row = self.client.get(reverse('grading_queue')).data['results'][0]
+        self.assertEqual((row['pending_struct_count'], row['needs_grading']), (2, True))
+
+    def test_grading_drains_the_queue(self):
+        self.client.force_authenticate(self.teacher)
+        attempt = self.attempts[0]
+        for n, resp in enumerate(attempt.responses.order_by('id')):
+            res = self.client.post(reverse('grade_response', args=[resp.id]), {'teacher_mark': 2}, format='json')
+            self.assertEqual(res.status_code, 200)
+            attempt.refresh_from_db()
+            self.assertEqual(attempt.pending_struct_count, 1 - n)
+        ids, _ = self._walk({})
+        self.assertNotIn(attempt.id, ids)
+        self.assertEqual(self.client.get(reverse('attempt-list'), {'needs_grading': 1}).data['results'][-1]['id'],
+                         self.attempts[-1].id)
+
+    def test_submit_counts_ungraded_struct_answers(self):
+        self.client.force_authenticate(User.objects.create_user(username='queue_new', password='pw12345'))
+        started = self.client.post(reverse('start_exam', args=[self.exam.id]), {}, format='json')
+        self.assertIn(started.status_code, (200, 201))
+        attempt_id = started.data['attempt_id']
+        payload = [{'question_id': q.id, 'answer_payload': {'text': 'Because.'}} for q in self.structs]
+        res = self.client.post(reverse('submit_exam', args=[self.exam.id]),
+                               {'attempt_id': attempt_id, 'responses': payload}, format='json')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(Attempt.objects.get(pk=attempt_id).pending_struct_count, 2)
+
+    def test_students_and_bad_filters_are_rejected(self):
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get(reverse('grading_queue')).status_code, 403)
+        self.client.force_authenticate(self.teacher)
+        self.assertEqual(self.client.get(reverse('grading_queue'), {'exam': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('grading_queue'), {'exam': self.exam.id + 1}).data['results'], [])
+
+
+
+class GradingCounterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(username='count_teacher', password='pw12345', role='TEACHER')
+        self.student = User.objects.create_user(username='count_student', password='pw12345')
+        topic = Topic.objects.create(name='Counter Topic')
+        self.mcq = Question.objects.create(topic=topic, type='MCQ', statement='m', choices={'A': 'a', 'B': 'b'},
+                                           correct_answers=['A'], marks=1)
+        self.structs = [Question.objects.create(topic=topic, type='STRUCT', statement=f'C{i}', marks=4) for i in range(2)]
+        self.exam = Exam.objects.create(title='Counter Exam', topic=topic, duration_seconds=600, total_marks=9)
+        for n, q in enumerate([self.mcq, *self.structs]):
+            ExamQuestion.objects.create(exam=self.exam, question=q, order=n + 1)
+
+    def _counters(self, attempt):
+        attempt.refresh_from_db()
+        return attempt.struct_total, attempt.struct_graded, attempt.pending_struct_count, attempt.max_marks
+
+    def test_submit_grade_and_finalize_keep_counters_current(self):
+        self.client.force_authenticate(self.student)
+        attempt_id = self.client.post(reverse('start_exam', args=[self.exam.id]), {}, format='json').data['attempt_id']
+        payload = [{'question_id': self.mcq.id, 'answer': 'A'}] + [
+            {'question_id': q.id, 'answer_payload': {'text': 'Because.'}} for q in self.structs
+        ]
+        self.client.post(reverse('submit_exam', args=[self.exam.id]), {'attempt_id': attempt_id, 'responses': payload}, format='json')
+        attempt = Attempt.objects.get(pk=attempt_id)
+        self.assertEqual(self._counters(attempt), (2, 0, 2, 9.0))
+
+        with CaptureQueriesContext(connection) as ctx:
+            row = self.client.get(reverse('my_attempts')).data['attempts'][0]
+        self.assertEqual((row['requires_teacher_grading'], row['needs_grading']), (True, True))
+        self.assertFalse(any('"exams_response"' in q['sql'] for q in ctx.captured_queries))
+
+        self.client.force_authenticate(self.teacher)
+        finalize = reverse('finalize_attempt_grading', args=[attempt_id])
+        self.assertEqual(self.client.post(finalize).status_code, 400)
+        for resp in attempt.responses.filter(question__type='STRUCT'):
+            self.client.post(reverse('grade_response', args=[resp.id]), {'teacher_mark': 3}, format='json')
+        self.assertEqual(self._counters(attempt), (2, 2, 0, 9.0))
+        self.assertEqual(self.client.post(finalize).status_code, 200)
+        self.assertEqual(self.client.get(reverse('attempt-detail', args=[attempt_id])).data['needs_grading'], False)
+
+    def test_check_command_reports_and_repairs_drift(self):
+        attempt = Attempt.objects.create(user=self.student, exam=self.exam, status='submitted', started_at=timezone.now())
+        for q in self.structs:
+            Response.objects.create(attempt=attempt, question=q, answer_payload={})
+        with self.assertRaises(CommandError):
+            call_command('check_grading_counters', stdout=StringIO())
+        call_command('check_grading_counters', '--fix', stdout=StringIO())
+        self.assertEqual(self._counters(attempt), (2, 0, 2, 8.0))
+        self.assertTrue(ExamScoreEntry.objects.get(attempt=attempt).needs_grading)
+        out = StringIO()
+        call_command('check_grading_counters', stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+
+class CacheVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_moves_the_key_and_survives_eviction(self):
+        first = versioned_key('exams:test_thing')
+        self.assertEqual(versioned_key('exams:test_thing'), first)
+        bump_version('exams:test_thing')
+        second = versioned_key('exams:test_thing')
+        self.assertNotEqual(second, first)
+        cache.clear()
+        bump_version('exams:test_thing')
+        self.assertNotIn(versioned_key('exams:test_thing'), (first, second))
+
+    @override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        LOCAL_CACHE_MAX_TIMEOUT=30,
+    )
+    def test_timeouts_are_capped_without_a_shared_cache(self):
+        self.assertEqual(cache_timeout(3600), 30)
+        self.assertEqual(cache_timeout(None), 30)
+        self.assertEqual(cache_timeout(10), 10)
+        with override_settings(CACHES={'default': {'BACKEND': 'django_redis.cache.RedisCache'}}):
+            self.assertEqual(cache_timeout(3600), 3600)
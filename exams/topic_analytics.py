@@ -0,0 +1,110 @@
+"""Per-user topic accuracy for ``analytics_user_topics``.
+
+The endpoint used to load every submitted ``Response`` of the user with its
+question and topic and tally them in Python. ``user_topic_stats`` reads the
+per-topic ``TopicMastery`` rollup (see ``exams.mastery``), or for a ``since``
+window does the tally in the database (one GROUP BY topic with a conditional
+count of correct responses). Counts can be rolled up through the topic
+hierarchy using ``Topic.path``.
+
+Results are cached per user under a version key that
+``attempt_sync.sync_attempt_indexes`` bumps whenever one of the user's attempts is
+submitted, timed out or graded.
+"""
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+
+from .cache_versions import bump_version, cache_timeout, versioned_key
+from .metrics import record_cache
+from .models import Response, Topic, TopicMastery
+from .ranking import FINISHED_STATUSES
+
+
+USER_TOPICS_CACHE_TIMEOUT = 60 * 10
+
+
+def _stats_name(user_id) -> str:
+    return f'exams:user_topics:{user_id}'
+
+
+def invalidate_user_topic_stats(user_id) -> None:
+    if not user_id:
+        return
+    bump_version(_stats_name(user_id))
+
+
+def _row(topic_id, name, correct, total, **extra) -> dict:
+    return {
+        'topic_id': topic_id,
+        'topic': name,
+        'correct': int(correct or 0),
+        'total': int(total or 0),
+        'accuracy_pct': round(100.0 * (correct / total), 2) if total else 0.0,
+        **extra,
+    }
+
+
+def _aggregate(user_id, since=None, curriculum_id=None) -> list[dict]:
+    """Rows of ``topic_id, name, path, correct, total``.
+
+    Without ``since`` this reads the ``TopicMastery`` rollup (one row per
+    topic); a time window needs the raw responses, grouped by topic.
+    """
+    if since is None:
+        qs = TopicMastery.objects.filter(user_id=user_id, attempted__gt=0)
+        if curriculum_id:
+            qs = qs.filter(topic__curriculum_id=curriculum_id)
+        return list(
+            qs.values('topic_id', 'correct', name=F('topic__name'), path=F('topic__path'), total=F('attempted'))
+        )
+    qs = Response.objects.filter(
+        attempt__user_id=user_id, attempt__status__in=FINISHED_STATUSES, attempt__finished_at__gte=since
+    )
+    if curriculum_id:
+        qs = qs.filter(question__topic__curriculum_id=curriculum_id)
+    return list(
+        qs.order_by()
+        .values(topic_id=F('question__topic_id'), name=F('question__topic__name'), path=F('question__topic__path'))
+        .annotate(total=Count('id'), correct=Count('id', filter=Q(correct=True)))
+    )
+
+
+def _rollup(rows: list[dict]) -> list[dict]:
+    """Add each topic's counts to all of its ancestors (from ``Topic.path``)."""
+    totals: dict[int, list[int]] = {}
+    for row in rows:
+        lineage = [int(p) for p in (row['path'] or '').strip('/').split('/') if p] or [row['topic_id']]
+        for topic_id in lineage:
+            acc = totals.setdefault(topic_id, [0, 0])
+            acc[0] += row['correct']
+            acc[1] += row['total']
+    topics = Topic.objects.filter(id__in=totals).only('id', 'name', 'parent_id').in_bulk()
+    return [
+        _row(topic_id, topics[topic_id].name, correct, total, parent_id=topics[topic_id].parent_id)
+        for topic_id, (correct, total) in totals.items()
+        if topic_id in topics
+    ]
+
+
+def user_topic_stats(user_id, since=None, curriculum_id=None, rollup=False) -> list[dict]:
+    """Accuracy per topic over the user's finished attempts.
+
+    ``since`` limits to attempts finished at or after it; ``curriculum_id``
+    limits to that curriculum's topics. With ``rollup`` every ancestor topic
+    also gets a row with the summed counts of its subtree.
+    """
+    key = (
+        f'{versioned_key(_stats_name(user_id))}:'
+        f'{since.isoformat() if since else ""}:{curriculum_id or ""}:{int(bool(rollup))}'
+    )
+    data = cache.get(key)
+    record_cache(data is not None)
+    if data is None:
+        rows = _aggregate(user_id, since, curriculum_id)
+        if rollup:
+            data = _rollup(rows)
+        else:
+            data = [_row(r['topic_id'], r['name'], r['correct'], r['total']) for r in rows]
+        data.sort(key=lambda r: r['topic_id'])
+        cache.set(key, data, cache_timeout(USER_TOPICS_CACHE_TIMEOUT))
+    return data
@@ -0,0 +1,127 @@
+"""Topic trees built from a single topic query plus two grouped count queries.
+
+``TopicSerializer`` used to recurse through ``obj.children`` and run two
+count queries per node. ``build_topic_index`` loads the active topics once,
+groups active question/exam counts per topic, and the serializer walks the
+index in memory when it is passed as ``context['topic_index']``.
+
+``CurriculumViewSet.tree`` caches its serialized roots per curriculum under a
+shared generation number; ``invalidate_topic_trees`` bumps it on
+Curriculum/Topic/Question/Exam writes (see ``exams.signals``) and after bulk
+``update()`` calls that bypass signals.
+
+``Topic.path`` (materialized ancestor path) is maintained by ``Topic.save``;
+``topic_path_mismatches`` recomputes it from ``parent`` links so
+``manage.py check_topic_paths`` can report and repair drift.
+"""
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from .api_cache import invalidate_api_cache
+from .cache_versions import bump_version, cache_timeout, version
+from .metrics import record_cache
+from .models import Exam, Question, Topic
+
+
+TOPIC_TREE_CACHE_TIMEOUT = 60 * 60
+TOPIC_TREE_GENERATION = 'exams:topic_tree_generation'
+
+
+class TopicTreeIndex:
+    def __init__(self, topics, question_counts, exam_counts):
+        self._children = defaultdict(list)
+        for t in topics:
+            self._children[t.parent_id].append(t)
+        self._question_counts = question_counts
+        self._exam_counts = exam_counts
+
+    def roots(self):
+        return self._children.get(None, [])
+
+    def children_of(self, topic_id):
+        return self._children.get(topic_id, [])
+
+    def questions_count(self, topic_id) -> int:
+        return self._question_counts.get(topic_id, 0)
+
+    def exams_count(self, topic_id) -> int:
+        return self._exam_counts.get(topic_id, 0)
+
+
+def build_topic_index(curriculum_id=None) -> TopicTreeIndex:
+    topics = Topic.objects.filter(is_active=True).select_related('curriculum')
+    if curriculum_id:
+        topics = topics.filter(curriculum_id=curriculum_id)
+
+    def grouped_counts(qs):
+        if curriculum_id:
+            qs = qs.filter(topic__curriculum_id=curriculum_id)
+        return dict(qs.order_by().values_list('topic_id').annotate(n=Count('id')))
+
+    return TopicTreeIndex(
+        list(topics),
+        grouped_counts(Question.objects.filter(is_active=True)),
+        grouped_counts(Exam.objects.filter(is_active=True)),
+    )
+
+
+def tree_generation() -> int:
+    return version(TOPIC_TREE_GENERATION)
+
+
+def invalidate_topic_trees() -> None:
+    bump_version(TOPIC_TREE_GENERATION)
+
+
+def get_curriculum_tree(curriculum_id, build):
+    """Return the cached tree payload for ``curriculum_id``, calling ``build()`` on a miss."""
+    key = f'exams:topic_tree:{curriculum_id}:g{tree_generation()}'
+    data = cache.get(key)
+    record_cache(data is not None)
+    if data is None:
+        data = build()
+        cache.set(key, data, cache_timeout(TOPIC_TREE_CACHE_TIMEOUT))
+    return data
+
+
+def expected_topic_paths() -> dict[int, str]:
+    """Recompute every topic's materialized path from ``parent`` links."""
+    parents = dict(Topic.objects.values_list('id', 'parent_id'))
+    paths: dict[int, str] = {}
+
+    def resolve(topic_id):
+        chain = []
+        current = topic_id
+        # Walk up until a known path or a root; a cycle stops the walk as well.
+        while current is not None and current not in paths and current not in chain:
+            chain.append(current)
+            current = parents.get(current)
+        prefix = paths.get(current, '/')
+        for node in reversed(chain):
+            prefix = f'{prefix}{node}/'
+            paths[node] = prefix
+
+    for topic_id in parents:
+        resolve(topic_id)
+    return paths
+
+
+def topic_path_mismatches() -> list[tuple[int, str, str]]:
+    """Return ``(topic_id, stored_path, expected_path)`` for drifted topics."""
+    expected = expected_topic_paths()
+    return [
+        (topic_id, stored, expected[topic_id])
+        for topic_id, stored in Topic.objects.values_list('id', 'path').order_by('id')
+        if stored != expected[topic_id]
+    ]
+
+
+def repair_topic_paths(mismatches) -> int:
+    Topic.objects.bulk_update(
+        [Topic(id=topic_id, path=expected) for topic_id, _, expected in mismatches], ['path'], batch_size=500
+    )
+    invalidate_topic_trees()
+    invalidate_api_cache('topic')
+    return len(mismatches)
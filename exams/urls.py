@@ -2,14 +2,14 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     CurriculumViewSet, TopicViewSet, QuestionViewSet, ExamViewSet, AttemptViewSet, ResponseViewSet,
-    start_exam, submit_exam, resume_attempt, save_attempt,
-    bulk_create_questions, my_attempts, review_attempt, analytics_user_topics, leaderboard,
-    grade_response, upload_evaluated_pdf, analytics_exams_summary, upload_attempt_submission,
-    finalize_attempt_grading
+    start_exam, submit_exam, resume_attempt, save_attempt, autosave_attempt,
+    bulk_create_questions, import_job_detail, my_attempts, review_attempt, analytics_user_topics, leaderboard,
+    grade_response, upload_evaluated_pdf, analytics_exams_summary, analytics_exam_items, export_attempts, upload_attempt_submission,
+    finalize_attempt_grading, grading_queue
 )
 from .admin_views import (
     admin_overview, admin_users_list, admin_delete_user, 
-    admin_analytics, add_questions_to_exam,
+    admin_analytics, add_questions_to_exam, request_metrics,
     exam_questions_list, exam_question_remove, exam_questions_reorder
 )
 
@@ -22,12 +22,15 @@ router.register(r'attempts', AttemptViewSet)
 router.register(r'responses', ResponseViewSet)
 
 urlpatterns = [
+    # Before the router, whose questions/<pk>/ route would otherwise match "bulk".
+    path('questions/bulk/', bulk_create_questions, name='questions_bulk'),
     path('', include(router.urls)),
     # Admin endpoints
     path('admin/overview/', admin_overview, name='admin_overview'),
     path('admin/users/', admin_users_list, name='admin_users_list'),
     path('admin/users/<int:user_id>/', admin_delete_user, name='admin_delete_user'),
     path('admin/analytics/', admin_analytics, name='admin_analytics'),
+    path('metrics/', request_metrics, name='request_metrics'),
     path('exams/<int:exam_id>/add-questions/', add_questions_to_exam, name='add_questions_to_exam'),
     path('exams/<int:exam_id>/questions/', exam_questions_list, name='exam_questions_list'),
     path('exams/<int:exam_id>/questions/<int:question_id>/', exam_question_remove, name='exam_question_remove'),
@@ -37,12 +40,16 @@ urlpatterns = [
     path('exams/<int:exam_id>/submit/', submit_exam, name='submit_exam'),
     path('attempts/<str:attempt_id>/resume/', resume_attempt, name='resume_attempt'),
     path('attempts/<str:attempt_id>/save/', save_attempt, name='save_attempt'),
-    path('questions/bulk/', bulk_create_questions, name='questions_bulk'),
+    path('attempts/<str:attempt_id>/autosave/', autosave_attempt, name='autosave_attempt'),
+    path('imports/<int:job_id>/', import_job_detail, name='import_job_detail'),
     path('users/me/attempts/', my_attempts, name='my_attempts'),
     path('attempts/<str:attempt_id>/review/', review_attempt, name='review_attempt'),
     path('analytics/user/me/topics/', analytics_user_topics, name='analytics_user_topics'),
     path('analytics/exams/summary/', analytics_exams_summary, name='analytics_exams_summary'),
+    path('analytics/exams/<int:exam_id>/items/', analytics_exam_items, name='analytics_exam_items'),
+    path('exports/attempts/', export_attempts, name='export_attempts'),
     path('leaderboard/', leaderboard, name='leaderboard'),
+    path('grading/queue/', grading_queue, name='grading_queue'),
     path('responses/<int:response_id>/grade/', grade_response, name='grade_response'),
     path('attempts/<int:attempt_id>/finalize-grading/', finalize_attempt_grading, name='finalize_attempt_grading'),
     path('attempts/<int:attempt_id>/upload-pdf/', upload_evaluated_pdf, name='upload_evaluated_pdf'),
@@ -5,14 +5,39 @@ from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
 from django.db import transaction
 from django.db.models.deletion import ProtectedError
-from django.db.models import Avg, Count, Exists, Max, OuterRef, Q
+from django.db.models import Avg, Count, F, Max, OuterRef, Q, Subquery
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+import json
 import random
 from datetime import timedelta
 
-from .models import Curriculum, Topic, Question, Exam, ExamQuestion, Attempt, Response, LeaderboardEntry
+from .models import Curriculum, Topic, Question, Exam, ExamQuestion, Attempt, AttemptUpload, ImportJob, Response, LeaderboardEntry
 from django.core.mail import send_mail
-from .serializers import CurriculumSerializer, TopicSerializer, QuestionSerializer, ExamSerializer, AttemptSerializer, ResponseSerializer
+from .serializers import (
+    CurriculumSerializer, TopicSerializer, QuestionSerializer, ExamSerializer, AttemptSerializer, AttemptListSerializer,
+    ResponseSerializer, annotate_exam_counts,
+)
+from .api_cache import CachedResponseMixin, invalidate_api_cache
+from .attempt_state import (
+    add_uploads, finalize_grades, flagged_map, refresh_grading_counters, set_evaluated_pdf, upload_entries,
+)
+from .attempt_sync import sync_attempt_indexes
+from .autosave import (
+    AUTOSAVE_MAX_ITEMS, discard_drafts, flush_drafts, pending_drafts, save_autosave, write_behind_enabled,
+)
+from .conditional import latest_timestamp, make_etag, not_modified, set_validators
+from .exports import EXPORT_KINDS, csv_response, export_queryset, xlsx_response
+from .import_jobs import create_job, job_status, resume_if_orphaned
+from .grading import get_answer_key, grade_submission, score_attempt
+from .item_analysis import exam_item_analysis
+from .pagination import AttemptCursorPagination, GradingQueuePagination
+from .question_import import IMPORT_BATCH_SIZE, ImportFileError, import_questions, items_reader, upload_reader
+from .papers import get_exam_paper, paper_questions_for_order
+from .ranking import rank_in_exam
+from .topic_analytics import user_topic_stats
+from .topic_tree import build_topic_index, get_curriculum_tree, invalidate_topic_trees, tree_generation
+from .leaderboard import leaderboard_rows, normalize_period, user_position
 
 
 def _attempt_expires_at(attempt: Attempt) -> timezone.datetime | None:
@@ -32,6 +57,9 @@ def _mark_attempt_timedout(attempt: Attempt, expires_at_dt: timezone.datetime |
         return
     if attempt.status == 'timedout':
         return
+    if write_behind_enabled():
+        flush_drafts(attempt)
+        transaction.on_commit(lambda: discard_drafts(attempt))
     attempt.status = 'timedout'
     attempt.finished_at = expires_at_dt
     try:
@@ -39,56 +67,21 @@ def _mark_attempt_timedout(attempt: Attempt, expires_at_dt: timezone.datetime |
     except Exception:
         attempt.duration_seconds = int(max(0, (expires_at_dt - attempt.started_at).total_seconds()))
     attempt.save(update_fields=['status', 'finished_at', 'duration_seconds'])
-
-
-def _attempt_needs_grading(attempt_id: int) -> bool:
-    return Response.objects.filter(
-        attempt_id=attempt_id,
-        question__type='STRUCT',
-        teacher_mark__isnull=True,
-    ).exists()
+    sync_attempt_indexes(attempt)
 
 
 def _compute_attempt_rank(attempt: Attempt) -> int | None:
     """Compute rank for an attempt within its exam.
 
     Rank ordering: higher score first; ties broken by shorter duration, then earlier start, then lower id.
-    Excludes attempts that still need STRUCT grading.
+    Excludes attempts that still need STRUCT grading (``pending_struct_count``). Counts
+    the other attempts in the per-exam score index (see exams.ranking).
     """
     if not attempt or not getattr(attempt, 'exam_id', None):
         return None
     if attempt.status not in ('submitted', 'timedout'):
         return None
-    if _attempt_needs_grading(attempt.id):
-        return None
-
-    base_qs = Attempt.objects.filter(
-        exam_id=attempt.exam_id,
-        status__in=['submitted', 'timedout'],
-    )
-    pending_struct = Response.objects.filter(
-        attempt_id=OuterRef('pk'),
-        question__type='STRUCT',
-        teacher_mark__isnull=True,
-    )
-    base_qs = base_qs.annotate(needs_grading=Exists(pending_struct)).filter(needs_grading=False)
-
-    better = base_qs.filter(
-        Q(total_score__gt=attempt.total_score)
-        | Q(total_score=attempt.total_score, duration_seconds__lt=attempt.duration_seconds)
-        | Q(
-            total_score=attempt.total_score,
-            duration_seconds=attempt.duration_seconds,
-            started_at__lt=attempt.started_at,
-        )
-        | Q(
-            total_score=attempt.total_score,
-            duration_seconds=attempt.duration_seconds,
-            started_at=attempt.started_at,
-            id__lt=attempt.id,
-        )
-    ).count()
-    return int(better) + 1
+    return rank_in_exam(attempt, needs_grading=attempt.pending_struct_count > 0)
 
 class IsAdminOrTeacher(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -119,9 +112,10 @@ def _is_teacher_or_admin(user):
     role = getattr(user, 'role', None)
     return bool(user.is_staff or role in ('ADMIN', 'TEACHER') or user.groups.filter(name__iexact='Teachers').exists())
 
-class TopicViewSet(viewsets.ModelViewSet):
+class TopicViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Topic.objects.filter(is_active=True).filter(Q(curriculum__isnull=True) | Q(curriculum__is_active=True))
     serializer_class = TopicSerializer
+    cache_scopes = ('curriculum', 'topic', 'exam', 'question')
 
     def get_queryset(self):
         qs = super().get_queryset().select_related('curriculum', 'parent')
@@ -141,6 +135,12 @@ class TopicViewSet(viewsets.ModelViewSet):
             return [permissions.AllowAny()]
         return [IsAdminOrTeacher()]
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if getattr(self, 'action', None) == 'list':
+            context['topic_index'] = build_topic_index(self.request.query_params.get('curriculum') or None)
+        return context
+
     def perform_create(self, serializer):
         # Enforce the requested rule: Topics must belong to a Curriculum.
         curriculum = serializer.validated_data.get('curriculum')
@@ -157,17 +157,9 @@ class TopicViewSet(viewsets.ModelViewSet):
         except ProtectedError:
             # Production-safe behavior: if topic is referenced (questions/exams),
             # archive the topic (and its subtree) instead of failing.
-            to_archive = [instance.id]
-            idx = 0
-            while idx < len(to_archive):
-                parent_id = to_archive[idx]
-                child_ids = list(
-                    Topic.objects.filter(parent_id=parent_id, is_active=True).values_list('id', flat=True)
-                )
-                to_archive.extend([cid for cid in child_ids if cid not in to_archive])
-                idx += 1
-
-            Topic.objects.filter(id__in=to_archive).update(is_active=False)
+            instance.subtree().filter(is_active=True).update(is_active=False)
+            invalidate_topic_trees()
+            invalidate_api_cache('topic')
             return DRFResponse(
                 {
                     'detail': (
@@ -179,9 +171,32 @@ class TopicViewSet(viewsets.ModelViewSet):
             )
         return DRFResponse(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=True, methods=['get'])
+    def breadcrumbs(self, request, pk=None):
+        topic = self.get_object()
+        trail = [*topic.ancestors(), topic]
+        return DRFResponse([{'id': t.id, 'name': t.name, 'parent': t.parent_id} for t in trail])
+
 class QuestionViewSet(viewsets.ModelViewSet):
     queryset = Question.objects.filter(is_active=True)
     serializer_class = QuestionSerializer
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        topic_id = self.request.query_params.get('topic')
+        if topic_id:
+            if not str(topic_id).isdigit():
+                return qs.none()
+            topic = Topic.objects.filter(id=topic_id).only('id', 'path', 'parent_id').first()
+            if topic is None:
+                return qs.none()
+            include_descendants = str(self.request.query_params.get('include_descendants', '')).lower()
+            if include_descendants in ('1', 'true', 'yes'):
+                qs = qs.filter(topic__path__startswith=topic.path or topic.build_path())
+            else:
+                qs = qs.filter(topic_id=topic.id)
+        return qs
+
     def get_permissions(self):
         if self.request.method in ('GET','HEAD','OPTIONS'):
             return [permissions.IsAuthenticated()]
@@ -208,12 +223,16 @@ class QuestionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_200_OK,
             )
 
-class ExamViewSet(viewsets.ModelViewSet):
+class ExamViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Exam.objects.filter(is_active=True)
     serializer_class = ExamSerializer
+    cache_scopes = ('curriculum', 'topic', 'exam', 'question')
+    # attempts_count changes on every submission without invalidating; keep its lag short.
+    cache_timeout = 60
 
     def get_queryset(self):
-        qs = super().get_queryset().select_related('topic', 'topic__curriculum')
+        qs = super().get_queryset().select_related('topic', 'topic__curriculum', 'created_by')
+        qs = annotate_exam_counts(qs)
         qp = self.request.query_params
 
         topic_id = qp.get('topic')
@@ -311,14 +330,16 @@ class ExamViewSet(viewsets.ModelViewSet):
                 )
             if to_create:
                 ExamQuestion.objects.bulk_create(to_create)
+                invalidate_api_cache('exam')
 
         ser = self.get_serializer(new_exam)
         return DRFResponse(ser.data, status=status.HTTP_201_CREATED)
 
 
-class CurriculumViewSet(viewsets.ModelViewSet):
+class CurriculumViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Curriculum.objects.all()
     serializer_class = CurriculumSerializer
+    cache_scopes = ('curriculum',)
 
     def get_queryset(self):
         """List curriculums.
@@ -362,9 +383,18 @@ class CurriculumViewSet(viewsets.ModelViewSet):
     def tree(self, request, pk=None):
         """Return folder-like navigation: top-level topics for this curriculum, with nested children."""
         curriculum = self.get_object()
-        roots = Topic.objects.filter(is_active=True, curriculum=curriculum, parent__isnull=True).select_related('curriculum')
-        data = TopicSerializer(roots, many=True).data
-        return DRFResponse({'curriculum': CurriculumSerializer(curriculum).data, 'roots': data})
+        # Any topic/curriculum/question/exam change starts a new tree generation.
+        etag = make_etag(request, 'curriculum-tree', curriculum.id, tree_generation())
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
+        def build():
+            index = build_topic_index(curriculum.id)
+            data = TopicSerializer(index.roots(), many=True, context={'topic_index': index}).data
+            return {'curriculum': CurriculumSerializer(curriculum).data, 'roots': data}
+
+        return set_validators(DRFResponse(get_curriculum_tree(curriculum.id, build)), etag)
 
     @action(detail=True, methods=['post'])
     def restore(self, request, pk=None):
@@ -481,6 +511,8 @@ class CurriculumViewSet(viewsets.ModelViewSet):
                     defaults={'description': 'System: Questions moved here to preserve history.', 'icon': '🗂️', 'order': 0, 'is_active': True},
                 )
                 moved_shared = Question.objects.filter(id__in=shared_question_ids).update(topic=shared_topic)
+                invalidate_topic_trees()
+                invalidate_api_cache('question')
                 question_ids = [qid for qid in question_ids if qid not in set(shared_question_ids)]
 
             if used_outside and not keep_shared:
@@ -527,9 +559,16 @@ class CurriculumViewSet(viewsets.ModelViewSet):
         )
 
 class AttemptViewSet(viewsets.ModelViewSet):
+    """Attempts; the list is cursor-paginated slim rows, full nesting only on detail."""
     queryset = Attempt.objects.all()
     serializer_class = AttemptSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = AttemptCursorPagination
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return AttemptListSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
         qs = super().get_queryset().select_related('user', 'exam', 'exam__topic', 'exam__topic__curriculum')
@@ -569,14 +608,11 @@ class AttemptViewSet(viewsets.ModelViewSet):
             if statuses:
                 qs = qs.filter(status__in=statuses)
 
-        # needs_grading=1 returns attempts that still have at least one STRUCT response
-        # without a teacher_mark.
+        # needs_grading=1 returns finished attempts that still have at least one STRUCT
+        # response without a teacher_mark (the grading_queue endpoint pages these oldest first).
         needs_grading = (qp.get('needs_grading') or '').strip().lower()
         if needs_grading in ('1', 'true', 'yes'):
-            qs = qs.filter(
-                responses__question__type='STRUCT',
-                responses__teacher_mark__isnull=True,
-            ).distinct()
+            qs = qs.filter(pending_struct_count__gt=0)
 
         return qs
 
@@ -664,13 +700,10 @@ def start_exam(request, exam_id):
             status=status.HTTP_409_CONFLICT,
         )
 
+    paper = get_exam_paper(exam)
+
     def _pick_question_ids_for_exam() -> list[int]:
-        eqs = list(ExamQuestion.objects.filter(exam=exam).select_related('question').order_by('order'))
-        if eqs:
-            ids = [int(eq.question_id) for eq in eqs]
-        else:
-            ids = list(Question.objects.filter(topic=exam.topic, is_active=True).values_list('id', flat=True))
-            ids = [int(x) for x in ids]
+        ids = list(paper['question_ids'])
         if exam.shuffle_questions:
             random.shuffle(ids)
         return ids
@@ -693,6 +726,7 @@ def start_exam(request, exam_id):
                 dup.finished_at = now
                 dup.duration_seconds = int(max(0, (now - dup.started_at).total_seconds()))
                 dup.save(update_fields=['status', 'finished_at', 'duration_seconds'])
+                sync_attempt_indexes(dup)
         else:
             attempt = Attempt.objects.create(user=request.user, exam=exam, started_at=now)
 
@@ -714,36 +748,17 @@ def start_exam(request, exam_id):
                 attempt.finished_at = expires_at_dt
                 attempt.duration_seconds = int(exam.duration_seconds)
                 attempt.save(update_fields=['status', 'finished_at', 'duration_seconds'])
+                sync_attempt_indexes(attempt)
             return DRFResponse(
                 {'attempt_id': attempt.id, 'expires_at': expires_at, 'detail': 'Attempt timed out.'},
                 status=status.HTTP_410_GONE,
             )
 
-        meta = attempt.metadata if isinstance(attempt.metadata, dict) else {}
-        raw_question_order = meta.get('question_order')
-
-        def _normalize_question_order(raw) -> list[int]:
-            if not isinstance(raw, list):
-                return []
-            normalized: list[int] = []
-            seen: set[int] = set()
-            for item in raw:
-                try:
-                    qid = int(item)
-                except Exception:
-                    continue
-                if qid in seen:
-                    continue
-                seen.add(qid)
-                normalized.append(qid)
-            return normalized
-
-        question_order = _normalize_question_order(raw_question_order)
+        question_order = list(dict.fromkeys(attempt.question_order))
         if not question_order:
             question_order = _pick_question_ids_for_exam()
-            meta['question_order'] = question_order
-            attempt.metadata = meta
-            attempt.save(update_fields=['metadata'])
+            attempt.question_order = question_order
+            attempt.save(update_fields=['question_order_packed'])
 
         # Store a snapshot of "what the student is attempting" for professional display
         # and for historical records (even if topics/curriculums get archived later).
@@ -759,39 +774,15 @@ def start_exam(request, exam_id):
                 'curriculum_name': getattr(getattr(exam.topic, 'curriculum', None), 'name', None),
             }
             meta = attempt.metadata if isinstance(attempt.metadata, dict) else {}
-            meta['exam_snapshot'] = snapshot
-            attempt.metadata = meta
-            attempt.save(update_fields=['metadata'])
+            if meta.get('exam_snapshot') != snapshot:
+                meta['exam_snapshot'] = snapshot
+                attempt.metadata = meta
+                attempt.save(update_fields=['metadata'])
         except Exception:
             pass
 
-    # Build questions list in the stored order.
-    qs = Question.objects.filter(id__in=question_order)
-    by_id = {q.id: q for q in qs}
-
-    def map_type(t):
-        return {'MCQ': 'mcq', 'MULTI': 'multi', 'FIB': 'fib', 'STRUCT': 'structured'}.get(t, 'mcq')
-
-    questions = []
-    for qid in question_order:
-        q = by_id.get(int(qid))
-        if not q:
-            continue
-        # Keep choices as-is if dict, otherwise convert to dict format
-        choices = q.choices if isinstance(q.choices, dict) else {}
-        if not choices and q.type == 'MCQ':
-            choices = {'A': 'Option A', 'B': 'Option B', 'C': 'Option C', 'D': 'Option D'}
-        
-        questions.append({
-            'id': q.id,
-            'type': map_type(q.type),
-            'statement': q.statement,
-            'choices': choices,
-            'time_est': q.estimated_time,
-            'marks': q.marks,
-            # Frontend runs on a different origin (e.g. :3000), so return an absolute URL.
-            'image': request.build_absolute_uri(q.image.url) if q.image else None,
-        })
+    # Build questions list in the stored order from the cached paper.
+    questions = paper_questions_for_order(paper, question_order, request.build_absolute_uri)
 
     return DRFResponse(
         {
@@ -819,7 +810,7 @@ def start_exam(request, exam_id):
 @permission_classes([permissions.IsAuthenticated])
 def submit_exam(request, exam_id):
     attempt_id = request.data.get('attempt_id')
-    attempt = get_object_or_404(Attempt, pk=attempt_id, user=request.user, exam_id=exam_id)
+    attempt = get_object_or_404(Attempt.objects.select_related('exam'), pk=attempt_id, user=request.user, exam_id=exam_id)
     responses = request.data.get('responses', [])  # [{question_id, answer_payload, time_spent_seconds}]
 
     now = timezone.now()
@@ -831,17 +822,8 @@ def submit_exam(request, exam_id):
     # This prevents duplicate submits (e.g. user double-click, retry after timeout)
     # from raising IntegrityError on the unique (attempt, question) constraint.
     if attempt.status in ('submitted', 'timedout'):
-        total_existing = 0
-        # Best-effort total for display; falls back to 0 if responses missing.
-        try:
-            total_existing = sum(
-                float(r.question.marks)
-                for r in Response.objects.filter(attempt=attempt).select_related('question')
-            )
-        except Exception:
-            total_existing = 0
         return DRFResponse(
-            {'score': attempt.total_score, 'total': total_existing, 'attempt_id': attempt.id},
+            {'score': attempt.total_score, 'total': attempt.max_marks, 'attempt_id': attempt.id},
             status=status.HTTP_200_OK,
         )
 
@@ -857,51 +839,13 @@ def submit_exam(request, exam_id):
             status=status.HTTP_410_GONE,
         )
 
-    total = 0
-    score = 0
     with transaction.atomic():
-        for r in responses:
-            qid = r.get('question_id')
-            q = get_object_or_404(Question, pk=qid)
-
-            payload = r.get('answer_payload')
-            if payload is None:
-                # Accept alternative client shape: {answer, time_spent, flagged}
-                # Normalize to the stored JSON payload used elsewhere.
-                raw_answer = r.get('answer', None)
-                if q.type in ('MCQ', 'MULTI'):
-                    payload = {'answers': [raw_answer] if raw_answer is not None else []}
-                else:
-                    payload = {'answer': raw_answer}
-
-            spent = int(r.get('time_spent_seconds', r.get('time_spent', 0)) or 0)
-            flagged = bool(r.get('flagged_for_review', r.get('flagged', False)))
-
-            correct = False
-            # basic auto-grade for MCQ/MULTI/FIB
-            if q.type in ('MCQ', 'MULTI'):
-                correct = set(map(str, payload.get('answers', []))) == set(map(str, q.correct_answers))
-            elif q.type == 'FIB':
-                correct = str(payload.get('answer', '')).strip().lower() in [
-                    str(a).strip().lower() for a in q.correct_answers
-                ]
-
-            # STRUCT requires teacher grading
-            Response.objects.update_or_create(
-                attempt=attempt,
-                question=q,
-                defaults={
-                    'answer_payload': payload,
-                    'correct': correct,
-                    'time_spent_seconds': spent,
-                    'flagged_for_review': flagged,
-                },
-            )
-
-            m = q.marks
-            total += m
-            if correct:
-                score += m
+        # Persist write-behind autosave drafts before the submitted answers are graded over them;
+        # anything buffered after this flush is dropped once the submission commits.
+        if write_behind_enabled():
+            flush_drafts(attempt)
+            transaction.on_commit(lambda: discard_drafts(attempt))
+        score, total = grade_submission(attempt, responses)
 
         # If within grace but technically past time, treat as timed out submission.
         if expires_at_dt and now >= expires_at_dt:
@@ -915,7 +859,10 @@ def submit_exam(request, exam_id):
 
         attempt.total_score = score
         attempt.percentage = round((float(score) / float(total)) * 100.0, 2) if total else 0.0
-        attempt.save(update_fields=['finished_at', 'duration_seconds', 'status', 'total_score', 'percentage'])
+        attempt.save(update_fields=[
+            'finished_at', 'duration_seconds', 'status', 'total_score', 'percentage', *refresh_grading_counters(attempt),
+        ])
+        sync_attempt_indexes(attempt, needs_grading=attempt.pending_struct_count > 0)
 
         # Mark linked mock-test assignment as completed (submitted or timedout both count).
         try:
@@ -934,12 +881,6 @@ def submit_exam(request, exam_id):
         except Exception:
             pass
 
-        # Update leaderboard (weekly)
-        period = 'weekly'
-        lb, created = LeaderboardEntry.objects.get_or_create(user=request.user, time_period=period, defaults={'score_metric': 0})
-        lb.score_metric = (lb.score_metric or 0) + score
-        lb.save()
-
     # Notify via email (dev console backend prints email)
     try:
         # Avoid slow/hanging SMTP calls unless email is configured.
@@ -976,31 +917,21 @@ def finalize_attempt_grading(request, attempt_id):
     if not _is_teacher_or_admin(request.user):
         return DRFResponse({'detail': 'Only teachers/admins can finalize grading.'}, status=status.HTTP_403_FORBIDDEN)
 
-    attempt = get_object_or_404(Attempt, pk=attempt_id)
-    meta = attempt.metadata if isinstance(attempt.metadata, dict) else {}
-    if meta.get('grades_finalized') is True:
-        return DRFResponse({'detail': 'Grades are already finalized.'}, status=status.HTTP_409_CONFLICT)
-
-    if _attempt_needs_grading(attempt.id):
-        return DRFResponse({'detail': 'Cannot finalize: some structured questions are ungraded.'}, status=status.HTTP_400_BAD_REQUEST)
-
-    total_marks = 0.0
-    total_score = 0.0
-    for r in Response.objects.filter(attempt=attempt).select_related('question'):
-        total_marks += float(r.question.marks or 0)
-        q_score = r.teacher_mark if r.teacher_mark is not None else (float(r.question.marks or 0) if r.correct else 0.0)
-        total_score += float(q_score or 0.0)
+    with transaction.atomic():
+        # Row lock: a concurrent grade_response cannot change the counters between the check and the finalization.
+        attempt = get_object_or_404(Attempt.objects.select_for_update(of=('self',)).select_related('exam'), pk=attempt_id)
+        if attempt.grades_finalized:
+            return DRFResponse({'detail': 'Grades are already finalized.'}, status=status.HTTP_409_CONFLICT)
 
-    attempt.total_score = float(total_score)
-    attempt.percentage = round((float(total_score) / float(total_marks)) * 100.0, 2) if total_marks else 0.0
-    attempt.save(update_fields=['total_score', 'percentage'])
+        if attempt.pending_struct_count:
+            return DRFResponse({'detail': 'Cannot finalize: some structured questions are ungraded.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    meta = attempt.metadata if isinstance(attempt.metadata, dict) else {}
-    meta['grades_finalized'] = True
-    meta['graded_by'] = getattr(request.user, 'id', None)
-    meta['graded_at'] = timezone.now().isoformat()
-    attempt.metadata = meta
-    attempt.save(update_fields=['metadata'])
+        total_score, total_marks = score_attempt(attempt)
+        attempt.total_score = float(total_score)
+        attempt.percentage = round((float(total_score) / float(total_marks)) * 100.0, 2) if total_marks else 0.0
+        attempt.save(update_fields=['total_score', 'percentage', *refresh_grading_counters(attempt)])
+        sync_attempt_indexes(attempt, needs_grading=attempt.pending_struct_count > 0)
+        finalize_grades(attempt, request.user)
 
     # Compute and store rank now that grading is complete.
     try:
@@ -1018,147 +949,136 @@ def resume_attempt(request, attempt_id):
     attempt = get_object_or_404(Attempt, pk=attempt_id, user=request.user)
     answers = {}
     times = {}
-    flagged = attempt.metadata.get('flagged', {}) if isinstance(attempt.metadata, dict) else {}
-    for resp in Response.objects.filter(attempt=attempt).select_related('question'):
-        answers[resp.question_id] = resp.answer_payload
-        times[resp.question_id] = resp.time_spent_seconds
+    flagged = flagged_map(attempt)
+    for qid, payload, spent in Response.objects.filter(attempt=attempt).values_list('question_id', 'answer_payload', 'time_spent_seconds'):
+        answers[qid] = payload
+        times[qid] = spent
+    if write_behind_enabled() and attempt.status == 'inprogress':
+        # Unflushed autosave drafts are newer than the stored responses.
+        for qid, draft in pending_drafts(attempt).items():
+            if 'answer' in draft:
+                answers[qid] = draft['answer']
+                times[qid] = int(draft.get('time_spent', 0) or 0)
+            if 'flagged' in draft:
+                flagged[str(qid)] = bool(draft['flagged'])
     return DRFResponse({'answers': answers, 'times': times, 'flagged': flagged}, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def save_attempt(request, attempt_id):
-    attempt = get_object_or_404(Attempt, pk=attempt_id, user=request.user)
+    attempt = get_object_or_404(Attempt.objects.select_related('exam'), pk=attempt_id, user=request.user)
     expires_at_dt = _attempt_expires_at(attempt)
     if expires_at_dt and timezone.now() >= expires_at_dt:
         _mark_attempt_timedout(attempt, expires_at_dt)
         return DRFResponse({'detail': 'Attempt timed out.'}, status=status.HTTP_410_GONE)
-    qid = request.data.get('question_id')
-    payload = request.data.get('answer')
-    time_spent = int(request.data.get('time_spent', 0))
-    flagged = bool(request.data.get('flagged', False))
-    q = get_object_or_404(Question, pk=qid)
-    with transaction.atomic():
-        resp, _ = Response.objects.get_or_create(attempt=attempt, question=q, defaults={'answer_payload': payload})
-        resp.answer_payload = payload
-        resp.time_spent_seconds = time_spent
-        resp.save()
-        meta = attempt.metadata or {}
-        flagged_map = meta.get('flagged', {})
-        flagged_map[str(qid)] = flagged
-        meta['flagged'] = flagged_map
-        attempt.metadata = meta
-        attempt.save(update_fields=['metadata'])
+    save_autosave(attempt, [{
+        'question_id': request.data.get('question_id'),
+        'answer': request.data.get('answer'),
+        'time_spent': int(request.data.get('time_spent', 0)),
+        'flagged': bool(request.data.get('flagged', False)),
+    }])
     return DRFResponse({'status': 'ok'}, status=status.HTTP_200_OK)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def autosave_attempt(request, attempt_id):
+    """Apply a batch of autosave deltas: ``{"items": [{question_id, answer, time_spent, flagged}, ...]}``.
+
+    Clients debounce answer changes and send them together; repeated deltas
+    for the same question are coalesced server-side (last one wins).
+    """
+    attempt = get_object_or_404(Attempt.objects.select_related('exam'), pk=attempt_id, user=request.user)
+    if attempt.status != 'inprogress':
+        return DRFResponse({'detail': 'Attempt is no longer in progress.'}, status=status.HTTP_409_CONFLICT)
+    expires_at_dt = _attempt_expires_at(attempt)
+    if expires_at_dt and timezone.now() >= expires_at_dt:
+        _mark_attempt_timedout(attempt, expires_at_dt)
+        return DRFResponse({'detail': 'Attempt timed out.'}, status=status.HTTP_410_GONE)
+
+    items = request.data if isinstance(request.data, list) else request.data.get('items')
+    if not isinstance(items, list):
+        return DRFResponse({'detail': 'items must be a list.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > AUTOSAVE_MAX_ITEMS:
+        return DRFResponse(
+            {'detail': f'At most {AUTOSAVE_MAX_ITEMS} items per autosave.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    result = save_autosave(attempt, items)
+    return DRFResponse({'status': 'ok', **result}, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def bulk_create_questions(request):
-    """Accept JSON list or CSV file for bulk question creation"""
-    import csv
-    import io
-    
+    """Bulk-create questions from a CSV/XLSX upload (``csv`` or ``file``) or a JSON ``items`` list.
+
+    Rows are validated first and written in ``batch_size`` batches inside one
+    transaction; any invalid row aborts the import unless ``skip_invalid=1``.
+    ``dry_run=1`` only validates, ``dedupe=1`` skips statements already in
+    the row's topic. The response lists per-row ``errors`` and ``duplicates``.
+
+    With ``async=1`` an upload is queued as an ``ImportJob`` instead and the
+    response is ``202`` with the job; poll ``imports/<id>/`` for progress.
+    """
+    upload = request.FILES.get('csv') or request.FILES.get('file')
     items = request.data.get('items')
-    csv_file = request.FILES.get('csv')
-    created = []
-    errors = []
-    
-    # Handle CSV upload
-    if csv_file:
-        try:
-            decoded_file = csv_file.read().decode('utf-8')
-            csv_reader = csv.DictReader(io.StringIO(decoded_file))
-            
-            for row in csv_reader:
-                try:
-                    topic_id = row.get('topic_id')
-                    topic = Topic.objects.get(pk=topic_id)
-                    
-                    # Parse choices from comma-separated string if needed
-                    choices_raw = row.get('choices', '')
-                    if isinstance(choices_raw, str):
-                        choices_list = [c.strip() for c in choices_raw.split('|')]
-                        choices = {chr(65+i): ch for i, ch in enumerate(choices_list)}
-                    else:
-                        choices = {}
-                    
-                    # Parse correct answers
-                    correct_raw = row.get('correct_answers', '')
-                    correct_answers = [c.strip() for c in correct_raw.split('|')] if correct_raw else []
-                    
-                    q = Question.objects.create(
-                        topic=topic,
-                        type=row.get('type', 'MCQ'),
-                        statement=row.get('statement', ''),
-                        choices=choices,
-                        correct_answers=correct_answers,
-                        difficulty=row.get('difficulty', ''),
-                        marks=float(row.get('marks', 1)),
-                        estimated_time=int(row.get('estimated_time', 60)),
-                        tags=row.get('tags', '').split('|') if row.get('tags') else [],
-                    )
-                    created.append(q.id)
-                except Exception as e:
-                    errors.append({'row': row, 'error': str(e)})
-            
-            return DRFResponse({
-                'created_count': len(created),
-                'created_ids': created,
-                'errors': errors
-            }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            return DRFResponse({'error': f'CSV parse error: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Handle JSON list
-    if isinstance(items, list):
-        for it in items:
-            try:
-                topic_id = it.get('topic_id')
-                topic = get_object_or_404(Topic, pk=topic_id)
-                q = Question.objects.create(
-                    topic=topic,
-                    type=it.get('type','MCQ'),
-                    statement=it.get('statement',''),
-                    choices=it.get('choices', {}),
-                    correct_answers=it.get('correct_answers', []),
-                    difficulty=it.get('difficulty',''),
-                    marks=float(it.get('marks', 1)),
-                    estimated_time=int(it.get('estimated_time', 60)),
-                    tags=it.get('tags', []),
-                )
-                created.append(q.id)
-            except Exception as e:
-                errors.append({'item': it, 'error': str(e)})
-        
-        return DRFResponse({
-            'created_count': len(created),
-            'created_ids': created,
-            'errors': errors
-        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
-    
-    return DRFResponse({'error': 'provide items: [] or csv file'}, status=status.HTTP_400_BAD_REQUEST)
+    if upload:
+        read_rows = upload_reader(upload)
+    elif isinstance(items, list):
+        read_rows = items_reader(items)
+    else:
+        return DRFResponse({'error': 'provide items: [] or csv file'}, status=status.HTTP_400_BAD_REQUEST)
+
+    def flag(name):
+        value = request.query_params.get(name, request.data.get(name, ''))
+        return str(value).strip().lower() in ('1', 'true', 'yes')
+
+    try:
+        batch_size = int(request.query_params.get('batch_size', request.data.get('batch_size')) or IMPORT_BATCH_SIZE)
+    except (TypeError, ValueError):
+        return DRFResponse({'error': 'batch_size must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+    options = {
+        'dry_run': flag('dry_run'),
+        'dedupe': flag('dedupe'),
+        'skip_invalid': flag('skip_invalid'),
+        'batch_size': batch_size,
+    }
+
+    if upload and flag('async'):
+        job = create_job('exam_questions', upload, user=request.user, options=options)
+        return DRFResponse({'job': job_status(job)}, status=status.HTTP_202_ACCEPTED)
+
+    try:
+        result = import_questions(read_rows, **options)
+    except ImportFileError as e:
+        return DRFResponse({'error': f'File parse error: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if result['created_count']:
+        code = status.HTTP_201_CREATED
+    elif result['errors'] and not result['dry_run']:
+        code = status.HTTP_400_BAD_REQUEST
+    else:
+        code = status.HTTP_200_OK
+    return DRFResponse(result, status=code)
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
-def my_attempts(request):
-    needs_grading_sq = Response.objects.filter(
-        attempt_id=OuterRef('pk'),
-        question__type='STRUCT',
-        teacher_mark__isnull=True,
-    )
-    requires_teacher_grading_sq = Response.objects.filter(
-        attempt_id=OuterRef('pk'),
-        question__type='STRUCT',
-    )
+def import_job_detail(request, job_id):
+    """Status and progress of a background import (question or quiz upload)."""
+    job = get_object_or_404(ImportJob, pk=job_id)
+    if job.created_by_id != request.user.id and not _is_teacher_or_admin(request.user):
+        return DRFResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    return DRFResponse(job_status(resume_if_orphaned(job)))
 
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def my_attempts(request):
     qs = (
         Attempt.objects.filter(user=request.user)
         .select_related('exam', 'exam__topic', 'exam__topic__curriculum')
-        .annotate(
-            needs_grading=Exists(needs_grading_sq),
-            requires_teacher_grading=Exists(requires_teacher_grading_sq),
-        )
         .order_by('-created_at')
     )
     data = [
@@ -1172,8 +1092,8 @@ def my_attempts(request):
                 or (a.metadata or {}).get('exam_snapshot', {}).get('curriculum_name')
             ),
             'status': a.status,
-            'requires_teacher_grading': bool(getattr(a, 'requires_teacher_grading', False)),
-            'needs_grading': bool(getattr(a, 'needs_grading', False)),
+            'requires_teacher_grading': a.struct_total > 0,
+            'needs_grading': a.pending_struct_count > 0,
             # Keep legacy key for compatibility
             'score': float(a.total_score or 0),
             'percentage': float(a.percentage or 0),
@@ -1234,30 +1154,119 @@ def analytics_exams_summary(request):
     return DRFResponse({'exams': data}, status=status.HTTP_200_OK)
 
 
+def _parse_aware_datetime(raw):
+    """ISO date/datetime query param -> aware datetime, None if empty. Raises ValueError if invalid.
+
+    Dates are accepted too ("2025-01-31" means midnight).
+    """
+    raw = (raw or '').strip()
+    if not raw:
+        return None
+    value = parse_datetime(raw)
+    if value is None:
+        raise ValueError(raw)
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def export_attempts(request):
+    """Teacher/Admin: stream attempts or responses as CSV/XLSX.
+
+    Query params: ``kind`` (attempts|responses), ``output`` (csv|xlsx),
+    ``exam``, ``curriculum``, and an attempt start window ``from``/``to``.
+    """
+    if not _is_teacher_or_admin(request.user):
+        return DRFResponse({'detail': 'Only teachers/admins can export attempts.'}, status=status.HTTP_403_FORBIDDEN)
+    qp = request.query_params
+    kind = (qp.get('kind') or 'attempts').strip().lower()
+    output = (qp.get('output') or 'csv').strip().lower()
+    if kind not in EXPORT_KINDS:
+        return DRFResponse({'detail': 'kind must be attempts or responses.'}, status=status.HTTP_400_BAD_REQUEST)
+    if output not in ('csv', 'xlsx'):
+        return DRFResponse({'detail': 'output must be csv or xlsx.'}, status=status.HTTP_400_BAD_REQUEST)
+    for name in ('exam', 'curriculum'):
+        if qp.get(name) and not str(qp.get(name)).isdigit():
+            return DRFResponse({'detail': f'Invalid {name}.'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        start = _parse_aware_datetime(qp.get('from'))
+        end = _parse_aware_datetime(qp.get('to'))
+    except ValueError:
+        return DRFResponse({'detail': 'from/to must be ISO dates or datetimes.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    queryset = export_queryset(kind, qp.get('exam') or None, qp.get('curriculum') or None, start, end)
+    if output == 'xlsx':
+        return xlsx_response(kind, queryset)
+    return csv_response(kind, queryset)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def analytics_exam_items(request, exam_id):
+    """Teacher/Admin: item analysis for one exam (facility, discrimination, distractors, timing, histogram)."""
+    if not _is_teacher_or_admin(request.user):
+        return DRFResponse({'detail': 'Only teachers/admins can view exam analytics.'}, status=status.HTTP_403_FORBIDDEN)
+    exam = get_object_or_404(Exam, pk=exam_id)
+    return DRFResponse(exam_item_analysis(exam), status=status.HTTP_200_OK)
+
+
+def _with_review_validators(qs):
+    """Annotate what ``review_attempt`` reads from other rows, for its ETag."""
+    responses = Response.objects.filter(attempt=OuterRef('pk')).order_by().values('attempt')
+    uploads = AttemptUpload.objects.filter(attempt=OuterRef('pk')).order_by().values('attempt')
+    return qs.annotate(
+        review_responses=Subquery(responses.annotate(n=Count('id')).values('n')[:1]),
+        review_responses_updated=Subquery(responses.annotate(t=Max('updated_at')).values('t')[:1]),
+        review_questions_updated=Subquery(responses.annotate(t=Max('question__updated_at')).values('t')[:1]),
+        review_uploads=Subquery(uploads.annotate(last=Max('id')).values('last')[:1]),
+        review_exam_updated=F('exam__updated_at'),
+        review_topic_updated=F('exam__topic__updated_at'),
+        review_curriculum_updated=F('exam__topic__curriculum__updated_at'),
+    )
+
+
+def _review_etag(request, attempt) -> str:
+    # Attempt columns are hashed directly: save(update_fields=...) does not bump updated_at.
+    return make_etag(
+        request, 'review', attempt.id, attempt.status, attempt.finished_at, attempt.duration_seconds,
+        attempt.total_score, attempt.percentage, attempt.rank, attempt.percentile, attempt.grades_finalized,
+        attempt.evaluated_pdf, attempt.evaluated_pdf_url, json.dumps(attempt.metadata, sort_keys=True, default=str),
+        attempt.review_responses, attempt.review_responses_updated, attempt.review_questions_updated,
+        attempt.review_uploads, attempt.review_exam_updated, attempt.review_topic_updated,
+        attempt.review_curriculum_updated,
+    )
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def review_attempt(request, attempt_id):
+    attempts = _with_review_validators(Attempt.objects.all())
     if _is_teacher_or_admin(request.user):
-        attempt = get_object_or_404(Attempt, pk=attempt_id)
+        attempt = get_object_or_404(attempts, pk=attempt_id)
     else:
-        attempt = get_object_or_404(Attempt, pk=attempt_id, user=request.user)
+        attempt = get_object_or_404(attempts, pk=attempt_id, user=request.user)
+    etag = _review_etag(request, attempt)
+    last_modified = latest_timestamp(
+        attempt.updated_at, attempt.finished_at, attempt.graded_at,
+        attempt.review_responses_updated, attempt.review_questions_updated,
+    )
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
     res = []
     total_marks = 0
     teacher_remarks = {}
     requires_teacher_grading = False
     needs_grading = False
-    student_uploads = []
-    evaluated_pdf = None
-    evaluated_pdf_url = None
     snapshot = {}
-    grades_finalized = False
+    student_uploads = upload_entries(attempt)
+    evaluated_pdf = attempt.evaluated_pdf or None
+    evaluated_pdf_url = attempt.evaluated_pdf_url or None
+    grades_finalized = attempt.grades_finalized
     if isinstance(attempt.metadata, dict):
+        # Remarks migrated without a matching response stay in metadata.
         teacher_remarks = attempt.metadata.get('teacher_remarks', {}) or {}
-        student_uploads = attempt.metadata.get('student_uploads', []) or []
-        evaluated_pdf = attempt.metadata.get('evaluated_pdf')
-        evaluated_pdf_url = attempt.metadata.get('evaluated_pdf_url')
         snapshot = attempt.metadata.get('exam_snapshot', {}) or {}
-        grades_finalized = bool(attempt.metadata.get('grades_finalized', False))
 
     # Normalize upload URLs for the frontend.
     # FileSystemStorage saves paths like "answer_uploads/..." but URLs are served under MEDIA_URL ("/media/").
@@ -1315,7 +1324,7 @@ def review_attempt(request, attempt_id):
             'marks_obtained': q_marks,
             'total_marks': r.question.marks,
             'teacher_mark': r.teacher_mark,
-            'remarks': teacher_remarks.get(str(r.question_id), ''),
+            'remarks': r.teacher_feedback or teacher_remarks.get(str(r.question_id), ''),
         })
 
     missing_submission_upload = bool(requires_teacher_grading and not (normalized_uploads or []))
@@ -1337,7 +1346,7 @@ def review_attempt(request, attempt_id):
     if not curriculum_name:
         curriculum_name = snapshot.get('curriculum_name')
 
-    return DRFResponse({
+    return set_validators(DRFResponse({
         'responses': res, 
         'score': attempt.total_score, 
         'total': total_marks,
@@ -1356,77 +1365,47 @@ def review_attempt(request, attempt_id):
         'percentile': attempt.percentile,
         'grades_finalized': grades_finalized,
         'exam_snapshot': snapshot,
-    }, status=status.HTTP_200_OK)
+    }, status=status.HTTP_200_OK), etag, last_modified)
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def analytics_user_topics(request, user_id=None):
-    user = request.user
-    # Compute accuracy per topic across submitted attempts
-    topic_stats = {}
-    reps = Response.objects.filter(attempt__user=user, attempt__status='submitted').select_related('question__topic')
-    for r in reps:
-        t = r.question.topic
-        key = t.id
-        ts = topic_stats.setdefault(key, {'topic_id': t.id, 'topic': t.name, 'correct': 0, 'total': 0})
-        ts['total'] += 1
-        ts['correct'] += 1 if r.correct else 0
-    for ts in topic_stats.values():
-        ts['accuracy_pct'] = round(100.0 * (ts['correct'] / ts['total']), 2) if ts['total'] else 0.0
-    return DRFResponse({'topics': list(topic_stats.values())}, status=status.HTTP_200_OK)
+    """Accuracy per topic across the caller's submitted attempts.
+
+    Query params: ``since`` (ISO date/datetime), ``curriculum`` (id) and
+    ``rollup=1`` to add subtree totals for ancestor topics.
+    """
+    qp = request.query_params
+    try:
+        since = _parse_aware_datetime(qp.get('since'))
+    except ValueError:
+        return DRFResponse({'detail': 'Invalid since. Use an ISO date or datetime.'}, status=status.HTTP_400_BAD_REQUEST)
+    curriculum_id = qp.get('curriculum') or None
+    if curriculum_id is not None and not str(curriculum_id).isdigit():
+        return DRFResponse({'detail': 'Invalid curriculum.'}, status=status.HTTP_400_BAD_REQUEST)
+    rollup = str(qp.get('rollup', '')).lower() in ('1', 'true', 'yes')
+
+    topics = user_topic_stats(request.user.id, since=since, curriculum_id=curriculum_id, rollup=rollup)
+    return DRFResponse({'topics': topics}, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def leaderboard(request):
-    from datetime import timedelta
-    from django.db.models import Avg, Count, Exists, OuterRef, Sum
-
-    raw_period = (request.query_params.get('period') or 'weekly').strip().lower()
-    if raw_period in ('all-time', 'all_time', 'alltime', 'all'):
-        period = 'all-time'
-    elif raw_period in ('daily', 'today'):
-        period = 'daily'
-    else:
-        period = 'weekly'
-
-    now = timezone.now()
-    attempts_qs = Attempt.objects.filter(status__in=['submitted', 'timedout']).select_related('user')
-    if period == 'daily':
-        start = now - timedelta(days=1)
-        attempts_qs = attempts_qs.filter(finished_at__gte=start)
-    elif period == 'weekly':
-        start = now - timedelta(days=7)
-        attempts_qs = attempts_qs.filter(finished_at__gte=start)
-
-    pending_struct = Response.objects.filter(
-        attempt_id=OuterRef('pk'),
-        question__type='STRUCT',
-        teacher_mark__isnull=True,
-    )
-    attempts_qs = attempts_qs.annotate(needs_grading=Exists(pending_struct)).filter(needs_grading=False)
-
-    grouped = (
-        attempts_qs.values('user_id', 'user__username')
-        .annotate(
-            tests_completed=Count('id'),
-            avg_percentage=Avg('percentage'),
-            total_score=Sum('total_score'),
-        )
-        .order_by('-avg_percentage', '-tests_completed', '-total_score', 'user_id')
-    )
+    """Top 100 for a period, read from the materialized LeaderboardEntry rows."""
+    period = normalize_period(request.query_params.get('period'))
 
     rankings = []
     leaders = []
     user_rank = None
 
-    for idx, row in enumerate(grouped[:100], start=1):
-        score_pct = round(float(row.get('avg_percentage') or 0.0), 2)
-        tests_completed = int(row.get('tests_completed') or 0)
-        username = row.get('user__username') or ''
+    for idx, row in enumerate(leaderboard_rows(period, limit=100), start=1):
+        score_pct = round(float(row.avg_percentage or 0.0), 2)
+        tests_completed = int(row.tests_completed or 0)
+        username = getattr(row.user, 'username', '') or ''
         entry = {
-            'user_id': row.get('user_id'),
+            'user_id': row.user_id,
             'name': username,
             'username': username,
             'score': score_pct,
@@ -1449,6 +1428,16 @@ def leaderboard(request):
                         'rank': entry.get('rank'),
                     }
                     break
+            if user_rank is None:
+                own, own_rank = user_position(period, request.user.id)
+                if own is not None:
+                    user_rank = {
+                        'user_id': own.user_id,
+                        'name': request.user.username,
+                        'score': round(float(own.avg_percentage or 0.0), 2),
+                        'tests_completed': int(own.tests_completed or 0),
+                        'rank': own_rank,
+                    }
         except Exception:
             user_rank = None
 
@@ -1491,9 +1480,7 @@ def upload_attempt_submission(request, attempt_id):
     from django.core.files.storage import default_storage
     import os
 
-    meta = attempt.metadata or {}
-    uploads = meta.get('student_uploads', []) or []
-
+    uploads = []
     for uploaded in files:
         base, ext = os.path.splitext(uploaded.name or '')
         ext = (ext or '').lower()
@@ -1505,20 +1492,36 @@ def upload_attempt_submission(request, attempt_id):
             url = default_storage.url(saved_path)
         except Exception:
             url = None
-        uploads.append(
-            {
-                'name': uploaded.name,
-                'path': saved_path,
-                'url': url,
-                'uploaded_at': timezone.now().isoformat(),
-            }
-        )
+        uploads.append(AttemptUpload(name=(uploaded.name or '')[:255], path=saved_path, url=url or ''))
 
-    meta['student_uploads'] = uploads
-    attempt.metadata = meta
-    attempt.save(update_fields=['metadata'])
+    add_uploads(attempt, uploads)
 
-    return DRFResponse({'status': 'uploaded', 'student_uploads': uploads}, status=status.HTTP_200_OK)
+    return DRFResponse({'status': 'uploaded', 'student_uploads': upload_entries(attempt)}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def grading_queue(request):
+    """Finished attempts with ungraded structured answers, oldest submission first.
+
+    Filters on the denormalized ``Attempt.pending_struct_count`` through its
+    partial index and pages with a ``(finished_at, id)`` cursor, so each page
+    costs the same however long the backlog is. Optional ``?exam=<id>``.
+    """
+    if not _is_teacher_or_admin(request.user):
+        return DRFResponse({'detail': 'Only teachers/admins can view the grading queue.'}, status=status.HTTP_403_FORBIDDEN)
+    qs = Attempt.objects.filter(pending_struct_count__gt=0).select_related(
+        'user', 'exam', 'exam__topic', 'exam__topic__curriculum'
+    )
+    exam_id = request.query_params.get('exam')
+    if exam_id:
+        try:
+            qs = qs.filter(exam_id=int(exam_id))
+        except (TypeError, ValueError):
+            return DRFResponse({'detail': 'exam must be an integer id.'}, status=status.HTTP_400_BAD_REQUEST)
+    paginator = GradingQueuePagination()
+    page = paginator.paginate_queryset(qs, request)
+    return paginator.get_paginated_response(AttemptListSerializer(page, many=True, context={'request': request}).data)
 
 
 @api_view(['POST'])
@@ -1527,11 +1530,10 @@ def grade_response(request, response_id):
     """Teacher grades a structured response"""
     if not _is_teacher_or_admin(request.user):
         return DRFResponse({'detail': 'Only teachers/admins can grade responses.'}, status=status.HTTP_403_FORBIDDEN)
-    resp = get_object_or_404(Response, pk=response_id)
+    resp = get_object_or_404(Response.objects.select_related('attempt__exam'), pk=response_id)
 
     attempt = resp.attempt
-    meta = attempt.metadata if isinstance(attempt.metadata, dict) else {}
-    if meta.get('grades_finalized') is True:
+    if attempt.grades_finalized:
         return DRFResponse({'detail': 'Grades have been finalized and cannot be edited.'}, status=status.HTTP_409_CONFLICT)
     teacher_mark = request.data.get('teacher_mark')
     remarks = request.data.get('remarks', '')
@@ -1547,8 +1549,9 @@ def grade_response(request, response_id):
                 return DRFResponse({'detail': 'Invalid teacher_mark. Must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Enforce bounds for structured marking.
+            entry = get_answer_key(attempt.exam).get(resp.question_id)
             try:
-                max_marks = float(resp.question.marks)
+                max_marks = entry.marks if entry else float(resp.question.marks)
             except Exception:
                 max_marks = None
             if resp.teacher_mark is not None:
@@ -1557,27 +1560,23 @@ def grade_response(request, response_id):
                 if max_marks is not None and resp.teacher_mark > max_marks:
                     return DRFResponse({'detail': f'teacher_mark cannot exceed {max_marks}.'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Store remarks in attempt metadata
-    meta = attempt.metadata if isinstance(attempt.metadata, dict) else {}
-    meta.setdefault('teacher_remarks', {})[str(resp.question_id)] = remarks
-    attempt.metadata = meta
-    attempt.save(update_fields=['metadata'])
-    
-    resp.save()
+    # Remarks live on the response row itself (single-row write).
+    resp.teacher_feedback = remarks or ''
+    with transaction.atomic():
+        # Row lock: concurrent graders of one attempt recount its grading counters one at a time.
+        Attempt.objects.select_for_update().only('id').get(pk=attempt.pk)
+        resp.save()
+        attempt.save(update_fields=refresh_grading_counters(attempt))
 
     # Recompute the attempt score so student/teacher views stay consistent.
     # (Do not finalize rank here; rank becomes stable only after finalization.)
     try:
-        total_marks = 0.0
-        total_score = 0.0
-        for r in Response.objects.filter(attempt=attempt).select_related('question'):
-            total_marks += float(r.question.marks or 0)
-            q_score = r.teacher_mark if r.teacher_mark is not None else (float(r.question.marks or 0) if r.correct else 0.0)
-            total_score += float(q_score or 0.0)
+        total_score, total_marks = score_attempt(attempt)
         attempt.total_score = float(total_score)
         attempt.percentage = round((float(total_score) / float(total_marks)) * 100.0, 2) if total_marks else 0.0
         attempt.rank = None
         attempt.save(update_fields=['total_score', 'percentage', 'rank'])
+        sync_attempt_indexes(attempt, needs_grading=attempt.pending_struct_count > 0)
     except Exception:
         pass
 
@@ -1609,10 +1608,6 @@ def upload_evaluated_pdf(request, attempt_id):
     except Exception:
         url = None
     
-    meta = attempt.metadata or {}
-    meta['evaluated_pdf'] = saved_path
-    meta['evaluated_pdf_url'] = url
-    attempt.metadata = meta
-    attempt.save(update_fields=['metadata'])
+    set_evaluated_pdf(attempt, saved_path, url)
     
     return DRFResponse({'status': 'uploaded', 'path': saved_path, 'url': url}, status=status.HTTP_200_OK)
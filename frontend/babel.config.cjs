@@ -0,0 +1,4 @@
+// Lets Jest (babel-jest) load the ES module sources; Vite does not read this file.
+module.exports = {
+  presets: [['@babel/preset-env', { targets: { node: 'current' } }]],
+};
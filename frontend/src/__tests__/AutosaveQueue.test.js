@@ -0,0 +1,56 @@
+import AutosaveQueue, { AUTOSAVE_MAX_ITEMS } from '../utils/AutosaveQueue';
+
+describe('AutosaveQueue', () => {
+  let store;
+  let saved;
+  let batches;
+
+  beforeEach(() => {
+    store = {};
+    saved = [];
+    batches = [];
+    global.window = { addEventListener: jest.fn(), removeEventListener: jest.fn() };
+    global.localStorage = {
+      getItem: key => (key in store ? store[key] : null),
+      setItem: (key, value) => { store[key] = String(value); },
+    };
+    // Like the server: a delta for a missing question (id 404) rejects the whole batch.
+    global.fetch = jest.fn(async (url, { body }) => {
+      const { items } = JSON.parse(body);
+      batches.push(items.length);
+      if (items.length > AUTOSAVE_MAX_ITEMS) return { ok: false, status: 400 };
+      if (items.some(item => item.question_id === 404)) return { ok: false, status: 404 };
+      saved.push(...items.map(item => item.question_id));
+      return { ok: true, status: 200 };
+    });
+  });
+
+  const makeQueue = () => new AutosaveQueue({ baseApi: '/api', attemptId: 7, getHeaders: () => ({}) });
+
+  test('a rejected delta is dropped and the ones after it are still saved', async () => {
+    const queue = makeQueue();
+    queue.enqueue({ question_id: 404, answer: 'A' });
+    queue.enqueue({ question_id: 1, answer: 'B' });
+    queue.enqueue({ question_id: 2, answer: 'C' });
+    await queue.flush();
+    expect(saved.sort()).toEqual([1, 2]);
+    expect(queue.readQueue()).toEqual([]);
+  });
+
+  test('large queues are sent in batches the server accepts', async () => {
+    const queue = makeQueue();
+    for (let id = 1000; id <= 1000 + AUTOSAVE_MAX_ITEMS; id += 1) queue.enqueue({ question_id: id, answer: 'A' });
+    await queue.flush();
+    expect(batches).toEqual([AUTOSAVE_MAX_ITEMS, 1]);
+    expect(saved).toHaveLength(AUTOSAVE_MAX_ITEMS + 1);
+    expect(queue.readQueue()).toEqual([]);
+  });
+
+  test('server errors keep the queue for the next flush', async () => {
+    global.fetch = jest.fn(async () => ({ ok: false, status: 503 }));
+    const queue = makeQueue();
+    queue.enqueue({ question_id: 1, answer: 'A' });
+    await queue.flush();
+    expect(queue.readQueue()).toHaveLength(1);
+  });
+});
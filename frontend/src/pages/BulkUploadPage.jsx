@@ -13,6 +13,18 @@ function BulkUploadPage() {
   const [uploading, setUploading] = useState(false);
   const [result, setResult] = useState(null);
 
+  async function waitForJob(job) {
+    // Large files are imported by a background job; poll until it finishes.
+    while (!job.finished) {
+      setResult(job);
+      await new Promise((resolve) => setTimeout(resolve, 1500));
+      const res = await fetch(`${BASE_API}/imports/${job.id}/`, { headers: authHeaders() });
+      if (!res.ok) throw new Error(`Import status request failed (${res.status})`);
+      job = await res.json();
+    }
+    return job;
+  }
+
   async function handleUpload() {
     if (!csvFile) {
       toast.error('Please select a CSV file');
@@ -26,17 +38,22 @@ function BulkUploadPage() {
       const formData = new FormData();
       formData.append('csv', csvFile);
 
-      const res = await fetch(`${BASE_API}/questions/bulk/`, {
+      const res = await fetch(`${BASE_API}/questions/bulk/?async=1`, {
         method: 'POST',
         headers: authHeaders(),
         body: formData
       });
 
-      const data = await res.json();
+      let data = await res.json();
+      if (res.status === 202 && data.job) {
+        data = await waitForJob(data.job);
+      }
       setResult(data);
       
       if (data.created_count > 0) {
         toast.success(`Successfully created ${data.created_count} questions!`);
+      } else if (data.status === 'failed') {
+        toast.error(data.message || 'Upload failed');
       }
     } catch (error) {
       console.error('Upload error:', error);
@@ -108,11 +125,13 @@ function BulkUploadPage() {
             disabled={!csvFile || uploading}
             className="upload-btn"
           >
-            {uploading ? '⏳ Uploading...' : '🚀 Upload Questions'}
+            {uploading
+              ? (result?.processed_rows ? `⏳ Processing... ${result.processed_rows} rows` : '⏳ Uploading...')
+              : '🚀 Upload Questions'}
           </button>
         </div>
 
-        {result && (
+        {result && (!uploading || result.finished !== false) && (
           <div className={`result-card ${result.created_count > 0 ? 'success' : 'error'}`}>
             <h3 className="result-title">Upload Results</h3>
             <div className="result-stats">
@@ -122,7 +141,7 @@ function BulkUploadPage() {
               </div>
               <div className="result-stat">
                 <span className="stat-label">Errors:</span>
-                <span className="stat-value">{result.errors?.length || 0}</span>
+                <span className="stat-value">{result.error_count ?? result.errors?.length ?? 0}</span>
               </div>
             </div>
 
@@ -132,7 +151,8 @@ function BulkUploadPage() {
                 <div className="errors-list">
                   {result.errors.map((err, idx) => (
                     <div key={idx} className="error-item">
-                      <strong>Row {idx + 2}:</strong> {err.error}
+                      <strong>Row {err.row ?? idx + 2}:</strong>{' '}
+                      {err.errors ? Object.values(err.errors).join('; ') : err.error}
                     </div>
                   ))}
                 </div>
@@ -25,6 +25,20 @@ const safeJson = async (res) => {
   }
 };
 
+// Follows cursor-paginated list responses ({ next, results }) to the end.
+const fetchAllPages = async (url) => {
+  const items = [];
+  let next = url;
+  while (next) {
+    const res = await fetch(next, { headers: authHeaders() });
+    if (!res.ok) break;
+    const data = await safeJson(res);
+    items.push(...asList(data));
+    next = Array.isArray(data) ? null : data?.next || null;
+  }
+  return items;
+};
+
 const asDisplay = (value) => {
   if (value === null || value === undefined) return '—';
   if (typeof value === 'string' || typeof value === 'number') return String(value);
@@ -151,9 +165,8 @@ function TeacherDashboard() {
         if (selectedIsIb && paperFilters.level) params.set('level', paperFilters.level);
         if (selectedIsIb && paperFilters.paper_number) params.set('paper_number', paperFilters.paper_number);
 
-        const res = await fetch(`${BASE_API}/attempts/?${params.toString()}`, { headers: authHeaders() });
-        const data = await safeJson(res);
-        const attempts = res.ok ? asList(data) : [];
+        params.set('page_size', '200');
+        const attempts = await fetchAllPages(`${BASE_API}/attempts/?${params.toString()}`);
 
         const byStudent = new Map();
         for (const a of attempts) {
@@ -195,20 +208,18 @@ function TeacherDashboard() {
 
   async function loadTeacherDashboard() {
     try {
-      const [examsRes, attemptsRes, studentsRes, summaryRes] = await Promise.all([
+      const [examsRes, attemptsList, studentsRes, summaryRes] = await Promise.all([
         fetch(`${BASE_API}/exams/`, { headers: authHeaders() }),
-        fetch(`${BASE_API}/attempts/?completed=1&needs_grading=1`, { headers: authHeaders() }),
+        fetchAllPages(`${BASE_API}/grading/queue/?page_size=200`),
         fetch(`${BASE_API}/users/`, { headers: authHeaders() }),
         fetch(`${BASE_API}/analytics/exams/summary/`, { headers: authHeaders() })
       ]);
 
       const examsData = await safeJson(examsRes);
-      const attemptsData = await safeJson(attemptsRes);
       const studentsData = await safeJson(studentsRes);
       const summaryData = await safeJson(summaryRes);
 
       const examsList = examsRes.ok ? asList(examsData) : [];
-      const attemptsList = attemptsRes.ok ? asList(attemptsData) : [];
       const studentsList = studentsRes.ok ? asList(studentsData) : [];
       const summaryList = summaryRes.ok ? asList(summaryData?.exams ?? summaryData) : [];
 
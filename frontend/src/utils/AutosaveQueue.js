@@ -1,3 +1,9 @@
+// Matches AUTOSAVE_MAX_ITEMS on the server (exams/autosave.py).
+export const AUTOSAVE_MAX_ITEMS = 500;
+
+// Auth, rate limiting and timeouts say nothing about the deltas themselves.
+const RETRY_STATUSES = [401, 403, 408, 429];
+
 export default class AutosaveQueue {
   constructor({ baseApi, attemptId, getHeaders, onFlushSuccess }) {
     this.baseApi = baseApi;
@@ -14,15 +20,38 @@ export default class AutosaveQueue {
   enqueue(payload) { const q = this.readQueue(); q.push({ payload, ts: Date.now() }); this.writeQueue(q); }
   async flush() {
     const q = this.readQueue(); if (!q.length) return;
-    const remaining = [];
-    for (const item of q) {
-      try {
-        const res = await fetch(`${this.baseApi}/attempts/${this.attemptId}/save/`, { method: 'POST', headers: this.getHeaders(), body: JSON.stringify(item.payload) });
-        if (!res.ok) throw new Error('save failed');
-      } catch { remaining.push(item); }
+    // The latest delta per question wins; send them in batches the server accepts.
+    const latest = new Map();
+    for (const item of q) latest.set(String(item.payload?.question_id), item);
+    const items = [...latest.values()];
+    let unsent = [];
+    for (let i = 0; i < items.length; i += AUTOSAVE_MAX_ITEMS) {
+      const result = await this.send(items.slice(i, i + AUTOSAVE_MAX_ITEMS).map(item => item.payload));
+      if (result === 'closed') break;
+      if (result === 'retry') { unsent = items.slice(i); break; }
     }
-    this.writeQueue(remaining);
-    if (remaining.length === 0 && typeof this.onFlushSuccess === 'function') this.onFlushSuccess();
+    // Keep unsent deltas and anything enqueued while the requests were in flight.
+    this.writeQueue([...unsent, ...this.readQueue().slice(q.length)]);
+    if (!unsent.length && typeof this.onFlushSuccess === 'function') this.onFlushSuccess();
+  }
+  // Returns 'ok' once the batch is saved or its rejected deltas are dropped, 'closed' when the attempt
+  // no longer takes answers, and 'retry' when the batch should stay queued for the next flush.
+  async send(items) {
+    let res;
+    try {
+      res = await fetch(`${this.baseApi}/attempts/${this.attemptId}/autosave/`, { method: 'POST', headers: this.getHeaders(), body: JSON.stringify({ items }) });
+    } catch { return 'retry'; }
+    if (res.ok) return 'ok';
+    // 409/410: the attempt was submitted or timed out, so the drafts can be dropped.
+    if (res.status === 409 || res.status === 410) return 'closed';
+    if (res.status >= 500 || RETRY_STATUSES.includes(res.status)) return 'retry';
+    // Any other 4xx rejects the whole batch (e.g. 404 for a deleted question):
+    // split it until the bad deltas are isolated, so the rest still get saved.
+    if (items.length === 1) return 'ok';
+    const mid = Math.ceil(items.length / 2);
+    const first = await this.send(items.slice(0, mid));
+    if (first !== 'ok') return first;
+    return this.send(items.slice(mid));
   }
   startRetryLoop() { if (this.loop) return; this.loop = setInterval(() => { if (navigator.onLine) this.flush(); }, 5000); }
   stopRetryLoop() { if (this.loop) clearInterval(this.loop); this.loop = null; window.removeEventListener('online', this.flush); }
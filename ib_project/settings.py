@@ -68,6 +68,8 @@ if USE_CLOUDINARY:
 # -------------------------------------------------------------------
 
 MIDDLEWARE = [
+    # First, so it times the whole stack; removes itself unless REQUEST_METRICS_ENABLED.
+    'exams.metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -79,7 +81,7 @@ MIDDLEWARE = [
 ]
 
 if not DEBUG:
-    MIDDLEWARE.insert(2, 'whitenoise.middleware.WhiteNoiseMiddleware')
+    MIDDLEWARE.insert(3, 'whitenoise.middleware.WhiteNoiseMiddleware')
 
 # -------------------------------------------------------------------
 # URL & WSGI CONFIG
@@ -306,6 +308,90 @@ else:
     # In production, require explicit origins. Default to FRONTEND_URL for safer out-of-box deploys.
     CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', FRONTEND_URL).split(',')
 
+# -------------------------------------------------------------------
+# CACHE
+# -------------------------------------------------------------------
+# Per-process locmem by default; set REDIS_URL to share one Redis cache across
+# all web workers (needed for cross-worker invalidation of cached API responses
+# and for write-behind autosave).
+REDIS_URL = os.getenv('REDIS_URL', '')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                'CONNECTION_POOL_KWARGS': {
+                    'max_connections': 50,
+                    'retry_on_timeout': True,
+                },
+                'SOCKET_CONNECT_TIMEOUT': 5,
+                'SOCKET_TIMEOUT': 5,
+            },
+            'KEY_PREFIX': 'mentara',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'mentara',
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Versioned cache entries (papers, topic trees, API responses, analytics) are
+# invalidated by bumping a counter in the cache. Without a shared cache each
+# worker has its own counters, so entries are kept at most this many seconds.
+LOCAL_CACHE_MAX_TIMEOUT = int(os.getenv('LOCAL_CACHE_MAX_TIMEOUT', '60'))
+
+# -------------------------------------------------------------------
+# EXAM AUTOSAVE
+# -------------------------------------------------------------------
+# Write-behind autosave keeps in-progress drafts in the cache and persists them
+# on submit/timeout and via `manage.py flush_autosave_drafts`. Only enable it
+# with a cache shared by all web workers (Redis), not the per-process locmem default.
+EXAMS_AUTOSAVE_WRITE_BEHIND = os.getenv('EXAMS_AUTOSAVE_WRITE_BEHIND', 'False') == 'True'
+
+# -------------------------------------------------------------------
+# BACKGROUND IMPORT JOBS
+# -------------------------------------------------------------------
+# Question/quiz spreadsheet uploads are queued as ImportJob rows and run on this
+# many threads inside each web process. Set to 0 when a dedicated
+# `manage.py run_import_jobs --interval 5` worker processes the queue instead.
+EXAMS_IMPORT_JOB_THREADS = int(os.getenv('EXAMS_IMPORT_JOB_THREADS', '2'))
+
+# -------------------------------------------------------------------
+# REQUEST METRICS
+# -------------------------------------------------------------------
+# Per-request view name, wall time, SQL count/time, cache hits/misses and
+# response size: sent as a Server-Timing header, logged as JSON on the
+# `exams.metrics` logger and aggregated per process for /api/metrics/
+# (Prometheus text, admins only). Off by default; when off the middleware
+# is removed from the stack at startup.
+REQUEST_METRICS_ENABLED = os.getenv('REQUEST_METRICS_ENABLED', 'False') == 'True'
+# Rolling window (most recent requests per view) used for the percentiles.
+REQUEST_METRICS_WINDOW = int(os.getenv('REQUEST_METRICS_WINDOW', '1024'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'exams.metrics': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_METRICS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # -------------------------------------------------------------------
 # SECURITY HARDENING (when DEBUG=False)
 # -------------------------------------------------------------------
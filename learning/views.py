@@ -7,6 +7,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from accounts.models import CustomUser
+from exams.api_cache import CachedResponseMixin
 
 from .models import LearningAssignment, Material, StudentGroup
 from .permissions import IsAdminOrTeacher, IsStudent
@@ -19,11 +20,12 @@ from .serializers import (
 )
 
 
-class MaterialViewSet(viewsets.ModelViewSet):
+class MaterialViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Material.objects.all()
     serializer_class = MaterialSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTeacher]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
+    cache_scopes = ('material',)
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
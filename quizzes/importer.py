@@ -0,0 +1,139 @@
+# IB_Django/quizzes/importer.py
+"""Quiz question import from CSV/Excel, run as a background ``ImportJob``.
+
+The sheet is loaded into a DataFrame and every column is normalized with
+vectorized pandas string ops. Then:
+
+- rows that cannot be imported are dropped and reported with a reason
+- all distinct (title, subject, difficulty) quizzes are resolved with one
+  query, and the missing ones are created with one ``bulk_create``
+- questions are inserted with ``bulk_create`` in batches, inside one
+  transaction
+"""
+import pandas as pd
+from django.db import transaction
+from django.utils.text import slugify
+
+from .models import Quiz, Question
+
+
+QUESTION_BATCH_SIZE = 2000
+
+TEXT_COLUMNS = ['quiz_title', 'subject', 'difficulty', 'text', 'option_a', 'option_b', 'option_c', 'option_d',
+                'correct_option', 'explanation', 'image']
+
+QUIZ_DEFAULTS = {'quiz_title': 'Untitled Quiz', 'subject': 'General', 'difficulty': 'Medium'}
+
+ANSWER_CHOICES = ('A', 'B', 'C', 'D')
+
+
+def read_quiz_frame(fileobj, name) -> pd.DataFrame:
+    """The upload as a DataFrame of strings (CSV by extension, Excel otherwise)."""
+    if str(name).lower().endswith('.csv'):
+        return pd.read_csv(fileobj, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+    return pd.read_excel(fileobj, dtype=str)
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Stripped string columns with quiz defaults applied and a 1-based sheet ``row`` number."""
+    df = df.rename(columns=lambda c: str(c).strip())
+    out = pd.DataFrame(index=df.index)
+    out['row'] = df.index + 2  # header is row 1
+    for column in TEXT_COLUMNS:
+        values = df[column] if column in df.columns else pd.Series('', index=df.index)
+        out[column] = values.fillna('').astype(str).str.strip()
+    for column, default in QUIZ_DEFAULTS.items():
+        out[column] = out[column].mask(out[column] == '', default)
+    out['correct_option'] = out['correct_option'].str.upper().str[:1].mask(out['correct_option'] == '', 'A')
+    blank = (df.fillna('').astype(str).apply(lambda c: c.str.strip()) == '').all(axis=1)
+    return out[~blank]
+
+
+def _reasons(df: pd.DataFrame) -> pd.Series:
+    """Why each row cannot be imported ('' when it can)."""
+    checks = [
+        (df['text'] == '', 'Question text is empty.'),
+        (~df['correct_option'].isin(ANSWER_CHOICES), 'correct_option must be one of A, B, C, D.'),
+        (df['quiz_title'].str.len() > Quiz._meta.get_field('title').max_length, 'quiz_title is too long.'),
+        (df['subject'].str.len() > Quiz._meta.get_field('subject').max_length, 'subject is too long.'),
+        (df['difficulty'].str.len() > Quiz._meta.get_field('difficulty').max_length, 'difficulty is too long.'),
+    ]
+    reasons = pd.Series('', index=df.index)
+    for mask, message in reversed(checks):
+        reasons = reasons.mask(mask, message)
+    return reasons
+
+
+def resolve_quizzes(keys) -> dict:
+    """``{(title, subject, difficulty): quiz_id}``, creating the quizzes that do not exist yet."""
+    keys = set(keys)
+    if not keys:
+        return {}
+    existing = (
+        Quiz.objects.filter(
+            title__in={k[0] for k in keys},
+            subject__in={k[1] for k in keys},
+            difficulty__in={k[2] for k in keys},
+        )
+        .order_by('id')
+        .values_list('title', 'subject', 'difficulty', 'id')
+    )
+    quiz_ids = {}
+    for title, subject, difficulty, quiz_id in existing:
+        quiz_ids.setdefault((title, subject, difficulty), quiz_id)
+    missing = sorted(keys - quiz_ids.keys())
+    if missing:
+        created = Quiz.objects.bulk_create(
+            [Quiz(title=t, subject=s, difficulty=d, slug=slugify(t)) for t, s, d in missing]
+        )
+        if all(q.pk for q in created):
+            quiz_ids.update({(q.title, q.subject, q.difficulty): q.pk for q in created})
+        else:  # backends that do not return ids from bulk inserts
+            return resolve_quizzes(keys)
+    return {k: quiz_ids[k] for k in keys}
+
+
+def import_quiz_frame(df: pd.DataFrame, progress=None) -> dict:
+    """Create quizzes/questions for the rows of ``df``; returns counts and skipped rows with reasons."""
+    rows = normalize_frame(df)
+    reasons = _reasons(rows)
+    skipped = rows[reasons != '']
+    errors = [{'row': int(r), 'errors': {'row': msg}} for r, msg in zip(skipped['row'], reasons[reasons != ''])]
+    valid = rows[reasons == '']
+    if progress:
+        progress('writing', len(rows))
+
+    with transaction.atomic():
+        keys = list(zip(valid['quiz_title'], valid['subject'], valid['difficulty']))
+        quiz_ids = resolve_quizzes(keys)
+        questions = [
+            Question(
+                quiz_id=quiz_ids[key],
+                text=text,
+                option_a=a,
+                option_b=b,
+                option_c=c,
+                option_d=d,
+                correct_answer=correct,
+                explanation=explanation,
+                image=image or None,
+            )
+            for key, text, a, b, c, d, correct, explanation, image in zip(
+                keys, valid['text'], valid['option_a'], valid['option_b'], valid['option_c'], valid['option_d'],
+                valid['correct_option'], valid['explanation'], valid['image'],
+            )
+        ]
+        Question.objects.bulk_create(questions, batch_size=QUESTION_BATCH_SIZE)
+
+    return {
+        'total_rows': len(rows),
+        'created_count': len(questions),
+        'quizzes': len(quiz_ids),
+        'errors': errors,
+    }
+
+
+def process_quiz_job(job, fileobj, progress):
+    """``ImportJob`` processor for ``quiz_questions`` uploads."""
+    progress('reading', 0)
+    return import_quiz_frame(read_quiz_frame(fileobj, job.original_name), progress)
@@ -1,3 +1,59 @@
+import math
+import time
+
+import pandas as pd
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .importer import QUESTION_BATCH_SIZE, import_quiz_frame
+from .models import Quiz, Question
+
+
+class QuizFrameImportTests(TestCase):
+    def test_rows_are_normalized_and_skipped_rows_reported(self):
+        existing = Quiz.objects.create(title='Algebra', subject='Math', difficulty='Easy', slug='algebra')
+        df = pd.DataFrame({
+            'quiz_title': [' Algebra ', 'Algebra', None, 'Geo', 'Geo'],
+            'subject': ['Math', 'Math', None, 'Math', 'Math'],
+            'difficulty': ['Easy', 'Easy', None, 'Hard', 'Hard'],
+            'text': ['1+1?', '  ', 'Orphan?', 'Angles?', 'Sides?'],
+            'option_a': ['2', '1', 'x', '90', '3'],
+            'correct_option': ['a', 'A', None, 'B', 'z'],
+            'image': [None, None, ' ', 'img/q.png', None],
+        })
+        result = import_quiz_frame(df)
+
+        self.assertEqual((result['total_rows'], result['created_count'], result['quizzes']), (5, 3, 3))
+        self.assertEqual(
+            [(e['row'], e['errors']['row']) for e in result['errors']],
+            [(3, 'Question text is empty.'), (6, 'correct_option must be one of A, B, C, D.')],
+        )
+        q = Question.objects.get(text='1+1?')
+        self.assertEqual((q.quiz_id, q.correct_answer, q.option_a, q.option_b, bool(q.image)), (existing.id, 'A', '2', '', False))
+        untitled = Question.objects.get(text='Orphan?').quiz
+        self.assertEqual((untitled.title, untitled.subject, untitled.difficulty), ('Untitled Quiz', 'General', 'Medium'))
+        self.assertEqual(Question.objects.get(text='Angles?').image.name, 'img/q.png')
+
+    def test_benchmark_20k_rows(self):
+        n = 20000
+        df = pd.DataFrame({
+            'quiz_title': [f'Quiz {i % 50}' for i in range(n)],
+            'subject': 'Physics',
+            'difficulty': 'Medium',
+            'text': [f'Question {i}?' for i in range(n)],
+            'option_a': '1', 'option_b': '2', 'option_c': '3', 'option_d': '4',
+            'correct_option': 'c',
+            'explanation': '',
+        })
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            result = import_quiz_frame(df)
+        elapsed = time.perf_counter() - started
 
-# Create your tests here.
+        self.assertEqual((result['created_count'], result['quizzes'], result['errors']), (n, 50, []))
+        self.assertEqual(Question.objects.count(), n)
+        fields = [f for f in Question._meta.concrete_fields if not f.primary_key]
+        batch = min(QUESTION_BATCH_SIZE, connection.ops.bulk_batch_size(fields, [None] * n))
+        self.assertLessEqual(len(ctx.captured_queries), math.ceil(n / batch) + 5)
+        self.assertLess(elapsed, 10.0, f'20k-row quiz import took {elapsed:.2f}s')
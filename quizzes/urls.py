@@ -9,6 +9,7 @@ urlpatterns = [
     path('take/<int:attempt_id>/<int:question_index>/', views.take_question, name='take_question'),
     path('result/<int:attempt_id>/', views.quiz_result, name='quiz_result'),
     path('upload_excel/', views.upload_quiz_excel, name='upload_quiz_excel'),
+    path('upload_excel/jobs/<int:job_id>/', views.import_status, name='import_status'),
 
     # management routes (staff only)
     path('manage/<int:quiz_id>/', views.manage_quiz, name='manage_quiz'),
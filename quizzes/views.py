@@ -1,6 +1,5 @@
 # IB_Django/quizzes/views.py
-import csv, io, requests
-import pandas as pd
+import requests
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -10,7 +9,8 @@ from django.core.exceptions import PermissionDenied
 from .models import Quiz, Question, QuizAttempt, AttemptAnswer
 from .forms import QuizForm, QuestionForm
 from django.views.decorators.http import require_http_methods
-from django.utils.text import slugify
+from exams.import_jobs import create_job, resume_if_orphaned
+from exams.models import ImportJob
 
 # -------------------------------
 # Quiz List View
@@ -95,71 +95,20 @@ def upload_quiz_excel(request):
         raise PermissionDenied
 
     if request.method == 'POST' and request.FILES.get('excel'):
-        file = request.FILES['excel']
-        try:
-            # CSV support
-            if str(file.name).endswith('.csv'):
-                decoded = file.read().decode('utf-8')
-                reader = csv.DictReader(io.StringIO(decoded))
-                rows = list(reader)
-            else:  # Excel support
-                df = pd.read_excel(file)
-                rows = df.to_dict(orient='records')
-        except Exception as e:
-            messages.error(request, f'Failed to read file: {e}')
-            return redirect('quizzes:upload_quiz_excel')
-
-        created_questions = 0
-        quiz_cache = {}
-
-        for row in rows:
-            try:
-                title = str(row.get('quiz_title') or 'Untitled Quiz').strip()
-                subject = str(row.get('subject') or 'General').strip()
-                difficulty = str(row.get('difficulty') or 'Medium').strip()
-
-                # Unique cache key for quizzes
-                cache_key = f"{title}_{subject}_{difficulty}"
-                if cache_key not in quiz_cache:
-                    quiz, _ = Quiz.objects.get_or_create(
-                        title=title,
-                        subject=subject,
-                        difficulty=difficulty,
-                        defaults={'slug': slugify(title)}
-                    )
-                    quiz_cache[cache_key] = quiz
-                else:
-                    quiz = quiz_cache[cache_key]
-
-                # Handle image field
-                img_value = row.get('image', None)
-                if not isinstance(img_value, str) or img_value.strip() == '':
-                    img_value = None
-
-                # Create question safely
-                Question.objects.create(
-                    quiz=quiz,
-                    text=str(row.get('text') or '').strip(),
-                    option_a=str(row.get('option_a') or '').strip(),
-                    option_b=str(row.get('option_b') or '').strip(),
-                    option_c=str(row.get('option_c') or '').strip(),
-                    option_d=str(row.get('option_d') or '').strip(),
-                    correct_answer=str(row.get('correct_option') or 'A').strip().upper()[0],
-                    explanation=str(row.get('explanation') or '').strip(),
-                    image=img_value
-                )
-                created_questions += 1
-
-            except Exception as e:
-                print(f"Skipping row due to error: {e}")
-                continue
-
-        messages.success(request, f'Successfully uploaded {created_questions} questions.')
-        return redirect('quizzes:quiz_list')
+        # Processed by a background import job; the status page shows progress.
+        job = create_job('quiz_questions', request.FILES['excel'], user=request.user)
+        return redirect('quizzes:import_status', job_id=job.id)
 
     return render(request, 'quizzes/upload_excel.html')
 
 
+@login_required
+def import_status(request, job_id):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    job = get_object_or_404(ImportJob, pk=job_id, kind='quiz_questions')
+    return render(request, 'quizzes/import_status.html', {'job': resume_if_orphaned(job)})
+
 
 # -------------------------------
 # Staff/Management Decorator